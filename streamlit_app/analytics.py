@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import db
+
+# Weeks shown on the disease trend chart
+TREND_WEEKS = 12
+
+# Built figures kept per (username, chart); rebuilt only when the user's rollup version moves
+FIGURE_CACHE_SIZE = 64
+
+_HEALTHY_SUM = "SUM(CASE WHEN label LIKE '%healthy%' THEN scans ELSE 0 END)"
+_DISEASED_SUM = "SUM(CASE WHEN label LIKE '%healthy%' THEN 0 ELSE scans END)"
+
+CHART_LAYOUT = dict(
+    plot_bgcolor="rgba(0,0,0,0)",
+    paper_bgcolor="rgba(255, 255, 255, 0.05)",
+    font=dict(color="white"),
+    xaxis=dict(showgrid=False),
+    yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.1)"),
+    margin=dict(l=20, r=20, t=20, b=20)
+)
+
+
+# ---------------- ROLLUP QUERIES ----------------
+def rollup_version(username):
+    """Changes whenever a scan is recorded for the user (its running scan count)."""
+    rows = db.query("SELECT scans FROM rollup_user WHERE username = ?", (username,))
+    return rows[0][0] if rows else 0
+
+
+def user_summary(username):
+    """KPI figures for the Analytics tab, read from the per-user and per-day rollups."""
+    rows = db.query(
+        "SELECT scans, healthy, confidence_sum, last_scan_at FROM rollup_user WHERE username = ?",
+        (username,)
+    )
+    if not rows:
+        return {"scans": 0, "healthy": 0, "diseased": 0, "health_score": 0.0,
+                "avg_confidence": 0.0, "last_scan_at": None, "scans_this_week": 0, "alerts_this_week": 0}
+
+    scans, healthy, confidence_sum, last_scan_at = rows[0]
+    week_start = (date.today() - timedelta(days=6)).isoformat()
+    recent = db.query(
+        f"SELECT COALESCE(SUM(scans), 0), COALESCE({_DISEASED_SUM}, 0) FROM rollup_disease_daily "
+        "WHERE username = ? AND day >= ?",
+        (username, week_start)
+    )[0]
+    return {
+        "scans": scans,
+        "healthy": healthy,
+        "diseased": scans - healthy,
+        "health_score": healthy / scans * 100,
+        "avg_confidence": confidence_sum / scans * 100,
+        "last_scan_at": last_scan_at,
+        "scans_this_week": recent[0],
+        "alerts_this_week": recent[1],
+    }
+
+
+def crop_counts(username):
+    """Healthy vs diseased scans per crop."""
+    rows = db.query(
+        "SELECT crop, scans, healthy FROM rollup_crop WHERE username = ? ORDER BY scans DESC",
+        (username,)
+    )
+    return pd.DataFrame(
+        [(crop, healthy, scans - healthy) for crop, scans, healthy in rows],
+        columns=["Crop", "Healthy", "Diseased"]
+    )
+
+
+def weekly_trend(username, weeks=TREND_WEEKS):
+    """
+    Healthy vs diseased scans for the most recent `weeks` weeks with activity, oldest first.
+    Each week is labelled by the date of its Monday (ISO weeks), so the axis reads as dates.
+    """
+    rows = db.query(
+        f"SELECT week, {_HEALTHY_SUM}, {_DISEASED_SUM} FROM rollup_disease_weekly "
+        "WHERE username = ? GROUP BY week ORDER BY week DESC LIMIT ?",
+        (username, weeks)
+    )
+    return pd.DataFrame(reversed(rows), columns=["Week", "Healthy", "Diseased"])
+
+
+def top_diseases(username, days=30, limit=5):
+    """Most frequent non-healthy diagnoses over the last `days` days."""
+    since = (date.today() - timedelta(days=days - 1)).isoformat()
+    return db.query(
+        "SELECT label, SUM(scans) AS n FROM rollup_disease_daily "
+        "WHERE username = ? AND day >= ? AND label NOT LIKE '%healthy%' "
+        "GROUP BY label ORDER BY n DESC LIMIT ?",
+        (username, since, limit)
+    )
+
+
+# ---------------- FIGURES ----------------
+def _crop_figure(username):
+    data = crop_counts(username)
+    fig = px.bar(data, x="Crop", y=["Healthy", "Diseased"], barmode="stack",
+                 color_discrete_sequence=["#34d399", "#f87171"])
+    fig.update_layout(**CHART_LAYOUT, legend=dict(orientation="h", y=1.1, title=None), yaxis_title="Scans")
+    return fig
+
+
+def _trend_figure(username):
+    data = weekly_trend(username)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=data["Week"], y=data["Healthy"], fill='tozeroy', mode='lines', name='Healthy', line=dict(width=3, color='#34d399')))
+    fig.add_trace(go.Scatter(x=data["Week"], y=data["Diseased"], fill='tozeroy', mode='lines', name='Diseased', line=dict(width=3, color='#f87171')))
+    fig.update_layout(**CHART_LAYOUT, legend=dict(orientation="h", y=1.1))
+    return fig
+
+
+FIGURES = {
+    "crops": _crop_figure,
+    "trend": _trend_figure,
+}
+
+_figures = OrderedDict()
+_figures_lock = threading.Lock()
+
+
+def get_figure(username, name):
+    """Returns the named chart, rebuilding it only if the user's rollups changed since it was built."""
+    version = rollup_version(username)
+    key = (username, name)
+
+    with _figures_lock:
+        cached = _figures.get(key)
+        if cached is not None and cached[0] == version:
+            _figures.move_to_end(key)
+            return cached[1]
+
+    fig = FIGURES[name](username)
+
+    with _figures_lock:
+        _figures[key] = (version, fig)
+        _figures.move_to_end(key)
+        while len(_figures) > FIGURE_CACHE_SIZE:
+            _figures.popitem(last=False)
+    return fig
@@ -1,5 +1,4 @@
 import streamlit as st
-import os
 
 # --- PAGE CONFIG MUST BE FIRST ---
 st.set_page_config(
@@ -12,57 +11,52 @@ st.set_page_config(
 # --- IMPORTS ---
 # We now import the dashboard_page here
 from utils import init_db
+from auth import restore_session, sync_session_cookie
+from warmup import start_warmup
+from llm_client import LLM_CLIENTS
+from static_assets import get_manifest
+from metrics import start_metrics_server
+from registry import REGISTRY
 from views import landing_page, login_page, dashboard_page, chatbot_page, profile_page
 # --- INITIALIZATION ---
 def init_app():
     # 1. Initialize Database
     init_db()
     
-    # 2. Load Custom CSS
-    # Note: We look for assets relative to where the command was run
-    css_path = os.path.join("assets", "styles.css")
-    if os.path.exists(css_path):
-        with open(css_path) as f:
-            st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-    else:
-        # Graceful fallback if CSS is missing
-        pass 
-    
-    # 3. Initialize Session State Variables
+    # 2. Custom CSS (assets/styles.css) is compiled with the page stylesheets in theme.py
+    #    and injected once per session, not re-read here on every rerun
+
+    # 3. Build the optimized static images (once per server process; up-to-date variants are reused)
+    get_manifest()
+
+    # 4. Warm up models in the background (runs once per server process)
+    start_warmup()
+
+    # 5. Discover the assistant's LLM model in the background (once per server process)
+    LLM_CLIENTS.prime()
+
+    # 6. Serve /metrics for a local scraper (once per server process)
+    metrics_config = REGISTRY.section("metrics")
+    if metrics_config.get("enabled", False):
+        start_metrics_server(metrics_config.get("port", 9464))
+
+    # 7. Initialize Session State Variables
     if 'authenticated' not in st.session_state:
         st.session_state['authenticated'] = False
     if 'page' not in st.session_state:
         st.session_state['page'] = 'landing'
-def show_ai_assistant_button():
-    st.markdown("""
-    <style>
-    /* Target ONLY our button using the key */
-    div[data-testid="stButton"] > button {
-        width: auto !important;          /* 👈 stop full width */
-        min-width: unset !important;
-        display: inline-flex !important; /* 👈 shrink to content */
-        align-items: center;
-        gap: 8px;
 
-        position: fixed;                 /* 👈 float */
-        bottom: 24px;
-        right: 24px;
+    # 8. Returning browsers log in from their session cookie (checked once per session)
+    if not st.session_state['authenticated'] and 'session_restore_checked' not in st.session_state:
+        st.session_state['session_restore_checked'] = True
+        if restore_session():
+            st.session_state['page'] = 'dashboard'
+
 
-        background: #1DB954 !important;
-        color: white !important;
-        border-radius: 10px !important;
-        padding: 10px 14px !important;
-        font-weight: 600 !important;
-        box-shadow: 0 6px 16px rgba(0,0,0,0.35);
-        z-index: 9999;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    
 # --- MAIN NAVIGATION ---
 def main():
     init_app()
+    sync_session_cookie()
     # (No query-param routing) session `page` controls navigation
 
 
@@ -72,8 +66,8 @@ def main():
         elif st.session_state.get("page") == "profile":
             profile_page()
         else:
+            # Includes the floating AI Assistant button styles (assets/css/assistant_button.css)
             dashboard_page()
-            show_ai_assistant_button()
 
     else:
         if st.session_state['page'] == 'landing':
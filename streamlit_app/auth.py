@@ -1,57 +1,118 @@
+import sqlite3
 import streamlit as st
-from passlib.hash import pbkdf2_sha256
+import streamlit.components.v1 as components
+import passwords
+from passwords import HashPoolBusy
+from sessions import SESSION_COOKIE, SESSION_DAYS, issue_token, purge_expired, resolve_token, revoke_token
 from utils import run_query
 from datetime import datetime
 
 def hash_password(password):
-    """Securely hashes a password."""
-    return pbkdf2_sha256.hash(password)
+    """Securely hashes a password (on the bounded hashing pool)."""
+    return passwords.hash_password(password)
 
 def verify_password(password, hashed):
     """Verifies a password against its hash."""
-    return pbkdf2_sha256.verify(password, hashed)
+    ok, _ = passwords.verify_password(password, hashed)
+    return ok
 
 def create_user(username, name, password):
     """Registers a new user in the database."""
-    # Check if user already exists
-    existing_user = run_query("SELECT * FROM users WHERE username = ?", (username,))
-    if existing_user:
-        return False, "Username already exists!"
-    
-    hashed_pw = hash_password(password)
+    try:
+        hashed_pw = hash_password(password)
+    except HashPoolBusy as e:
+        return False, str(e)
     join_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    run_query(
-        "INSERT INTO users (username, name, password, join_date) VALUES (?, ?, ?, ?)",
-        (username, name, hashed_pw, join_date)
-    )
+
+    # One round-trip: the primary key rejects existing usernames
+    try:
+        run_query(
+            "INSERT INTO users (username, name, password, join_date) VALUES (?, ?, ?, ?)",
+            (username, name, hashed_pw, join_date)
+        )
+    except sqlite3.IntegrityError:
+        return False, "Username already exists!"
     return True, "Account created successfully! Please log in."
 
+def _user_dict(row):
+    # Database columns: 0=username, 1=name, 2=password, 3=join_date
+    return {"username": row[0], "name": row[1], "join_date": row[3]}
+
 def authenticate_user(username, password):
-    """Checks credentials and logs the user in."""
+    """
+    Checks credentials and logs the user in. Raises HashPoolBusy when the
+    hashing pool is saturated.
+    """
     user_data = run_query("SELECT * FROM users WHERE username = ?", (username,))
-    
+
     if not user_data:
         return None  # User not found
-    
-    # Database columns: 0=username, 1=name, 2=password, 3=join_date
-    stored_username = user_data[0][0]
-    stored_name = user_data[0][1]
-    stored_hash = user_data[0][2]
-    stored_join_date = user_data[0][3]  # <--- THIS WAS MISSING
-    
-    if verify_password(password, stored_hash):
-        # We now return the join_date too
-        return {
-            "username": stored_username, 
-            "name": stored_name, 
-            "join_date": stored_join_date
-        }
-    else:
+
+    ok, needs_rehash = passwords.verify_password(password, user_data[0][2])
+    if not ok:
         return None  # Wrong password
 
+    # Stored hash predates the configured cost: upgrade it while we have the plaintext.
+    # Best-effort: the password was correct, so a busy pool or locked DB must not fail the login
+    if needs_rehash:
+        try:
+            run_query("UPDATE users SET password = ? WHERE username = ?", (hash_password(password), username))
+        except (HashPoolBusy, sqlite3.Error):
+            pass  # Retried on the next login
+    return _user_dict(user_data[0])
+
+# ---------------- SESSION TOKENS ----------------
+def start_session(user):
+    """Marks the user as logged in and issues a token so the next browser session skips the password."""
+    # Logins are infrequent, so this is where expired tokens are cleared out (indexed delete)
+    purge_expired()
+    token = issue_token(user["username"])
+    st.session_state["authenticated"] = True
+    st.session_state["user"] = user
+    st.session_state["session_token"] = token
+    st.session_state["session_cookie_pending"] = token
+
+def restore_session():
+    """Logs a returning browser in from its session cookie; returns True on success."""
+    token = st.context.cookies.get(SESSION_COOKIE)
+    username = resolve_token(token) if token else None
+    if username is None:
+        return False
+
+    user_data = run_query("SELECT * FROM users WHERE username = ?", (username,))
+    if not user_data:
+        return False
+
+    st.session_state["authenticated"] = True
+    st.session_state["user"] = _user_dict(user_data[0])
+    st.session_state["session_token"] = token
+    return True
+
+def sync_session_cookie():
+    """
+    Writes (or clears) the session cookie in the browser after a login or logout.
+    Streamlit cannot set response headers, so the cookie is written from JS and
+    therefore cannot be HttpOnly: script on the page can read it. It is limited
+    to SameSite=Strict, Secure over HTTPS, and the token is revocable server-side.
+    """
+    token = st.session_state.pop("session_cookie_pending", None)
+    if token is None:
+        return
+
+    max_age = SESSION_DAYS * 86400 if token else 0
+    components.html(
+        f"<script>const secure = window.parent.location.protocol === 'https:' ? '; Secure' : '';"
+        f"window.parent.document.cookie = "
+        f"'{SESSION_COOKIE}={token}; path=/; max-age={max_age}; SameSite=Strict' + secure;</script>",
+        height=0
+    )
+
 def logout():
-    """Clears the session state."""
+    """Revokes the session token and clears the session state."""
+    token = st.session_state.pop("session_token", None)
+    if token:
+        revoke_token(token)
+    st.session_state["session_cookie_pending"] = ""
     st.session_state["authenticated"] = False
     st.session_state["user"] = None
-    st.rerun()
\ No newline at end of file
+    st.rerun()
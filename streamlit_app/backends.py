@@ -0,0 +1,96 @@
+import threading
+import time
+from types import SimpleNamespace
+
+
+# ---------------- IMPORTERS ----------------
+def _import_tensorflow():
+    import tensorflow as tf
+    from tensorflow.keras.applications import EfficientNetB0
+    from tensorflow.keras.layers import Dense, GlobalAveragePooling2D
+    from tensorflow.keras.models import Model
+
+    return SimpleNamespace(
+        tf=tf,
+        EfficientNetB0=EfficientNetB0,
+        Dense=Dense,
+        GlobalAveragePooling2D=GlobalAveragePooling2D,
+        Model=Model,
+    )
+
+
+def _import_torch():
+    import torch
+    import timm
+
+    return SimpleNamespace(torch=torch, timm=timm)
+
+
+def _import_onnx():
+    import onnxruntime as ort
+
+    return SimpleNamespace(ort=ort)
+
+
+def _import_tflite():
+    # The standalone runtime is much lighter than full TensorFlow on edge boxes
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+
+    return SimpleNamespace(Interpreter=Interpreter)
+
+
+class Backend:
+    """
+    A deep-learning framework that is imported on first use.
+    Keeps the UI pages free of TensorFlow/torch until a model of that type is needed.
+    """
+
+    def __init__(self, name, importer):
+        self.name = name
+        self._importer = importer
+        self._modules = None
+        self._lock = threading.Lock()
+        self.import_seconds = None
+
+    @property
+    def loaded(self):
+        return self._modules is not None
+
+    def load(self):
+        """Imports the framework (once) and returns its modules."""
+        if self._modules is None:
+            with self._lock:
+                if self._modules is None:
+                    start = time.perf_counter()
+                    modules = self._importer()
+                    self.import_seconds = time.perf_counter() - start
+                    self._modules = modules
+        return self._modules
+
+
+BACKENDS = {
+    "tensorflow": Backend("tensorflow", _import_tensorflow),
+    "torch": Backend("torch", _import_torch),
+    "onnx": Backend("onnx", _import_onnx),
+    "tflite": Backend("tflite", _import_tflite),
+}
+
+
+def get_backend(model_type):
+    """Returns the (lazily imported) modules for a model `type`/`backend` from model_config.json."""
+    if model_type not in BACKENDS:
+        raise ValueError(f"Unknown model type '{model_type}'")
+    return BACKENDS[model_type].load()
+
+
+def import_times():
+    """Seconds each backend took to import; backends not yet used are omitted."""
+    return {
+        name: backend.import_seconds
+        for name, backend in BACKENDS.items()
+        if backend.loaded
+    }
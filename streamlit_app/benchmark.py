@@ -0,0 +1,307 @@
+"""
+Benchmarks load, preprocessing and inference for every configured model.
+
+Run from the repository root:
+    python streamlit_app/benchmark.py                              # all models, batch sizes 1/8/32
+    python streamlit_app/benchmark.py cotton_tomato --batch-sizes 1 16
+    python streamlit_app/benchmark.py --compare benchmarks/<old>.json
+
+Every measurement goes through the app's own path: load_model (model cache,
+backends, special cases), preprocess_image and predict_image. By default the
+weight files underneath are random-weight stand-ins of the same architecture,
+plus the ONNX/TFLite/INT8 artifact when an entry is served from one. They are
+written to a temp dir by a separate process, so the suite runs without the real
+files; --real-weights loads the files in models/. Each model is measured in a
+fresh process so cold-load time and peak RSS are not skewed by earlier models
+or by building the stand-ins. Results go to benchmarks/<commit>.json; --compare prints the change
+against an earlier run and exits non-zero on regressions.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+RESULTS_DIR = "benchmarks"
+
+
+# ---------------- STAND-INS ----------------
+def _redirect_artifacts(spec, directory):
+    """Points the entry's weight and export files into `directory` (model_loader keeps absolute paths as-is)."""
+    if spec.type == "torch":
+        name = f"{spec.key}.pth"
+    elif spec.key == "pumpkin_wheat":
+        name = f"{spec.key}.weights.h5"  # Keras only writes bare weights to *.weights.h5
+    else:
+        name = f"{spec.key}.keras"
+
+    precision = spec.info.get("tflite_precision", "float16")
+    spec.file = spec.info["file"] = os.path.join(directory, name)
+    spec.info["onnx_file"] = os.path.join(directory, f"{spec.key}.onnx")
+    spec.info["tflite_file"] = os.path.join(directory, f"{spec.key}.{precision}.tflite")
+    spec.info["quantized_file"] = os.path.join(directory, f"{spec.key}.{spec.variant}.pt")
+
+
+def prepare_standins(model_key, directory):
+    """
+    Writes random-weight files for a model into `directory`: the source weights
+    in the format _build_source_model reads, plus the artifact of its serving backend.
+    """
+    from backends import get_backend
+    from model_loader import _build_source_model, pumpkin_wheat_model, quantized_path, serving_backend
+    from registry import REGISTRY
+
+    spec = REGISTRY.spec(model_key)
+    _redirect_artifacts(spec, directory)
+
+    if spec.type == "torch":
+        torchb = get_backend("torch")
+        model = torchb.timm.create_model(spec.architecture, pretrained=False, num_classes=spec.num_classes)
+        torchb.torch.save(model.state_dict(), spec.file)
+    elif model_key == "pumpkin_wheat":
+        pumpkin_wheat_model(get_backend("tensorflow"), spec).save_weights(spec.file)
+    else:
+        tf = get_backend("tensorflow").tf
+        if spec.preprocessing == "effnet":
+            arch = tf.keras.applications.EfficientNetB0
+        else:
+            arch = tf.keras.applications.ResNet50
+        arch(weights=None, input_shape=spec.input_size + (3,), classes=spec.num_classes).save(spec.file)
+
+    # The exporters read the stand-in through _build_source_model, which ignores the
+    # entry's backend/variant, and write the served artifact to the redirected paths
+    backend = serving_backend(model_key)
+    if backend == "onnx":
+        from export_onnx import export_model
+        export_model(model_key)
+    elif backend == "tflite":
+        from convert_tflite import convert_model
+        convert_model(model_key, spec.info.get("tflite_precision", "float16"))
+    elif backend != spec.type:
+        import quantize
+        torch = get_backend("torch").torch
+        quantize._set_engine(torch)
+        fp32, _ = _build_source_model(model_key)
+        example = torch.randn(8, 3, *spec.input_size)
+        if spec.variant == "int8_dynamic":
+            int8 = quantize.quantize_dynamic(fp32)
+        else:
+            int8 = quantize.quantize_static(fp32, example)
+        torch.jit.save(torch.jit.trace(int8.eval(), example[:1]), quantized_path(model_key, spec.variant))
+
+
+# ---------------- MEASUREMENTS ----------------
+def _peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentiles(samples_ms):
+    return {
+        "p50_ms": round(float(np.percentile(samples_ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(samples_ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(samples_ms, 99)), 3),
+        "mean_ms": round(float(np.mean(samples_ms)), 3),
+    }
+
+
+def _time_calls(fn, iterations, warmup=2):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_model(model_key, batch_sizes, iterations, standin_dir=None):
+    """
+    Runs in a fresh process; returns one result dict for the model.
+    With `standin_dir` (from prepare_standins) the model loads from there instead of models/.
+    """
+    from backends import get_backend, import_times
+    from model_loader import load_model, predict_image, serving_backend
+    from preprocess import preprocess_batch, preprocess_image
+    from registry import REGISTRY
+
+    spec = REGISTRY.spec(model_key)
+    if standin_dir:
+        _redirect_artifacts(spec, standin_dir)
+    size = spec.input_size[0]
+    rng = np.random.default_rng(0)
+    photo = Image.fromarray(rng.integers(0, 256, (size * 4, size * 4, 3), dtype=np.uint8))
+
+    # Framework imports are reported separately from model load
+    frameworks = {spec.type} | ({spec.backend} if spec.backend else set())
+    for name in frameworks:
+        get_backend(name)
+
+    start = time.perf_counter()
+    model, model_type = load_model(model_key)
+    cold_load_s = time.perf_counter() - start
+    if model is None:
+        raise RuntimeError(f"Model '{model_key}' failed to load")
+
+    result = {
+        "model_key": model_key,
+        "model_type": model_type,
+        "backend": serving_backend(model_key),
+        "weights": "random" if standin_dir else "real",
+        "import_s": round(sum(import_times()[name] for name in frameworks), 3),
+        "cold_load_s": round(cold_load_s, 3),
+        "preprocess": _percentiles(_time_calls(
+            lambda: preprocess_image(photo, model_type=model_type, target_size=(size, size), model_key=model_key),
+            iterations
+        )),
+        "batches": [],
+    }
+
+    for batch_size in batch_sizes:
+        batch = preprocess_batch([photo] * batch_size, model_type=model_type,
+                                 target_size=(size, size), model_key=model_key)
+
+        start = time.perf_counter()
+        predict_image(model, model_type, batch)
+        first_call_ms = (time.perf_counter() - start) * 1000
+
+        stats = _percentiles(_time_calls(lambda: predict_image(model, model_type, batch), iterations))
+        stats.update({
+            "batch_size": batch_size,
+            "first_call_ms": round(first_call_ms, 3),
+            "throughput_ips": round(batch_size / (stats["mean_ms"] / 1000), 2),
+        })
+        result["batches"].append(stats)
+
+    result["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    return result
+
+
+def _call_in_child(conn, fn, *args):
+    try:
+        conn.send(("ok", fn(*args)))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+def run_isolated(fn, *args):
+    """Calls fn(*args) in a fresh spawned process and returns its result."""
+    ctx = mp.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_call_in_child, args=(child, fn) + args)
+    process.start()
+    child.close()
+    status, payload = parent.recv()
+    process.join()
+    if status != "ok":
+        raise RuntimeError(payload)
+    return payload
+
+
+def bench_isolated(model_key, batch_sizes, iterations, real_weights):
+    if real_weights:
+        return run_isolated(bench_model, model_key, batch_sizes, iterations)
+
+    with tempfile.TemporaryDirectory() as standin_dir:
+        run_isolated(prepare_standins, model_key, standin_dir)
+        return run_isolated(bench_model, model_key, batch_sizes, iterations, standin_dir)
+
+
+# ---------------- REPORTING ----------------
+def _commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, baseline, threshold):
+    """Prints per-metric changes; returns True if any latency regressed by more than `threshold`."""
+    old = {r["model_key"]: r for r in baseline["results"]}
+    regressed = False
+
+    for result in current["results"]:
+        prev = old.get(result["model_key"])
+        if prev is None:
+            continue
+
+        pairs = [("cold_load_s", result["cold_load_s"], prev["cold_load_s"]),
+                 ("preprocess p50", result["preprocess"]["p50_ms"], prev["preprocess"]["p50_ms"])]
+        prev_batches = {b["batch_size"]: b for b in prev["batches"]}
+        for b in result["batches"]:
+            if b["batch_size"] in prev_batches:
+                pairs.append((f"bs={b['batch_size']} p50", b["p50_ms"], prev_batches[b["batch_size"]]["p50_ms"]))
+
+        for name, new, before in pairs:
+            change = (new - before) / before if before else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  <-- REGRESSION"
+                regressed = True
+            print(f"{result['model_key']:>16} {name:<16} {before:>10.3f} -> {new:>10.3f} ({change:+.1%}){flag}")
+
+    return regressed
+
+
+def main(argv=None):
+    from registry import REGISTRY
+
+    parser = argparse.ArgumentParser(description="Benchmark model load, preprocessing and inference")
+    parser.add_argument("models", nargs="*", help="model keys (default: all)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--real-weights", action="store_true", help="benchmark the real model files")
+    parser.add_argument("-o", "--output", help=f"results file (default: {RESULTS_DIR}/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    commit = _commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": [],
+    }
+
+    for key in args.models or REGISTRY.keys():
+        try:
+            result = bench_isolated(key, args.batch_sizes, args.iterations, args.real_weights)
+        except Exception as e:
+            print(f"[FAIL] {key}: {e}")
+            continue
+        report["results"].append(result)
+
+        bs = ", ".join(f"bs={b['batch_size']}: p50 {b['p50_ms']:.1f}ms {b['throughput_ips']:.0f} img/s"
+                       for b in result["batches"])
+        print(f"[OK] {key}: load {result['cold_load_s']:.2f}s, preprocess p50 "
+              f"{result['preprocess']['p50_ms']:.2f}ms, {bs}, peak RSS {result['peak_rss_mb']:.0f} MB")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(report, json.load(f), args.threshold):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
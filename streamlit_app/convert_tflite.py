@@ -0,0 +1,112 @@
+"""
+Converts the Keras models in config/model_config.json to TFLite flatbuffers.
+
+Run from the repository root:
+    python streamlit_app/convert_tflite.py --precision float16
+    python streamlit_app/convert_tflite.py --precision int8 --calib-dir data/calibration rice_potato
+
+Files are written to models/<model_key>.<precision>.tflite, or to the entry's
+"tflite_file" when converting its "tflite_precision". int8 models keep
+float32 inputs/outputs so they take the same preprocessed batch as Keras.
+Set "backend": "tflite" and "tflite_precision" on a model entry to serve it.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from backends import get_backend
+from model_loader import _build_source_model, _run_batch, tflite_path
+from preprocess import preprocess_image
+from registry import REGISTRY
+from runtimes import TFLiteModel
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def representative_images(model_key, calib_dir, limit):
+    """Yields preprocessed single-image batches for int8 calibration."""
+    size = REGISTRY.spec(model_key).input_size[0]
+
+    if calib_dir:
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, files in os.walk(calib_dir)
+            for name in files
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )[:limit]
+        for p in paths:
+            img = preprocess_image(Image.open(p), model_type="tensorflow",
+                                   target_size=(size, size), model_key=model_key)
+            yield img.astype(np.float32)
+    else:
+        # Without real images the int8 ranges are only rough
+        for _ in range(limit):
+            img = Image.fromarray(np.random.randint(0, 256, (size, size, 3), dtype=np.uint8))
+            yield preprocess_image(img, model_type="tensorflow",
+                                   target_size=(size, size), model_key=model_key).astype(np.float32)
+
+
+def convert_model(model_key, precision, calib_dir=None, num_calib=100):
+    tf = get_backend("tensorflow").tf
+
+    model, model_type = _build_source_model(model_key)
+    if model is None:
+        raise RuntimeError(f"Model '{model_key}' failed to load")
+    if model_type != "tensorflow":
+        raise ValueError(f"'{model_key}' is not a Keras model")
+    path = tflite_path(model_key, precision)
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if precision == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        converter.representative_dataset = lambda: (
+            [img] for img in representative_images(model_key, calib_dir, num_calib)
+        )
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+    # Compare against Keras on a few images
+    batch = np.concatenate(list(representative_images(model_key, calib_dir, 4)), axis=0)
+    reference = _run_batch(model, model_type, batch)
+    converted = TFLiteModel(path).run_batch(batch)
+    agreement = float(np.mean(reference.argmax(axis=1) == converted.argmax(axis=1)))
+
+    return path, agreement
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert Keras models to TFLite")
+    parser.add_argument("models", nargs="*", help="model keys (default: all Keras models)")
+    parser.add_argument("--precision", choices=["float16", "int8"], default="float16")
+    parser.add_argument("--calib-dir", help="folder of leaf images for int8 calibration")
+    parser.add_argument("--num-calib", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    model_keys = args.models or [
+        spec.key for spec in REGISTRY.specs() if spec.type == "tensorflow"
+    ]
+    failed = False
+
+    for key in model_keys:
+        try:
+            path, agreement = convert_model(key, args.precision, args.calib_dir, args.num_calib)
+        except Exception as e:
+            print(f"[FAIL] {key}: {e}")
+            failed = True
+            continue
+
+        print(f"[OK] {key} -> {path} ({os.path.getsize(path) / 1e6:.1f} MB, top-1 agreement {agreement:.0%})")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Path to the database file
+DB_PATH = os.path.join("data", "users.db")
+
+# How long a writer waits for a lock held by another session before failing
+BUSY_TIMEOUT_MS = 5000
+
+# Compiled statements kept per connection (sqlite3's statement cache)
+STATEMENT_CACHE_SIZE = 256
+
+# Open connections kept per database; a caller waits up to the busy timeout for a free one
+POOL_SIZE = 8
+
+# Crop = first word of the label ("Potato Fungi" -> "Potato"); healthy = label mentions "healthy"
+_CROP = "substr(NEW.label, 1, instr(NEW.label || ' ', ' ') - 1)"
+_HEALTHY = "(NEW.label LIKE '%healthy%')"
+
+# Week keys: v1 was "%Y-W%W" (splits a week at New Year); now the Monday that starts the ISO week
+_WEEK_V1 = "strftime('%Y-W%W', {0})"
+_WEEK = "date({0}, 'weekday 0', '-6 days')"
+
+
+def _rollup_trigger(week):
+    """The history trigger keeping every rollup current; `week` formats a timestamp column into a week key."""
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS trg_history_rollups
+        AFTER INSERT ON prediction_history
+        BEGIN
+            INSERT INTO rollup_disease_daily (username, day, label, scans)
+            VALUES (NEW.username, date(NEW.created_at), NEW.label, 1)
+            ON CONFLICT (username, day, label) DO UPDATE SET scans = scans + 1;
+
+            INSERT INTO rollup_disease_weekly (username, week, label, scans)
+            VALUES (NEW.username, {week.format('NEW.created_at')}, NEW.label, 1)
+            ON CONFLICT (username, week, label) DO UPDATE SET scans = scans + 1;
+
+            INSERT INTO rollup_crop (username, crop, scans, healthy)
+            VALUES (NEW.username, {_CROP}, 1, {_HEALTHY})
+            ON CONFLICT (username, crop) DO UPDATE SET scans = scans + 1, healthy = healthy + excluded.healthy;
+
+            INSERT INTO rollup_user (username, scans, healthy, confidence_sum, last_scan_at)
+            VALUES (NEW.username, 1, {_HEALTHY}, NEW.confidence, NEW.created_at)
+            ON CONFLICT (username) DO UPDATE SET
+                scans = scans + 1,
+                healthy = healthy + excluded.healthy,
+                confidence_sum = confidence_sum + excluded.confidence_sum,
+                last_scan_at = excluded.last_scan_at;
+        END
+    """
+
+
+# Rollups are kept current by a trigger in the same transaction as each history insert,
+# then backfilled once from rows written before the migration
+ROLLUP_MIGRATION = [
+    '''
+        CREATE TABLE IF NOT EXISTS rollup_disease_daily (
+            username TEXT NOT NULL,
+            day TEXT NOT NULL,
+            label TEXT NOT NULL,
+            scans INTEGER NOT NULL,
+            PRIMARY KEY (username, day, label)
+        ) WITHOUT ROWID
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS rollup_disease_weekly (
+            username TEXT NOT NULL,
+            week TEXT NOT NULL,
+            label TEXT NOT NULL,
+            scans INTEGER NOT NULL,
+            PRIMARY KEY (username, week, label)
+        ) WITHOUT ROWID
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS rollup_crop (
+            username TEXT NOT NULL,
+            crop TEXT NOT NULL,
+            scans INTEGER NOT NULL,
+            healthy INTEGER NOT NULL,
+            PRIMARY KEY (username, crop)
+        ) WITHOUT ROWID
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS rollup_user (
+            username TEXT PRIMARY KEY,
+            scans INTEGER NOT NULL,
+            healthy INTEGER NOT NULL,
+            confidence_sum REAL NOT NULL,
+            last_scan_at TEXT
+        )
+    ''',
+    _rollup_trigger(_WEEK_V1),
+    '''
+        INSERT OR REPLACE INTO rollup_disease_daily (username, day, label, scans)
+        SELECT username, date(created_at), label, COUNT(*)
+        FROM prediction_history GROUP BY 1, 2, 3
+    ''',
+    f"""
+        INSERT OR REPLACE INTO rollup_disease_weekly (username, week, label, scans)
+        SELECT username, {_WEEK_V1.format("created_at")}, label, COUNT(*)
+        FROM prediction_history GROUP BY 1, 2, 3
+    """,
+    f"""
+        INSERT OR REPLACE INTO rollup_crop (username, crop, scans, healthy)
+        SELECT username, {_CROP.replace("NEW.", "")}, COUNT(*), SUM({_HEALTHY.replace("NEW.", "")})
+        FROM prediction_history GROUP BY 1, 2
+    """,
+    f"""
+        INSERT OR REPLACE INTO rollup_user (username, scans, healthy, confidence_sum, last_scan_at)
+        SELECT username, COUNT(*), SUM({_HEALTHY.replace("NEW.", "")}), SUM(confidence), MAX(created_at)
+        FROM prediction_history GROUP BY 1
+    """,
+]
+
+# Schema history: (version, description, [statements]). Applied in order and
+# recorded in PRAGMA user_version; add new entries at the end, never edit applied ones.
+MIGRATIONS = [
+    (1, "users table", ['''
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            password TEXT NOT NULL,
+            join_date TEXT
+        )
+    ''']),
+    (2, "prediction history", ['''
+        CREATE TABLE IF NOT EXISTS prediction_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            model_key TEXT NOT NULL,
+            label TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            top_labels TEXT NOT NULL,
+            top_confidences TEXT NOT NULL,
+            latency_ms REAL,
+            thumbnail TEXT
+        )
+    ''', '''
+        CREATE INDEX IF NOT EXISTS idx_history_user_created
+        ON prediction_history (username, created_at, id)
+    ''']),
+    (3, "analytics rollups", ROLLUP_MIGRATION),
+    (4, "session tokens", ['''
+        CREATE TABLE IF NOT EXISTS sessions (
+            token_hash TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            expires_at TEXT NOT NULL
+        )
+    ''', '''
+        CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)
+    ''']),
+    (5, "weekly rollups keyed by ISO week (Monday)", [
+        "DROP TRIGGER IF EXISTS trg_history_rollups",
+        _rollup_trigger(_WEEK),
+        "DELETE FROM rollup_disease_weekly",
+        f"""
+            INSERT INTO rollup_disease_weekly (username, week, label, scans)
+            SELECT username, {_WEEK.format("created_at")}, label, COUNT(*)
+            FROM prediction_history GROUP BY 1, 2, 3
+        """,
+    ]),
+]
+
+_pools = {}
+_pools_lock = threading.Lock()
+# Connections this thread has checked out, so nested transaction()/connection() calls share one
+_held = threading.local()
+_migrate_lock = threading.Lock()
+
+
+def _open(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # isolation_level=None: autocommit, transactions are opened explicitly.
+    # A pooled connection moves between threads but is only ever used by one at a time.
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Up to `size` open connections to one database, shared by every thread.
+    Connections are opened (and their PRAGMAs run) once, then reused by
+    whichever Streamlit rerun or worker thread checks one out next.
+    """
+
+    def __init__(self, path, size=POOL_SIZE, timeout=BUSY_TIMEOUT_MS / 1000):
+        self.path = path
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(f"No free connection to {self.path} after {self.timeout}s")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return _open(self.path)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        if conn.in_transaction:
+            # Never hand the next caller a half-finished transaction
+            conn.execute("ROLLBACK")
+        self._idle.put(conn)
+        self._slots.release()
+
+
+def _pool(path):
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+@contextmanager
+def connection(path=DB_PATH):
+    """Checks a connection to `path` out of the pool for the enclosed block (nested use shares it)."""
+    held = getattr(_held, "connections", None)
+    if held is None:
+        held = _held.connections = {}
+
+    if path in held:
+        yield held[path]
+        return
+
+    pool = _pool(path)
+    conn = held[path] = pool.acquire()
+    try:
+        yield conn
+    finally:
+        del held[path]
+        pool.release(conn)
+
+
+@contextmanager
+def transaction(path=DB_PATH):
+    """
+    Runs the enclosed statements in one write transaction (BEGIN IMMEDIATE).
+    Nested use joins the outer transaction.
+    """
+    with connection(path) as conn:
+        if conn.in_transaction:
+            yield conn
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def query(sql, params=(), path=DB_PATH):
+    """Runs a statement and returns all rows."""
+    with connection(path) as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def execute(sql, params=(), path=DB_PATH):
+    """Runs a single write statement and returns the cursor (rowcount, lastrowid)."""
+    with connection(path) as conn:
+        return conn.execute(sql, params)
+
+
+def execute_many(sql, rows, path=DB_PATH):
+    """Runs one statement for many parameter rows inside a single transaction."""
+    with transaction(path) as conn:
+        return conn.executemany(sql, rows)
+
+
+def migrate(path=DB_PATH, migrations=MIGRATIONS):
+    """Applies pending migrations; returns the resulting schema version."""
+    with _migrate_lock, connection(path) as conn:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for version, _, statements in migrations:
+            if version <= current:
+                continue
+            with transaction(path):
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version={int(version)}")
+            current = version
+
+        return current
@@ -0,0 +1,59 @@
+import io
+
+from PIL import Image, UnidentifiedImageError
+
+# Limits advertised on the upload widget
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+MAX_PIXELS = 50_000_000
+
+# Decode to at least this multiple of the target before the final resize (keeps quality)
+REDUCING_GAP = 2
+
+
+class ImageRejectedError(ValueError):
+    """Raised when an upload is too large, too many pixels or not an image."""
+
+
+def decode_image(data, target_size=(224, 224), max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_PIXELS):
+    """
+    Decodes image bytes straight to near `target_size`.
+    Limits are checked from the header before any pixel data is decoded. JPEGs are
+    scaled during decoding (draft mode); other formats are shrunk with
+    Image.reduce. The result is RGB and at least `target_size` unless the
+    source is smaller.
+    """
+    if len(data) > max_bytes:
+        raise ImageRejectedError(f"File is {len(data) / 1e6:.1f} MB; the limit is {max_bytes / 1e6:.0f} MB.")
+
+    try:
+        image = Image.open(io.BytesIO(data))
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise ImageRejectedError(f"Could not read image: {e}") from e
+
+    # Checked explicitly rather than by turning DecompressionBombWarning into an
+    # error: warning filters are process-global and not thread-safe
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageRejectedError(f"Image is {width}x{height}; the limit is {max_pixels / 1e6:.0f} megapixels.")
+
+    tw, th = target_size
+    wanted = (tw * REDUCING_GAP, th * REDUCING_GAP)
+
+    # ---------------- JPEG: scale-on-decode ----------------
+    if image.format == "JPEG":
+        image.draft("RGB", wanted)
+
+    try:
+        image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImageRejectedError(f"Could not decode image: {e}") from e
+
+    # ---------------- Integer box reduction ----------------
+    factor = min(image.width // wanted[0], image.height // wanted[1])
+    if factor > 1:
+        image = image.reduce(factor)
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    return image
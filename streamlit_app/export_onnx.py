@@ -0,0 +1,108 @@
+"""
+Exports the models in config/model_config.json to ONNX.
+
+Run from the repository root:
+    python streamlit_app/export_onnx.py                  # all models
+    python streamlit_app/export_onnx.py cotton_tomato    # selected models
+
+Each model is written to models/<model_key>.onnx (or the entry's "onnx_file")
+with a dynamic batch dimension. Every export is checked against the original
+model on a random batch before it is reported as done. Set "backend": "onnx"
+on a model entry to serve it from ONNX Runtime; re-exports still read the
+original weights in "file".
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from backends import get_backend
+from model_loader import _build_source_model, _run_batch, onnx_path
+from registry import REGISTRY
+from runtimes import OnnxModel
+
+
+def export_tensorflow(model, path, size, opset):
+    import tf2onnx
+
+    tf = get_backend("tensorflow").tf
+    spec = (tf.TensorSpec((None, size, size, 3), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=path)
+
+
+def export_torch(model, path, size, opset):
+    torch = get_backend("torch").torch
+
+    # Bake the softmax into the graph so ONNX outputs probabilities like the TF models
+    class WithSoftmax(torch.nn.Module):
+        def __init__(self, net):
+            super().__init__()
+            self.net = net
+
+        def forward(self, x):
+            return torch.softmax(self.net(x), dim=1)
+
+    torch.onnx.export(
+        WithSoftmax(model).eval(),
+        torch.randn(1, 3, size, size),
+        path,
+        input_names=["input"],
+        output_names=["probabilities"],
+        dynamic_axes={"input": {0: "batch"}, "probabilities": {0: "batch"}},
+        opset_version=opset
+    )
+
+
+def export_model(model_key, opset=17, check_batch=2):
+    size = REGISTRY.spec(model_key).input_size[0]
+    path = onnx_path(model_key)
+
+    model, model_type = _build_source_model(model_key)
+    if model is None:
+        raise RuntimeError(f"Model '{model_key}' failed to load")
+
+    if model_type == "tensorflow":
+        export_tensorflow(model, path, size, opset)
+        batch = np.random.rand(check_batch, size, size, 3).astype(np.float32) * 255
+        reference = _run_batch(model, model_type, batch)
+    else:
+        export_torch(model, path, size, opset)
+        torch = get_backend("torch").torch
+        batch = torch.randn(check_batch, 3, size, size)
+        reference = _run_batch(model, model_type, batch)
+
+    exported = OnnxModel(path).run_batch(batch)
+    max_diff = float(np.max(np.abs(exported - reference)))
+
+    return path, max_diff
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export configured models to ONNX")
+    parser.add_argument("models", nargs="*", help="model keys (default: all)")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--tolerance", type=float, default=1e-3,
+                        help="max allowed probability difference vs. the original model")
+    args = parser.parse_args(argv)
+
+    model_keys = args.models or REGISTRY.keys()
+    failed = False
+
+    for key in model_keys:
+        try:
+            path, max_diff = export_model(key, opset=args.opset)
+        except Exception as e:
+            print(f"[FAIL] {key}: {e}")
+            failed = True
+            continue
+
+        status = "OK" if max_diff <= args.tolerance else "MISMATCH"
+        failed = failed or status != "OK"
+        print(f"[{status}] {key} -> {path} (max |Δp| = {max_diff:.2e}, {os.path.getsize(path) / 1e6:.1f} MB)")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
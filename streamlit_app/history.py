@@ -0,0 +1,100 @@
+import io
+import json
+import os
+from datetime import datetime
+
+import db
+
+THUMBNAIL_DIR = os.path.join("data", "thumbnails")
+THUMBNAIL_SIZE = (128, 128)
+
+# Newest-first page size for the History tab
+PAGE_SIZE = 20
+
+
+def save_thumbnail(image, image_hash):
+    """Stores a small JPEG of the upload once per distinct image; returns its relative path."""
+    path = os.path.join(THUMBNAIL_DIR, image_hash[:2], f"{image_hash}.jpg")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        thumb = image.copy()
+        thumb.thumbnail(THUMBNAIL_SIZE)
+        buffer = io.BytesIO()
+        thumb.convert("RGB").save(buffer, format="JPEG", quality=80)
+        with open(path, "wb") as f:
+            f.write(buffer.getvalue())
+    return path
+
+
+def record_prediction(username, model_key, ranked, latency_ms=None, thumbnail=None):
+    """
+    Persists one diagnosis. `ranked` is [(label, confidence), ...] best first;
+    the first entry is also stored in its own columns for filtering.
+    Returns the new row id.
+    """
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+    labels = [label for label, _ in ranked]
+    confidences = [round(float(conf), 6) for _, conf in ranked]
+
+    with db.transaction() as conn:
+        cursor = conn.execute(
+            '''
+            INSERT INTO prediction_history
+                (username, created_at, model_key, label, confidence, top_labels, top_confidences, latency_ms, thumbnail)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+            (username, created_at, model_key, labels[0], confidences[0],
+             json.dumps(labels), json.dumps(confidences), latency_ms, thumbnail)
+        )
+        return cursor.lastrowid
+
+
+def fetch_history(username, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of a user's history, newest first.
+    `cursor` is the (created_at, id) of the last row of the previous page
+    (keyset pagination over the (username, created_at, id) index).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    columns = "id, created_at, model_key, label, confidence, top_labels, top_confidences, latency_ms, thumbnail"
+
+    if cursor is None:
+        rows = db.query(
+            f'''
+            SELECT {columns} FROM prediction_history
+            WHERE username = ?
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+            ''',
+            (username, limit + 1)
+        )
+    else:
+        rows = db.query(
+            f'''
+            SELECT {columns} FROM prediction_history
+            WHERE username = ? AND (created_at, id) < (?, ?)
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+            ''',
+            (username, cursor[0], cursor[1], limit + 1)
+        )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    page = [
+        {
+            "id": r[0],
+            "created_at": r[1],
+            "model_key": r[2],
+            "label": r[3],
+            "confidence": r[4],
+            "top_labels": json.loads(r[5]),
+            "top_confidences": json.loads(r[6]),
+            "latency_ms": r[7],
+            "thumbnail": r[8],
+        }
+        for r in rows
+    ]
+    next_cursor = (rows[-1][1], rows[-1][0]) if has_more else None
+    return page, next_cursor
@@ -0,0 +1,83 @@
+"""
+Bulk-creates user accounts from a CSV file.
+
+Run from the repository root:
+    python streamlit_app/import_users.py farmers.csv
+    python streamlit_app/import_users.py farmers.csv --workers 16
+
+The CSV needs a header row with username, name and password columns
+(join_date is optional). Passwords are hashed in parallel with the rounds
+configured under "auth" in model_config.json, then inserted in one
+transaction. Existing usernames are skipped, never overwritten.
+"""
+import argparse
+import csv
+import sys
+import time
+from datetime import datetime
+
+import db
+from passwords import PBKDF2_ROUNDS, hash_many
+from utils import init_db
+
+REQUIRED_FIELDS = ("username", "name", "password")
+
+
+def read_users(path):
+    """Returns the CSV rows as dicts; raises ValueError on a missing column or empty field."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"missing column(s): {', '.join(missing)}")
+
+        rows = list(reader)
+
+    for line, row in enumerate(rows, start=2):
+        if not row["username"] or not row["password"]:
+            raise ValueError(f"line {line}: username and password are required")
+    return rows
+
+
+def import_users(rows, workers=None):
+    """Hashes and inserts the users; returns (created, skipped)."""
+    existing = {r[0] for r in db.query("SELECT username FROM users")}
+    seen = set()
+    new_rows = []
+    for row in rows:
+        if row["username"] not in existing and row["username"] not in seen:
+            seen.add(row["username"])
+            new_rows.append(row)
+
+    hashes = hash_many([row["password"] for row in new_rows], workers=workers)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    db.execute_many(
+        "INSERT OR IGNORE INTO users (username, name, password, join_date) VALUES (?, ?, ?, ?)",
+        [(row["username"], row["name"], hashed, row.get("join_date") or now)
+         for row, hashed in zip(new_rows, hashes)]
+    )
+    return len(new_rows), len(rows) - len(new_rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-create user accounts from a CSV file")
+    parser.add_argument("csv", help="CSV with username, name, password (and optional join_date) columns")
+    parser.add_argument("--workers", type=int, default=None, help="hashing threads (default: auth.hash_workers)")
+    args = parser.parse_args(argv)
+
+    try:
+        rows = read_users(args.csv)
+    except (OSError, ValueError) as e:
+        print(f"Cannot import {args.csv}: {e}", file=sys.stderr)
+        return 1
+
+    init_db()
+    start = time.perf_counter()
+    created, skipped = import_users(rows, workers=args.workers)
+    print(f"Created {created} users ({skipped} existing skipped, {PBKDF2_ROUNDS} rounds) in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
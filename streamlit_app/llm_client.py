@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+from metrics import ERRORS, LLM_SECONDS
+from registry import REGISTRY
+
+# Provider, endpoint override and discovery TTL (see "llm" in config)
+LLM_CONFIG = REGISTRY.section("llm")
+DISCOVERY_TTL = LLM_CONFIG.get("discovery_ttl_seconds", 3600)
+# A client that is not usable (no key, no model) is retried sooner
+RETRY_SECONDS = LLM_CONFIG.get("retry_seconds", 60)
+
+RATE_LIMIT_MESSAGE = (
+    "⏱️ **Rate Limit Exceeded**\n\n"
+    "Free tier is limited to 5 requests/minute. "
+    "Please wait a moment and try again, or upgrade your API plan at https://ai.google.dev/"
+)
+
+
+class LLMClient:
+    """A configured provider SDK plus the model discovered for it."""
+
+    def __init__(self, provider, sdk=None, api_key=None, model_name=None, endpoint=None, error=None):
+        self.provider = provider
+        self.sdk = sdk
+        self.api_key = api_key
+        self.model_name = model_name
+        self.endpoint = endpoint
+        self.error = error
+        self.discovered_at = time.time()
+
+    @property
+    def configured(self):
+        return bool(self.api_key)
+
+    @property
+    def ready(self):
+        return self.configured and bool(self.model_name)
+
+    def age(self):
+        return time.time() - self.discovered_at
+
+    def model(self, system_instruction=None):
+        """A generation handle for the discovered model."""
+        return self.sdk.GenerativeModel(self.model_name, system_instruction=system_instruction)
+
+    def stream(self, contents, system_instruction=None):
+        """
+        Yields the reply text chunk by chunk as it is generated, recording
+        time-to-first-token and total time in LLM_SECONDS.
+        """
+        labels = {"provider": self.provider, "model": self.model_name}
+        start = time.perf_counter()
+        first_token = None
+        try:
+            for chunk in self.model(system_instruction).generate_content(contents, stream=True):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue  # Chunks carrying only a finish reason or safety block have no text
+                if not text:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                    LLM_SECONDS.observe(first_token, phase="first_token", **labels)
+                yield text
+        except Exception:
+            ERRORS.inc(stage="llm", model_key=self.model_name, backend=self.provider)
+            raise
+        LLM_SECONDS.observe(time.perf_counter() - start, phase="total", **labels)
+
+    def summary(self):
+        return {
+            "provider": self.provider,
+            "model": self.model_name,
+            "endpoint": self.endpoint,
+            "configured": self.configured,
+            "age_seconds": round(self.age(), 1),
+            "error": self.error,
+        }
+
+
+def _rate_limited(error):
+    message = str(error)
+    return "429" in message or "quota" in message.lower()
+
+
+def stream_reply(client, contents, system_instruction=None, max_retries=3, retry_delay=5, wait=time.sleep):
+    """
+    Yields the reply chunk by chunk and never raises, so it can feed st.write_stream.
+    A rate-limited request is retried after wait(delay), with the delay doubling,
+    but only while no text has been yielded; any other failure ends the reply
+    with an error line after whatever was already streamed.
+    """
+    for attempt in range(max_retries):
+        streamed = False
+        try:
+            for chunk in client.stream(contents, system_instruction=system_instruction):
+                streamed = True
+                yield chunk
+            return
+        except Exception as e:
+            if not streamed and _rate_limited(e):
+                if attempt < max_retries - 1:
+                    wait(retry_delay)
+                    retry_delay *= 2  # Exponential backoff
+                    continue
+                yield RATE_LIMIT_MESSAGE
+            else:
+                # Other error (or the stream broke off part-way)
+                yield f"\n\n❌ Gemini Error: {e}"
+            return
+
+
+# ---------------- DISCOVERY ----------------
+def _discover_gemini(config):
+    import google.generativeai as genai
+
+    # Re-read .env so a key added after start-up is picked up on the next refresh
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    endpoint = os.getenv("GEMINI_API_ENDPOINT") or config.get("endpoint")
+    if not api_key:
+        return LLMClient("gemini", genai, error="GEMINI_API_KEY is not set")
+
+    options = {"api_key": api_key}
+    if endpoint:
+        # e.g. the local stub in llm_stub.py; plain HTTP needs the REST transport
+        options.update(transport="rest", client_options={"api_endpoint": endpoint})
+    genai.configure(**options)
+
+    try:
+        supported = [
+            model.name for model in genai.list_models()
+            if "generateContent" in model.supported_generation_methods
+        ]
+    except Exception as e:
+        # Listing can be blocked for some keys; generation may still work
+        return LLMClient("gemini", genai, api_key, config.get("fallback_model"), endpoint, error=str(e))
+
+    preferred = [name for name in config.get("preferred_models", []) if name in supported]
+    model_name = (preferred or supported or [None])[0]
+    error = None if model_name else "No model supporting generateContent is available for this key"
+    return LLMClient("gemini", genai, api_key, model_name, endpoint, error=error)
+
+
+def _discover_fake(config):
+    # In-process canned streaming (llm_stub.py): no SDK, key or network needed
+    from llm_stub import FakeGenerativeModel
+
+    sdk = SimpleNamespace(GenerativeModel=FakeGenerativeModel)
+    return LLMClient("fake", sdk, "offline", FakeGenerativeModel.model_name)
+
+
+DISCOVERERS = {
+    "gemini": _discover_gemini,
+    "fake": _discover_fake,
+}
+
+
+class LLMRegistry:
+    """
+    Process-wide LLM clients. Each provider is configured and its model
+    discovered once; after the TTL the cached client keeps being served
+    while a background thread rediscovers it.
+    """
+
+    def __init__(self, config, ttl=DISCOVERY_TTL):
+        self.config = config
+        self.ttl = ttl
+        self._clients = {}
+        self._lock = threading.Lock()
+        # One discovery per provider at a time; a caller arriving mid-discovery waits for its result
+        self._discovery_locks = {provider: threading.Lock() for provider in DISCOVERERS}
+        self._refreshing = set()
+
+    def _provider(self, provider):
+        provider = provider or os.getenv("LLM_PROVIDER") or self.config.get("provider", "gemini")
+        if provider not in DISCOVERERS:
+            raise ValueError(f"Unknown LLM provider '{provider}'")
+        return provider
+
+    def _discover(self, provider):
+        with self._discovery_locks[provider]:
+            try:
+                client = DISCOVERERS[provider](self.config)
+            except Exception as e:
+                client = LLMClient(provider, error=str(e))
+
+            with self._lock:
+                previous = self._clients.get(provider)
+                # A failed refresh keeps the last working client rather than breaking the chat
+                if previous is not None and previous.ready and not client.ready:
+                    previous.discovered_at = client.discovered_at
+                    previous.error = client.error
+                    client = previous
+                self._clients[provider] = client
+                self._refreshing.discard(provider)
+            return client
+
+    def _refresh_in_background(self, provider):
+        with self._lock:
+            if provider in self._refreshing:
+                return
+            self._refreshing.add(provider)
+        threading.Thread(target=self._discover, args=(provider,), name=f"llm-refresh-{provider}", daemon=True).start()
+
+    def get(self, provider=None):
+        """Returns the client for `provider` (default from config); only the first call per process blocks."""
+        provider = self._provider(provider)
+        client = self._clients.get(provider)
+        if client is None:
+            with self._discovery_locks[provider]:
+                client = self._clients.get(provider)
+            return client or self._discover(provider)
+
+        if client.age() > (self.ttl if client.ready else RETRY_SECONDS):
+            self._refresh_in_background(provider)
+        return client
+
+    def prime(self, provider=None):
+        """Starts discovery in the background so the first chat does not wait for it."""
+        provider = self._provider(provider)
+        if provider not in self._clients:
+            self._refresh_in_background(provider)
+
+    def refresh(self, provider=None):
+        """Rediscovers now (e.g. after changing the API key) and returns the new client."""
+        return self._discover(self._provider(provider))
+
+    def stats(self):
+        return {provider: client.summary() for provider, client in self._clients.items()}
+
+
+LLM_CLIENTS = LLMRegistry(LLM_CONFIG)
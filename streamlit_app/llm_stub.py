@@ -0,0 +1,181 @@
+"""
+A local stand-in for the Gemini REST API, for running the AI assistant offline.
+
+Run from the repository root:
+    python streamlit_app/llm_stub.py --port 8765
+    python streamlit_app/llm_stub.py --port 8765 --latency-ms 300
+
+then point the app at it (any non-empty key is accepted):
+    GEMINI_API_KEY=stub GEMINI_API_ENDPOINT=http://127.0.0.1:8765 streamlit run streamlit_app/app.py
+
+Implements GET /v1beta/models and POST /v1beta/models/<model>:generateContent
+and :streamGenerateContent (streamed a few words at a time, as a JSON array or
+as server-sent events with ?alt=sse). Replies are canned: a JSON array when
+asked for suggested questions, otherwise an echo of the last user message.
+
+FakeGenerativeModel gives the same replies in-process with no server at all;
+the app uses it when LLM_PROVIDER=fake (or "llm" -> "provider": "fake").
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+SUGGESTIONS = [
+    "How do I treat early blight on potatoes?",
+    "What causes yellow leaves on rice?",
+    "How often should I spray neem oil?",
+    "Which wheat varieties resist rust?",
+]
+
+
+def _last_user_text(body):
+    for content in reversed(body.get("contents", [])):
+        if content.get("role", "user") == "user":
+            return " ".join(part.get("text", "") for part in content.get("parts", []))
+    return ""
+
+
+def stub_reply(body):
+    """The canned reply for a generateContent request body."""
+    text = _last_user_text(body)
+    if "JSON array" in text:
+        return json.dumps(SUGGESTIONS)
+    return f"**Stub assistant** — you asked: _{text.strip()}_\n\n- This reply comes from the local Gemini stub.\n- No network or API quota was used."
+
+
+def split_chunks(text, words=3):
+    """Splits a reply into streaming chunks of a few words, keeping the whitespace."""
+    pieces = text.split(" ")
+    return [" ".join(pieces[i:i + words]) + (" " if i + words < len(pieces) else "") for i in range(0, len(pieces), words)]
+
+
+def _response(text):
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": len(text.split()), "totalTokenCount": len(text.split())},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    models = ["models/stub-flash"]
+    latency = 0.0
+    chunk_delay = 0.05
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlparse(self.path).path.rstrip("/") != "/v1beta/models":
+            return self._send_json({"error": {"code": 404, "message": "Not found"}}, 404)
+        self._send_json({"models": [
+            {"name": name, "displayName": name.split("/")[-1], "supportedGenerationMethods": ["generateContent", "streamGenerateContent"]}
+            for name in self.models
+        ]})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        name, _, method = url.path.removeprefix("/v1beta/").partition(":")
+        if name not in self.models or method not in ("generateContent", "streamGenerateContent"):
+            return self._send_json({"error": {"code": 404, "message": f"Unknown model or method: {url.path}"}}, 404)
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.latency)
+        if method == "generateContent":
+            return self._send_json(_response(stub_reply(body)))
+
+        # Streamed body without Content-Length: the response ends when the connection closes
+        sse = "alt=sse" in url.query
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+        self.end_headers()
+        chunks = split_chunks(stub_reply(body))
+        if not sse:
+            self.wfile.write(b"[")
+        for i, chunk in enumerate(chunks):
+            payload = json.dumps(_response(chunk))
+            self.wfile.write(f"data: {payload}\r\n\r\n".encode() if sse else ((b"," if i else b"") + payload.encode()))
+            self.wfile.flush()
+            time.sleep(self.chunk_delay)
+        if not sse:
+            self.wfile.write(b"]")
+
+    def log_message(self, *args):
+        pass  # Keep the console quiet; one line per request is noise when chatting
+
+
+def start_stub_server(port=0, models=None, latency_ms=0, chunk_ms=50):
+    """Serves the stub on a background thread; returns (server, base_url). Port 0 picks a free port."""
+    handler = type("Handler", (StubHandler,), {
+        "models": list(models or StubHandler.models),
+        "latency": latency_ms / 1000,
+        "chunk_delay": chunk_ms / 1000,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ---------------- IN-PROCESS FAKE ----------------
+def _as_contents(contents):
+    """genai-style contents (a string, or [{"role", "parts"}] with string parts) as a REST body's contents."""
+    if isinstance(contents, str):
+        contents = [{"role": "user", "parts": contents}]
+    return [
+        {"role": c.get("role", "user"), "parts": [{"text": p} for p in ([c["parts"]] if isinstance(c["parts"], str) else c["parts"])]}
+        for c in contents
+    ]
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel that streams the stub's canned replies without any network."""
+
+    model_name = "models/stub-flash"
+    chunk_delay = 0.05
+
+    def __init__(self, model_name=None, system_instruction=None):
+        self.model_name = model_name or self.model_name
+        self.system_instruction = system_instruction
+
+    def _stream(self, text):
+        for chunk in split_chunks(text):
+            time.sleep(self.chunk_delay)
+            yield SimpleNamespace(text=chunk)
+
+    def generate_content(self, contents, stream=False):
+        text = stub_reply({"contents": _as_contents(contents)})
+        return self._stream(text) if stream else SimpleNamespace(text=text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Gemini API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model", action="append", dest="models", help="model name to advertise (repeatable)")
+    parser.add_argument("--latency-ms", type=int, default=0, help="delay before the first token")
+    parser.add_argument("--chunk-ms", type=int, default=50, help="delay between streamed chunks")
+    args = parser.parse_args(argv)
+
+    server, url = start_stub_server(args.port, args.models, args.latency_ms, args.chunk_ms)
+    print(f"Gemini stub listening on {url} (GEMINI_API_ENDPOINT={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
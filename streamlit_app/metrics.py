@@ -0,0 +1,166 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds (Prometheus "le" upper bounds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    # Prometheus text format: backslash, double quote and newline are escaped in label values
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}   # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+# ---------------- HOT-PATH METRICS ----------------
+STAGE_SECONDS = Histogram("agri_stage_seconds", "Time spent per pipeline stage")
+BATCH_SIZE = Histogram("agri_batch_size", "Requests coalesced per forward pass", BATCH_SIZE_BUCKETS)
+ERRORS = Counter("agri_errors_total", "Errors per pipeline stage")
+LLM_SECONDS = Histogram("agri_llm_seconds", "AI assistant time to first token and total generation time")
+
+_METRICS = [STAGE_SECONDS, BATCH_SIZE, ERRORS, LLM_SECONDS]
+
+# Callables returning [(name, type, help, {labels}, value), ...] read at scrape time,
+# so components that already keep counters (caches, schedulers) need no hooks
+_COLLECTORS = []
+
+
+def register_collector(fn):
+    _COLLECTORS.append(fn)
+    return fn
+
+
+@contextmanager
+def timed(stage, model_key="", backend=""):
+    """Records the duration of the enclosed block; failures are counted as errors."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(stage=stage, model_key=model_key, backend=backend)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, model_key=model_key, backend=backend)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _METRICS:
+        lines += metric.render()
+
+    seen = set()
+    for collector in _COLLECTORS:
+        try:
+            samples = collector()
+        except Exception:
+            continue
+        for name, metric_type, help_text, labels, value in samples:
+            if name not in seen:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(_label_key(labels))} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- HTTP ENDPOINT ----------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_SERVER = None
+_SERVER_LOCK = threading.Lock()
+
+
+def start_metrics_server(port=9464, host="127.0.0.1"):
+    """Serves /metrics on a background thread, once per process. Returns False if the port is taken."""
+    global _SERVER
+
+    with _SERVER_LOCK:
+        if _SERVER is not None:
+            return True
+        try:
+            _SERVER = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError:
+            return False
+
+        threading.Thread(target=_SERVER.serve_forever, name="metrics-server", daemon=True).start()
+        return True
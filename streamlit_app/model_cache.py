@@ -0,0 +1,131 @@
+import gc
+import threading
+from collections import OrderedDict
+
+MB = 1024 * 1024
+
+
+def estimate_model_bytes(model, model_type):
+    """Estimates the resident size of a model from its parameter count."""
+
+    # Exported runtimes (ONNX, ...) report their artifact size
+    if hasattr(model, "size_bytes"):
+        return model.size_bytes
+
+    if model_type == "tensorflow":
+        # Keras models are fp32 unless configured otherwise
+        return int(model.count_params()) * 4
+
+    elif model_type == "torch":
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    return 0
+
+
+class ModelCache:
+    """
+    LRU cache of loaded models bounded by a RAM budget.
+    Footprints are estimated from parameter counts (times `overhead_factor` for
+    graph/runtime overhead). When the budget is exceeded the least recently used
+    model that is not pinned is evicted.
+    """
+
+    def __init__(self, loader, ram_budget_mb=None, pinned=(), overhead_factor=1.0):
+        self._loader = loader
+        self.budget_bytes = int(ram_budget_mb * MB) if ram_budget_mb else None
+        self.overhead_factor = overhead_factor
+        self.pinned = set(pinned)
+
+        self._entries = OrderedDict()   # model_key -> (model, model_type, size_bytes)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_key):
+        """Returns (model, model_type), loading and caching the model on a miss."""
+        with self._lock:
+            if model_key in self._entries:
+                self._entries.move_to_end(model_key)
+                self.hits += 1
+                model, model_type, _ = self._entries[model_key]
+                return model, model_type
+            load_lock = self._load_locks.setdefault(model_key, threading.Lock())
+
+        # Load outside the cache lock so other models stay available meanwhile
+        with load_lock:
+            with self._lock:
+                if model_key in self._entries:
+                    self._entries.move_to_end(model_key)
+                    self.hits += 1
+                    model, model_type, _ = self._entries[model_key]
+                    return model, model_type
+                self.misses += 1
+
+            model, model_type = self._loader(model_key)
+
+            # Failed loads are not cached so the next request retries
+            if model is None:
+                return model, model_type
+
+            size = int(estimate_model_bytes(model, model_type) * self.overhead_factor)
+
+            with self._lock:
+                self._entries[model_key] = (model, model_type, size)
+                self._evict_over_budget(keep=model_key)
+
+        return model, model_type
+
+    def _evict_over_budget(self, keep):
+        if self.budget_bytes is None:
+            return
+
+        evicted = False
+        for key in list(self._entries.keys()):
+            if self.used_bytes() <= self.budget_bytes:
+                break
+            if key == keep or key in self.pinned:
+                continue
+            del self._entries[key]
+            self.evictions += 1
+            evicted = True
+
+        if evicted:
+            gc.collect()
+
+    def used_bytes(self):
+        return sum(size for _, _, size in self._entries.values())
+
+    def pin(self, model_key):
+        with self._lock:
+            self.pinned.add(model_key)
+
+    def unpin(self, model_key):
+        with self._lock:
+            self.pinned.discard(model_key)
+            self._evict_over_budget(keep=None)
+
+    def discard(self, model_key):
+        """Drops one model (e.g. after its config entry changed)."""
+        with self._lock:
+            self._entries.pop(model_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        gc.collect()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "used_mb": round(self.used_bytes() / MB, 1),
+                "budget_mb": round(self.budget_bytes / MB, 1) if self.budget_bytes else None,
+                "pinned": sorted(self.pinned),
+                "loaded": {key: round(size / MB, 1) for key, (_, _, size) in self._entries.items()},
+            }
@@ -1,55 +1,181 @@
 import streamlit as st
-import tensorflow as tf
-import torch
-import timm
+import numpy as np
 import os
-import json
-from tensorflow.keras.applications import EfficientNetB0
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D
-from tensorflow.keras.models import Model
 
-# Load config
-CONFIG_PATH = os.path.join("config", "model_config.json")
-with open(CONFIG_PATH, "r") as f:
-    CONFIG = json.load(f)
+from backends import get_backend
+from model_cache import ModelCache
+from runtimes import CompiledModel, OnnxModel, TFLiteModel, TorchScriptModel
+from metrics import register_collector
+from registry import REGISTRY
 
+# RAM budget / pinning for loaded models (see "inference" -> "model_cache"); read once at import
+CACHE_CONFIG = REGISTRY.section("inference", "model_cache")
 
-@st.cache_resource
-def load_model(model_key):
-    """Loads TensorFlow or PyTorch model based on config."""
 
-    if model_key not in CONFIG["models"]:
+def default_batch_size():
+    """Chunk size for bulk scoring ("inference" -> "batch_size"), read on each call."""
+    return REGISTRY.section("inference").get("batch_size", 32)
+
+
+def onnx_path(model_key):
+    """Path of a model's ONNX export (written by export_onnx.py)."""
+    info = REGISTRY.spec(model_key).info
+    return os.path.join("models", info.get("onnx_file", f"{model_key}.onnx"))
+
+
+def serving_backend(model_key):
+    """Name of the runtime a model is served from, e.g. 'tensorflow', 'onnx', 'torch-int8_static'."""
+    spec = REGISTRY.spec(model_key)
+    if spec.backend:
+        return spec.backend
+
+    if spec.variant != "fp32":
+        return f"{spec.type}-{spec.variant}"
+    return spec.type
+
+
+def model_version(model_key):
+    """
+    Identifies the weights a model is served from: the entry's "version" if set,
+    otherwise the serving backend plus the artifact's size and mtime.
+    """
+    spec = REGISTRY.spec(model_key)
+    if "version" in spec.info:
+        return str(spec.info["version"])
+
+    backend = serving_backend(model_key)
+    if backend == "onnx":
+        path = onnx_path(model_key)
+    elif backend == "tflite":
+        path = tflite_path(model_key, spec.info.get("tflite_precision", "float16"))
+    elif backend != spec.type:
+        path = quantized_path(model_key, spec.variant)
+    else:
+        path = os.path.join("models", spec.file)
+
+    try:
+        stat = os.stat(path)
+        return f"{backend}-{stat.st_size}-{int(stat.st_mtime)}"
+    except OSError:
+        return backend
+
+
+def tflite_path(model_key, precision):
+    """
+    Path of a model's TFLite flatbuffer (written by convert_tflite.py).
+    An entry's "tflite_file" holds its "tflite_precision" build only, so the
+    other precision cannot overwrite it.
+    """
+    info = REGISTRY.spec(model_key).info
+    if "tflite_file" not in info:
+        return os.path.join("models", f"{model_key}.{precision}.tflite")
+
+    served = info.get("tflite_precision", "float16")
+    if precision != served:
+        raise ValueError(f'"tflite_file" of \'{model_key}\' is its {served} model; cannot use it for {precision}')
+    return os.path.join("models", info["tflite_file"])
+
+
+def quantized_path(model_key, variant):
+    """Path of a model's quantized TorchScript variant (written by quantize.py)."""
+    info = REGISTRY.spec(model_key).info
+    return os.path.join("models", info.get("quantized_file", f"{model_key}.{variant}.pt"))
+
+
+def pumpkin_wheat_model(tfb, spec):
+    """The pumpkin_wheat architecture (EfficientNetB0 + softmax head); its file holds weights only."""
+    base_model = tfb.EfficientNetB0(
+        include_top=False,
+        weights=None,
+        input_shape=spec.input_size + (3,)
+    )
+
+    x = base_model.output
+    x = tfb.GlobalAveragePooling2D()(x)
+    output = tfb.Dense(
+        spec.num_classes,
+        activation="softmax"
+    )(x)
+
+    return tfb.Model(inputs=base_model.input, outputs=output)
+
+
+def _build_model(model_key):
+    """Loads the model an entry is served from: its ONNX/TFLite/INT8 artifact, or the source model."""
+
+    if model_key not in REGISTRY:
+        st.error(f"Model key '{model_key}' not found in config")
+        return None, None
+
+    spec = REGISTRY.spec(model_key)
+    info = spec.info
+    model_type = spec.type
+
+    # ---------------- ONNX RUNTIME ----------------
+    # model_type still selects the preprocessing; only execution moves to ONNX
+    if spec.backend == "onnx":
+        try:
+            model = OnnxModel(onnx_path(model_key), num_threads=info.get("num_threads"))
+            return model, model_type
+
+        except Exception as e:
+            st.error(f"Error loading ONNX model: {e}")
+            return None, model_type
+
+    # ---------------- TFLITE ----------------
+    if spec.backend == "tflite":
+        try:
+            precision = info.get("tflite_precision", "float16")
+            model = TFLiteModel(tflite_path(model_key, precision), num_threads=info.get("num_threads"))
+            return model, model_type
+
+        except Exception as e:
+            st.error(f"Error loading TFLite model: {e}")
+            return None, model_type
+
+    # ---------------- QUANTIZED (INT8) ----------------
+    variant = spec.variant
+    if model_type == "torch" and variant != "fp32":
+        try:
+            model = TorchScriptModel(quantized_path(model_key, variant))
+            return model, model_type
+
+        except Exception as e:
+            st.error(f"Error loading {variant} model: {e}")
+            return None, model_type
+
+    return _build_source_model(model_key)
+
+
+def _build_source_model(model_key):
+    """
+    Loads the fp32 TensorFlow or PyTorch model from the entry's "file",
+    ignoring "backend" and "variant". The export and quantization scripts read
+    from this, since the served artifact is what they write.
+    """
+
+    if model_key not in REGISTRY:
         st.error(f"Model key '{model_key}' not found in config")
         return None, None
 
-    info = CONFIG["models"][model_key]
-    model_path = os.path.join("models", info["file"])
-    model_type = info["type"]
+    spec = REGISTRY.spec(model_key)
+    model_path = os.path.join("models", spec.file)
+    model_type = spec.type
+    num_classes = spec.num_classes
 
     # ---------------- TENSORFLOW ----------------
     if model_type == "tensorflow":
         try:
+            tfb = get_backend("tensorflow")
+
             # Special architecture case
             if model_key == "pumpkin_wheat":
-                base_model = EfficientNetB0(
-                    include_top=False,
-                    weights=None,
-                    input_shape=(224, 224, 3)
-                )
-
-                x = base_model.output
-                x = GlobalAveragePooling2D()(x)
-                output = Dense(
-                    info["num_classes"],
-                    activation="softmax"
-                )(x)
-
-                model = Model(inputs=base_model.input, outputs=output)
+                model = pumpkin_wheat_model(tfb, spec)
                 model.load_weights(model_path)
                 return model, model_type
 
             # Normal TF models
-            model = tf.keras.models.load_model(model_path)
+            model = tfb.tf.keras.models.load_model(model_path)
             return model, model_type
 
         except Exception as e:
@@ -59,10 +185,13 @@ def load_model(model_key):
     # ---------------- PYTORCH ----------------
     elif model_type == "torch":
         try:
+            torch = get_backend("torch").torch
+            timm = get_backend("torch").timm
+
             model = timm.create_model(
-                info["architecture"],
+                spec.architecture,
                 pretrained=False,
-                num_classes=info.get("num_classes", 17)
+                num_classes=num_classes
             )
 
             checkpoint = torch.load(model_path, map_location="cpu")
@@ -82,13 +211,94 @@ def load_model(model_key):
             return None, model_type
 
 
+MODEL_CACHE = ModelCache(
+    _build_model,
+    ram_budget_mb=CACHE_CONFIG.get("ram_budget_mb"),
+    pinned=CACHE_CONFIG.get("pinned", []),
+    overhead_factor=CACHE_CONFIG.get("overhead_factor", 1.0)
+)
+
+
+@REGISTRY.on_reload
+def _drop_changed_models(changed):
+    for key in changed:
+        MODEL_CACHE.discard(key)
+
+
+@register_collector
+def _model_cache_metrics():
+    stats = MODEL_CACHE.stats()
+    help_text = "Cache lookups by cache and result"
+    return [
+        ("agri_cache_requests_total", "counter", help_text, {"cache": "model", "result": "hit"}, stats["hits"]),
+        ("agri_cache_requests_total", "counter", help_text, {"cache": "model", "result": "miss"}, stats["misses"]),
+        ("agri_model_cache_evictions_total", "counter", "Models evicted from the LRU cache", {}, stats["evictions"]),
+        ("agri_model_cache_used_mb", "gauge", "Estimated RAM held by cached models", {}, stats["used_mb"]),
+    ]
+
+
+def load_model(model_key):
+    """Returns (model, model_type) from the shared LRU model cache, loading on a miss."""
+    return MODEL_CACHE.get(model_key)
+
+
 def predict_image(model, model_type, processed_image):
     """Runs prediction and returns probability array."""
 
+    if isinstance(model, CompiledModel):
+        return model.run_batch(processed_image)
+
     if model_type == "tensorflow":
         return model.predict(processed_image)
 
     elif model_type == "torch":
+        return _run_batch(model, model_type, processed_image)
+
+
+def _run_batch(model, model_type, batch):
+    """Runs one forward pass over an already stacked batch."""
+
+    if isinstance(model, CompiledModel):
+        return model.run_batch(batch)
+
+    if model_type == "tensorflow":
+        # predict_on_batch skips the per-call dataset/callback setup of predict()
+        return np.asarray(model.predict_on_batch(batch))
+
+    elif model_type == "torch":
+        torch = get_backend("torch").torch
+        if isinstance(batch, np.ndarray):
+            # Batches stay NumPy until here, in the process that owns the model
+            batch = torch.from_numpy(batch)
         with torch.no_grad():
-            outputs = model(processed_image)
+            outputs = model(batch)
             return torch.softmax(outputs, dim=1).cpu().numpy()
+
+
+def predict_batch(model_key, images, batch_size=None):
+    """
+    Scores many PIL images with one model.
+    Images are preprocessed, stacked into chunks of `batch_size` and run
+    through the model once per chunk. Returns an array of shape
+    (len(images), num_classes) with one probability row per image.
+    """
+    from preprocess import preprocess_batch
+
+    model, model_type = load_model(model_key)
+    if model is None:
+        raise RuntimeError(f"Model '{model_key}' failed to load")
+
+    batch_size = batch_size or default_batch_size()
+    images = list(images)
+    rows = []
+
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+
+        batch = preprocess_batch(chunk, model_type=model_type, model_key=model_key)
+        rows.append(_run_batch(model, model_type, batch))
+
+    if not rows:
+        return np.empty((0, REGISTRY.spec(model_key).num_classes), dtype=np.float32)
+
+    return np.concatenate(rows, axis=0)
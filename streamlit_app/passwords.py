@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from passlib.hash import pbkdf2_sha256
+
+from registry import REGISTRY
+
+# Cost parameters live in the "auth" section of model_config.json
+AUTH_CONFIG = REGISTRY.section("auth")
+PBKDF2_ROUNDS = AUTH_CONFIG.get("pbkdf2_rounds", 29000)
+HASH_WORKERS = AUTH_CONFIG.get("hash_workers", 4)
+MAX_PENDING = AUTH_CONFIG.get("max_pending_hashes", 64)
+HASH_TIMEOUT = AUTH_CONFIG.get("hash_timeout_seconds", 10)
+
+HASHER = pbkdf2_sha256.using(rounds=PBKDF2_ROUNDS)
+
+
+class HashPoolBusy(RuntimeError):
+    """Raised when more password hashes are queued than the pool accepts, or one waits too long."""
+
+
+# PBKDF2 runs in hashlib's C code with the GIL released, so a thread pool spreads it across cores
+# and keeps it off the Streamlit script threads; the semaphore bounds the backlog at peak
+_EXECUTOR = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pbkdf2")
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+
+
+def _submit(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HashPoolBusy("Too many logins in progress, please try again in a moment.")
+    try:
+        future = _EXECUTOR.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def _result(future, timeout):
+    try:
+        return future.result(timeout)
+    except FutureTimeout:
+        # The hash keeps its slot until it finishes, so the backlog limit still holds
+        raise HashPoolBusy("Login is taking longer than usual, please try again in a moment.") from None
+
+
+def _verify(password, hashed):
+    ok = pbkdf2_sha256.verify(password, hashed)
+    return ok, ok and pbkdf2_sha256.from_string(hashed).rounds != PBKDF2_ROUNDS
+
+
+def hash_password(password, timeout=HASH_TIMEOUT):
+    """Hashes a password on the pool with the configured rounds. Raises HashPoolBusy when saturated or slow."""
+    return _result(_submit(HASHER.hash, password), timeout)
+
+
+def verify_password(password, hashed, timeout=HASH_TIMEOUT):
+    """
+    Verifies a password on the pool. Returns (ok, needs_rehash); needs_rehash is
+    True when the stored hash was made with a different round count.
+    Raises HashPoolBusy when saturated or slow.
+    """
+    return _result(_submit(_verify, password, hashed), timeout)
+
+
+def hash_many(passwords, workers=None):
+    """Hashes a batch of passwords in parallel (bulk import); bypasses the login backlog limit."""
+    with ThreadPoolExecutor(max_workers=workers or HASH_WORKERS, thread_name_prefix="pbkdf2-bulk") as executor:
+        return list(executor.map(HASHER.hash, passwords))
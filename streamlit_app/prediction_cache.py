@@ -0,0 +1,163 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import db
+from model_loader import model_version
+from metrics import register_collector
+from registry import REGISTRY
+
+# Cache policy (see "inference" -> "prediction_cache" in config); read once at import
+PREDICTION_CACHE_CONFIG = REGISTRY.section("inference", "prediction_cache")
+
+DISK_MIGRATIONS = [
+    (1, "prediction cache table", [
+        '''
+            CREATE TABLE IF NOT EXISTS predictions (
+                cache_key TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                shape TEXT NOT NULL,
+                probs BLOB NOT NULL
+            )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_predictions_created ON predictions (created_at)",
+    ]),
+]
+
+
+def image_hash(image_bytes):
+    """Content hash of the uploaded file bytes."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class PredictionCache:
+    """
+    Caches probability arrays keyed by (image hash, model_key, model version).
+    An in-memory LRU tier sits in front of an optional SQLite tier that survives
+    restarts. Both tiers honour `ttl_seconds`; each has its own size limit.
+    """
+
+    def __init__(self, memory_entries=256, ttl_seconds=None, sqlite_path=None, max_disk_entries=10000):
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_path = sqlite_path
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()   # key -> (created_at, predictions)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.sqlite_path:
+            self._init_disk()
+
+    # ---------------- SQLITE TIER ----------------
+    def _init_disk(self):
+        db.migrate(self.sqlite_path, DISK_MIGRATIONS)
+
+    def _disk_get(self, key):
+        rows = db.query(
+            "SELECT created_at, shape, probs FROM predictions WHERE cache_key = ?", (key,),
+            path=self.sqlite_path
+        )
+        if not rows:
+            return None
+
+        created_at, shape, blob = rows[0]
+        shape = tuple(int(d) for d in shape.split(","))
+        return created_at, np.frombuffer(blob, dtype=np.float32).reshape(shape)
+
+    def _disk_put(self, key, created_at, predictions):
+        with db.transaction(self.sqlite_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO predictions (cache_key, created_at, shape, probs) VALUES (?, ?, ?, ?)",
+                (key, created_at, ",".join(str(d) for d in predictions.shape), predictions.tobytes())
+            )
+
+            # Enforce TTL and size limits on write instead of in a background job
+            if self.ttl_seconds:
+                conn.execute("DELETE FROM predictions WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            conn.execute('''
+                DELETE FROM predictions WHERE cache_key IN (
+                    SELECT cache_key FROM predictions ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_disk_entries,))
+
+    # ---------------- PUBLIC API ----------------
+    def _expired(self, created_at):
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def make_key(self, image_bytes, model_key):
+        return f"{image_hash(image_bytes)}:{model_key}:{model_version(model_key)}"
+
+    def get(self, image_bytes, model_key):
+        """Returns cached predictions for these bytes and model, or None."""
+        key = self.make_key(image_bytes, model_key)
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        if self.sqlite_path:
+            entry = self._disk_get(key)
+            if entry is not None and not self._expired(entry[0]):
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, *entry)
+                return entry[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, image_bytes, model_key, predictions):
+        key = self.make_key(image_bytes, model_key)
+        predictions = np.asarray(predictions, dtype=np.float32)
+        created_at = time.time()
+
+        with self._lock:
+            self._remember(key, created_at, predictions)
+
+        if self.sqlite_path:
+            self._disk_put(key, created_at, predictions)
+
+    def _remember(self, key, created_at, predictions):
+        self._memory[key] = (created_at, predictions)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+            }
+
+
+PREDICTION_CACHE = PredictionCache(
+    memory_entries=PREDICTION_CACHE_CONFIG.get("memory_entries", 256),
+    ttl_seconds=PREDICTION_CACHE_CONFIG.get("ttl_seconds"),
+    sqlite_path=PREDICTION_CACHE_CONFIG.get("sqlite_path"),
+    max_disk_entries=PREDICTION_CACHE_CONFIG.get("max_disk_entries", 10000)
+)
+
+
+@register_collector
+def _prediction_cache_metrics():
+    stats = PREDICTION_CACHE.stats()
+    help_text = "Cache lookups by cache and result"
+    return [
+        ("agri_cache_requests_total", "counter", help_text, {"cache": "prediction", "result": "hit"}, stats["memory_hits"]),
+        ("agri_cache_requests_total", "counter", help_text, {"cache": "prediction", "result": "disk_hit"}, stats["disk_hits"]),
+        ("agri_cache_requests_total", "counter", help_text, {"cache": "prediction", "result": "miss"}, stats["misses"]),
+    ]
@@ -1,12 +1,129 @@
+import threading
+
 import numpy as np
 from PIL import Image
-import tensorflow as tf
-import torch
-from torchvision import transforms
 
-# TensorFlow preprocessors
-from tensorflow.keras.applications.resnet50 import preprocess_input as resnet_preprocess
-from tensorflow.keras.applications.efficientnet import preprocess_input as effnet_preprocess
+from registry import REGISTRY
+
+# Keras "caffe" mode (ResNet50): BGR channel order, ImageNet means subtracted
+CAFFE_MEAN_BGR = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+# torchvision ToTensor + Normalize folded into one multiply and one subtract
+TORCH_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+TORCH_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+TORCH_SCALE = (1.0 / (255.0 * TORCH_STD)).reshape(1, 3, 1, 1)
+TORCH_SHIFT = (TORCH_MEAN / TORCH_STD).reshape(1, 3, 1, 1)
+
+
+def preprocessing_family(model_type, model_key=None):
+    """Returns 'torch', 'effnet' or 'resnet' for a model (from its "preprocessing" in config)."""
+    if model_key in REGISTRY:
+        return REGISTRY.spec(model_key).preprocessing
+    return "torch" if model_type == "torch" else "resnet"
+
+
+class _StagingPool:
+    """
+    uint8 staging buffers shared by every thread, keyed by image size.
+    A buffer is checked out for one call and returned afterwards, so
+    concurrent sessions never share one; at most `max_idle` are kept per size.
+    """
+
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self._free = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, n, height, width):
+        with self._lock:
+            free = self._free.get((height, width), [])
+            for i, buffer in enumerate(free):
+                if len(buffer) >= n:
+                    return free.pop(i)
+        return np.empty((n, height, width, 3), dtype=np.uint8)
+
+    def release(self, buffer):
+        key = buffer.shape[1:3]
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            if len(free) < self.max_idle:
+                free.append(buffer)
+            else:
+                # Keep the largest buffers, so big batches do not reallocate
+                smallest = min(range(len(free)), key=lambda i: len(free[i]))
+                if len(free[smallest]) < len(buffer):
+                    free[smallest] = buffer
+
+
+_STAGING = _StagingPool()
+
+
+class PreprocessEngine:
+    """
+    Converts, resizes and normalizes whole batches of PIL images with NumPy.
+    Images are resized into a pooled uint8 staging buffer and normalized in one
+    pass into a newly allocated float32 batch, which the caller owns.
+    Output is NHWC for the Keras families and NCHW for torch.
+    """
+
+    def __init__(self, family, target_size=(224, 224)):
+        self.family = family
+        self.target_size = tuple(target_size)
+
+    def process(self, images):
+        """Returns a float32 batch for `images`."""
+        n = len(images)
+        w, h = self.target_size
+        buffer = _STAGING.acquire(n, h, w)
+        try:
+            stage = buffer[:n]
+
+            # 1. Ensure RGB + 2. Resize, written straight into the staging buffer
+            for i, image in enumerate(images):
+                if image.mode != "RGB":
+                    image = image.convert("RGB")
+                if image.size != self.target_size:
+                    image = image.resize(self.target_size)
+                stage[i] = np.asarray(image)
+
+            # 3. Normalize the whole batch straight into the output
+            if self.family == "torch":
+                out = np.empty((n, 3, h, w), dtype=np.float32)
+                np.multiply(stage.transpose(0, 3, 1, 2), TORCH_SCALE, out=out)
+                np.subtract(out, TORCH_SHIFT, out=out)
+            elif self.family == "resnet":
+                out = np.empty((n, h, w, 3), dtype=np.float32)
+                np.subtract(stage[..., ::-1], CAFFE_MEAN_BGR, out=out)
+            else:
+                out = stage.astype(np.float32)
+        finally:
+            _STAGING.release(buffer)
+
+        return out
+
+
+# Engines keep no per-call state, so one per (family, size) is shared by every thread
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_engine(family, target_size=(224, 224)):
+    key = (family, tuple(target_size))
+    with _ENGINES_LOCK:
+        if key not in _ENGINES:
+            _ENGINES[key] = PreprocessEngine(family, target_size)
+        return _ENGINES[key]
+
+
+def preprocess_batch(images, model_type="tensorflow", target_size=(224, 224), model_key=None):
+    """
+    Prepares a list of images for one forward pass.
+    Returns a float32 NumPy array owned by the caller: NHWC for TensorFlow,
+    NCHW for torch. It stays NumPy so a UI process whose models run in worker
+    processes never imports torch; _run_batch wraps it in a tensor without copying.
+    """
+    engine = get_engine(preprocessing_family(model_type, model_key), target_size)
+    return engine.process(images)
 
 
 def preprocess_image(image, model_type="tensorflow", target_size=(224, 224), model_key=None):
@@ -14,38 +131,4 @@ def preprocess_image(image, model_type="tensorflow", target_size=(224, 224), mod
     Prepares an image for prediction.
     Chooses preprocessing based on model_key.
     """
-
-    # 1. Ensure RGB
-    if image.mode != "RGB":
-        image = image.convert("RGB")
-
-    # 2. Resize
-    image = image.resize(target_size)
-
-    # ---------------- TENSORFLOW ----------------
-    if model_type == "tensorflow":
-        img_array = np.array(image)
-        img_array = np.expand_dims(img_array, axis=0)
-
-        # EfficientNet-based models
-        if model_key in ["corn_blackgram", "pumpkin_wheat"]:
-            img_array = effnet_preprocess(img_array)
-
-        # Default: ResNet-based models
-        else:
-            img_array = resnet_preprocess(img_array)
-
-        return img_array
-
-    # ---------------- PYTORCH ----------------
-    elif model_type == "torch":
-        transform = transforms.Compose([
-            transforms.Resize(target_size),
-            transforms.ToTensor(),
-            transforms.Normalize(
-                mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225]
-            )
-        ])
-        img_tensor = transform(image).unsqueeze(0)
-        return img_tensor
+    return preprocess_batch([image], model_type=model_type, target_size=target_size, model_key=model_key)
@@ -0,0 +1,231 @@
+"""
+Builds INT8 variants of the torch (timm) models, e.g. cotton_tomato.
+
+Run from the repository root:
+    python streamlit_app/quantize.py --mode dynamic
+    python streamlit_app/quantize.py --mode static --calib-dir data/calibration
+
+The quantized model is saved as TorchScript to models/<model_key>.int8_<mode>.pt
+(or the entry's "quantized_file"). Set "variant": "int8_dynamic" / "int8_static"
+on the model entry to serve it. A report compares it with the fp32 model:
+latency, file size, top-1 agreement and, when the evaluation images sit in
+folders named after the model's labels, top-1 accuracy.
+
+Dynamic mode only quantizes nn.Linear layers. For efficientnet_b3 that is
+just the classifier head; every convolution stays fp32, so expect a small
+size reduction and little speedup. Static mode quantizes the convolutions too
+and needs calibration images.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+from PIL import Image
+
+from backends import get_backend
+from model_loader import _build_source_model, quantized_path
+from preprocess import preprocess_batch
+from registry import REGISTRY
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def load_folder(folder, model_key, limit=None):
+    """
+    Preprocesses up to `limit` images from a folder into one torch batch.
+    Returns (batch, targets); targets holds the label index of each image's
+    parent folder, or is None unless every folder names one of the model's labels.
+    """
+    spec = REGISTRY.spec(model_key)
+    size = spec.input_size[0]
+
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(folder)
+        for name in files
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )[:limit]
+
+    if not paths:
+        raise ValueError(f"No images found in {folder}")
+
+    batch = preprocess_batch(
+        [Image.open(p) for p in paths],
+        model_type="torch",
+        target_size=(size, size),
+        model_key=model_key
+    )
+
+    torch = get_backend("torch").torch
+    batch = torch.from_numpy(batch)
+
+    folders = [os.path.basename(os.path.dirname(p)) for p in paths]
+    if not all(name in spec.labels for name in folders):
+        return batch, None
+    return batch, torch.tensor([spec.labels.index(name) for name in folders])
+
+
+def _set_engine(torch):
+    engines = torch.backends.quantized.supported_engines
+    torch.backends.quantized.engine = "x86" if "x86" in engines else "fbgemm"
+
+
+def _quantized_layer_types(mode):
+    torch = get_backend("torch").torch
+    if mode == "dynamic":
+        return (torch.nn.Linear,)
+    return (torch.nn.Conv2d, torch.nn.Linear)
+
+
+def quantize_dynamic(model):
+    """
+    INT8 weights for Linear layers, activations quantized on the fly.
+    Convolutions are left in fp32, so on a CNN this covers the classifier head only.
+    """
+    torch = get_backend("torch").torch
+    return torch.ao.quantization.quantize_dynamic(model, set(_quantized_layer_types("dynamic")), dtype=torch.qint8)
+
+
+def quantized_weight_fraction(model, mode):
+    """Share of the fp32 model's parameters held by the layers `mode` quantizes."""
+    layer_types = _quantized_layer_types(mode)
+    total = sum(p.numel() for p in model.parameters())
+    covered = sum(
+        p.numel()
+        for module in model.modules() if isinstance(module, layer_types)
+        for p in module.parameters(recurse=False)
+    )
+    return covered / total if total else 0.0
+
+
+def quantize_static(model, calib_batch, batch_size=16):
+    """Post-training static quantization (FX graph mode) calibrated on `calib_batch`."""
+    torch = get_backend("torch").torch
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    prepared = prepare_fx(model, qconfig_mapping, example_inputs=(calib_batch[:1],))
+
+    with torch.no_grad():
+        for start in range(0, len(calib_batch), batch_size):
+            prepared(calib_batch[start:start + batch_size])
+
+    return convert_fx(prepared)
+
+
+def _latency_ms(model, batch, repeats):
+    torch = get_backend("torch").torch
+    with torch.no_grad():
+        model(batch)  # warm-up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model(batch)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def _size_mb(module):
+    torch = get_backend("torch").torch
+    buffer = io.BytesIO()
+    torch.jit.save(module, buffer)
+    return buffer.tell() / 1e6
+
+
+def report(fp32, int8, eval_batch, targets=None, repeats=10):
+    """Latency, size, top-1 agreement and (given `targets`) accuracy of the INT8 model against fp32."""
+    torch = get_backend("torch").torch
+
+    with torch.no_grad():
+        fp32_top1 = fp32(eval_batch).argmax(dim=1)
+        int8_top1 = int8(eval_batch).argmax(dim=1)
+
+    example = eval_batch[:1]
+    fp32_ms = _latency_ms(fp32, example, repeats)
+    int8_ms = _latency_ms(int8, example, repeats)
+    fp32_mb = _size_mb(torch.jit.trace(fp32, example))
+    int8_mb = _size_mb(int8)
+
+    results = {
+        "fp32_latency_ms": round(fp32_ms, 2),
+        "int8_latency_ms": round(int8_ms, 2),
+        "latency_delta_ms": round(int8_ms - fp32_ms, 2),
+        "speedup": round(fp32_ms / int8_ms, 2),
+        "fp32_size_mb": round(fp32_mb, 2),
+        "int8_size_mb": round(int8_mb, 2),
+        "size_reduction": round(1 - int8_mb / fp32_mb, 3),
+        "top1_agreement": float((fp32_top1 == int8_top1).float().mean()),
+        "eval_images": len(eval_batch),
+    }
+    if targets is not None:
+        fp32_acc = float((fp32_top1 == targets).float().mean())
+        int8_acc = float((int8_top1 == targets).float().mean())
+        results.update(
+            fp32_top1_accuracy=round(fp32_acc, 4),
+            int8_top1_accuracy=round(int8_acc, 4),
+            accuracy_delta=round(int8_acc - fp32_acc, 4),
+        )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quantize a torch model to INT8")
+    parser.add_argument("--model", default="cotton_tomato")
+    parser.add_argument("--mode", choices=["dynamic", "static"], default="dynamic")
+    parser.add_argument("--calib-dir", help="folder of leaf images for static calibration")
+    parser.add_argument("--eval-dir", help="folder of images for the agreement check (default: calib-dir)")
+    parser.add_argument("--num-calib", type=int, default=200)
+    parser.add_argument("--num-eval", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    torch = get_backend("torch").torch
+    _set_engine(torch)
+
+    spec = REGISTRY.spec(args.model)
+    if spec.type != "torch":
+        parser.error(f"'{args.model}' is not a torch model")
+    if args.mode == "static" and not args.calib_dir:
+        parser.error("--calib-dir is required for static quantization")
+
+    # Always the fp32 weights in "file", even once the entry serves an INT8 variant
+    fp32, _ = _build_source_model(args.model)
+    if fp32 is None:
+        print(f"Model '{args.model}' failed to load")
+        return 1
+
+    size = spec.input_size[0]
+    eval_dir = args.eval_dir or args.calib_dir
+    if eval_dir:
+        eval_batch, targets = load_folder(eval_dir, args.model, args.num_eval)
+    else:
+        # No images given: agreement on random inputs is only a smoke test
+        eval_batch, targets = torch.randn(16, 3, size, size), None
+
+    coverage = quantized_weight_fraction(fp32, args.mode)
+    if args.mode == "dynamic":
+        print(
+            f"Note: dynamic mode quantizes Linear layers only ({coverage:.1%} of the weights, "
+            "the classifier head); convolutions stay fp32. Use --mode static to quantize them."
+        )
+        int8 = quantize_dynamic(fp32)
+    else:
+        int8 = quantize_static(fp32, load_folder(args.calib_dir, args.model, args.num_calib)[0])
+
+    int8 = torch.jit.trace(int8.eval(), eval_batch[:1])
+    variant = f"int8_{args.mode}"
+    path = quantized_path(args.model, variant)
+    torch.jit.save(int8, path)
+
+    print(f"Saved {variant} model to {path}")
+    print(f"  quantized_weight_fraction: {coverage:.3f}")
+    for key, value in report(fp32, int8, eval_batch, targets).items():
+        print(f"  {key}: {value}")
+    if targets is None:
+        print("  (no accuracy: name the evaluation folders after the model's labels to measure it)")
+    print(f'Set "variant": "{variant}" on "{args.model}" in config/model_config.json to serve it.')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import time
+
+CONFIG_PATH = os.path.join("config", "model_config.json")
+
+MODEL_TYPES = ("tensorflow", "torch")
+BACKENDS = ("onnx", "tflite")
+VARIANTS = ("fp32", "int8_dynamic", "int8_static")
+PREPROCESSING = ("resnet", "effnet", "torch")
+
+# Architecture assumed for Keras entries that do not name one
+DEFAULT_ARCHITECTURES = {"resnet": "resnet50", "effnet": "efficientnetb0"}
+
+
+class ConfigError(ValueError):
+    """Raised when model_config.json does not match the expected schema."""
+
+
+class ModelSpec:
+    """Validated, precomputed view of one entry under "models"."""
+
+    def __init__(self, key, info):
+        self.key = key
+        self.info = info
+        self.type = info["type"]
+        self.file = info["file"]
+        self.backend = info.get("backend")
+        self.variant = info.get("variant", "fp32")
+
+        # Labels as a list indexed by class id (config keys are "0", "1", ...)
+        self.labels = [info["classes"][str(i)] for i in range(len(info["classes"]))]
+        self.num_classes = info.get("num_classes", len(self.labels))
+
+        size = info.get("img_size", 224)
+        self.input_size = (size, size)
+
+        if "preprocessing" in info:
+            self.preprocessing = info["preprocessing"]
+        else:
+            self.preprocessing = "torch" if self.type == "torch" else "resnet"
+
+        self.architecture = info.get("architecture", DEFAULT_ARCHITECTURES.get(self.preprocessing))
+
+    def label(self, index):
+        index = int(index)
+        return self.labels[index] if 0 <= index < len(self.labels) else f"Class {index}"
+
+    def label_scores(self, probs):
+        """
+        (label, probability) per distinct label, most likely first. Outputs that
+        share a label (e.g. corn_blackgram's two "Blackgram LeafCrinckle") are summed.
+        """
+        scores = {}
+        for i, p in enumerate(probs):
+            label = self.label(i)
+            scores[label] = scores.get(label, 0.0) + float(p)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def validate(config):
+    """Returns a list of schema problems (empty when the config is valid)."""
+    if not isinstance(config, dict):
+        return ["the config must be a JSON object"]
+
+    problems = []
+    models = config.get("models")
+
+    if not isinstance(models, dict) or not models:
+        return ['"models" must be a non-empty object']
+
+    for key, info in models.items():
+        where = f'models.{key}'
+        if not isinstance(info, dict):
+            problems.append(f"{where} must be an object")
+            continue
+
+        for field in ("file", "type", "classes"):
+            if field not in info:
+                problems.append(f'{where}: missing "{field}"')
+
+        if info.get("type") not in MODEL_TYPES:
+            problems.append(f'{where}: "type" must be one of {MODEL_TYPES}')
+        if info.get("type") == "torch" and "architecture" not in info:
+            problems.append(f'{where}: torch models need an "architecture"')
+        if info.get("backend") is not None and info["backend"] not in BACKENDS:
+            problems.append(f'{where}: "backend" must be one of {BACKENDS}')
+        if info.get("variant", "fp32") not in VARIANTS:
+            problems.append(f'{where}: "variant" must be one of {VARIANTS}')
+        if "preprocessing" in info and info["preprocessing"] not in PREPROCESSING:
+            problems.append(f'{where}: "preprocessing" must be one of {PREPROCESSING}')
+
+        classes = info.get("classes")
+        if isinstance(classes, dict):
+            expected = {str(i) for i in range(len(classes))}
+            if set(classes) != expected:
+                problems.append(f'{where}: "classes" keys must be "0".."{len(classes) - 1}"')
+            if "num_classes" in info and info["num_classes"] != len(classes):
+                problems.append(f'{where}: "num_classes" is {info["num_classes"]} but {len(classes)} classes are listed')
+        elif classes is not None:
+            problems.append(f'{where}: "classes" must be an object')
+
+    return problems
+
+
+class ModelRegistry:
+    """
+    Single in-memory source for model_config.json.
+    The file is re-read when its mtime changes (checked at most every
+    `check_interval` seconds). An invalid edit is reported via `last_error` and
+    the previous config stays in use.
+
+    An edit only reaches code that reads the config after it lands. "models",
+    "routing" (except max_workers), "inference" -> "batch_size" / "scheduler"
+    and "workers" -> "enabled" are read on use. Settings that size a
+    process-wide object are read once, and need a restart to change:
+    "inference" -> "model_cache" / "prediction_cache" / "warmup" and the worker
+    layout, "routing" -> "max_workers", "auth", "llm", "assets" and "metrics".
+    """
+
+    def __init__(self, path=CONFIG_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.last_error = None
+
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._mtime = None
+        self._checked_at = 0.0
+        self._config = None
+        self._specs = {}
+
+        problems = self._load()
+        if problems:
+            raise ConfigError("; ".join(problems))
+
+    def _load(self):
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, "r") as f:
+            try:
+                config = json.load(f)
+            except ValueError as e:
+                return [f"invalid JSON: {e}"]
+
+        problems = validate(config)
+        if problems:
+            return problems
+
+        old_specs = self._specs
+        self._config = config
+        self._specs = {key: ModelSpec(key, info) for key, info in config["models"].items()}
+        self._mtime = mtime
+
+        changed = [
+            key for key in set(old_specs) | set(self._specs)
+            if key not in old_specs or key not in self._specs or old_specs[key].info != self._specs[key].info
+        ]
+        if old_specs and changed:
+            for listener in self._listeners:
+                listener(changed)
+        return []
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                if os.path.getmtime(self.path) == self._mtime:
+                    return
+                problems = self._load()
+            except OSError as e:
+                problems = [str(e)]
+            self.last_error = "; ".join(problems) if problems else None
+
+    def on_reload(self, listener):
+        """Registers listener(changed_model_keys), called after a reload changes models."""
+        self._listeners.append(listener)
+        return listener
+
+    @property
+    def config(self):
+        """The raw config dict (current version)."""
+        self._maybe_reload()
+        return self._config
+
+    def section(self, *path):
+        """A nested config section, e.g. section("inference", "scheduler"); {} if absent."""
+        node = self.config
+        for name in path:
+            node = node.get(name, {}) if isinstance(node, dict) else {}
+        return node
+
+    def keys(self):
+        self._maybe_reload()
+        return list(self._specs.keys())
+
+    def specs(self):
+        self._maybe_reload()
+        return list(self._specs.values())
+
+    def spec(self, model_key):
+        self._maybe_reload()
+        if model_key not in self._specs:
+            raise KeyError(f"Model key '{model_key}' not found in config")
+        return self._specs[model_key]
+
+    def __contains__(self, model_key):
+        self._maybe_reload()
+        return model_key in self._specs
+
+
+REGISTRY = ModelRegistry()
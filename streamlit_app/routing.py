@@ -0,0 +1,130 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from model_loader import serving_backend
+from preprocess import preprocess_image
+from prediction_cache import PREDICTION_CACHE
+from scheduler import get_scheduler
+from metrics import timed
+from registry import REGISTRY
+
+# Selectbox value meaning "score with every model"
+AUTO_DETECT = "auto"
+
+# Shared by all sessions; each model's forward pass still runs on its scheduler thread.
+# Sized once at import: a "max_workers" edit needs a restart.
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=REGISTRY.section("routing").get("max_workers", 8),
+    thread_name_prefix="auto-detect"
+)
+
+
+def score_model(model_key, image, image_bytes=None):
+    """
+    (probability row, cached) for one image and one model, through the
+    prediction cache and scheduler; `cached` is True on a cache hit.
+    """
+    if image_bytes is not None:
+        cached = PREDICTION_CACHE.get(image_bytes, model_key)
+        if cached is not None:
+            return cached[0], True
+
+    spec = REGISTRY.spec(model_key)
+    backend = serving_backend(model_key)
+
+    with timed("preprocess", model_key, backend):
+        processed = preprocess_image(image, model_type=spec.type, target_size=spec.input_size, model_key=model_key)
+
+    with timed("predict", model_key, backend):
+        predictions = get_scheduler(model_key).predict(processed)
+
+    if image_bytes is not None:
+        PREDICTION_CACHE.put(image_bytes, model_key, predictions)
+
+    return predictions[0], False
+
+
+def candidate_models(image, image_bytes=None):
+    """
+    Models to run for auto-detect. With a "router_model" configured, its top
+    label is looked up in "route_map" (see "routing" in config) to narrow the
+    set; otherwise all models run.
+    """
+    all_models = REGISTRY.keys()
+    routing_config = REGISTRY.section("routing")
+    router = routing_config.get("router_model")
+    if not router:
+        return all_models
+
+    probs, _ = score_model(router, image, image_bytes)
+    label = REGISTRY.spec(router).label(probs.argmax())
+    return routing_config.get("route_map", {}).get(label, all_models)
+
+
+def certainty(probs):
+    """
+    1 - normalized entropy of a probability row: 1 when one class takes all
+    the mass, 0 when it is uniform. Unlike the top probability it does not
+    depend on how many classes the model has, so models can be compared by it.
+    """
+    if len(probs) < 2:
+        return 1.0
+    entropy = -sum(float(p) * math.log(p) for p in probs if p > 0)
+    return max(0.0, 1.0 - entropy / math.log(len(probs)))
+
+
+def auto_diagnose(image, image_bytes=None, model_keys=None, top_k=10, budget_seconds=None):
+    """
+    Scores `image` with several models concurrently and picks the one most
+    certain about it. Each model's softmax is only a distribution over its own
+    crops, so scores are never mixed across models: "ranked" holds the chosen
+    model's (label, confidence, model_key) rows and "candidates" every model's
+    (model_key, certainty, top label, top confidence), most certain first.
+    Models that have not answered within `budget_seconds` are listed as skipped,
+    and those answered from the prediction cache as cached.
+    """
+    model_keys = model_keys or candidate_models(image, image_bytes)
+    budget_seconds = budget_seconds or REGISTRY.section("routing").get("budget_seconds", 30)
+
+    start = time.perf_counter()
+    futures = {
+        _EXECUTOR.submit(score_model, key, image, image_bytes): key
+        for key in model_keys
+    }
+    done, not_done = wait(futures, timeout=budget_seconds)
+
+    candidates = []
+    scores = {}
+    cached = []
+    skipped = [futures[f] for f in not_done]
+    errors = {}
+
+    for future in done:
+        key = futures[future]
+        try:
+            probs, hit = future.result()
+        except Exception as e:
+            errors[key] = str(e)
+            continue
+
+        if hit:
+            cached.append(key)
+        scores[key] = REGISTRY.spec(key).label_scores(probs)
+        top_label, top_confidence = scores[key][0]
+        candidates.append((key, certainty(probs), top_label, top_confidence))
+
+    candidates.sort(key=lambda row: row[1], reverse=True)
+    best = candidates[0][0] if candidates else None
+    ranked = [(label, p, best) for label, p in scores[best][:top_k]] if best else []
+
+    return {
+        "model": best,
+        "ranked": ranked,
+        "candidates": candidates,
+        "models": [futures[f] for f in done if futures[f] not in errors],
+        "skipped": skipped,
+        "cached": cached,
+        "errors": errors,
+        "seconds": time.perf_counter() - start,
+    }
@@ -0,0 +1,103 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from backends import get_backend
+
+
+class CompiledModel(ABC):
+    """
+    Base class for models served from an exported artifact instead of Keras/timm.
+    Subclasses take the same preprocessed batch as the original model and
+    return probability rows, so callers do not need to know which runtime is used.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.size_bytes = os.path.getsize(path)
+
+    @abstractmethod
+    def run_batch(self, batch):
+        """Probability rows for a preprocessed batch."""
+
+
+def _to_numpy(batch):
+    # torch tensors from the torch preprocessing path
+    if hasattr(batch, "numpy") and not isinstance(batch, np.ndarray):
+        batch = batch.numpy()
+    return np.ascontiguousarray(batch, dtype=np.float32)
+
+
+# ---------------- ONNX RUNTIME ----------------
+class OnnxModel(CompiledModel):
+    """An ONNX Runtime CPU session exported by export_onnx.py (outputs are probabilities)."""
+
+    def __init__(self, path, num_threads=None):
+        super().__init__(path)
+        ort = get_backend("onnx").ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(
+            path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def run_batch(self, batch):
+        return self.session.run(None, {self.input_name: _to_numpy(batch)})[0]
+
+
+# ---------------- TFLITE ----------------
+class TFLiteModel(CompiledModel):
+    """
+    A TFLite flatbuffer from convert_tflite.py run by the TFLite interpreter.
+    Float models use the XNNPACK delegate, which the interpreter applies by default.
+    """
+
+    def __init__(self, path, num_threads=None):
+        super().__init__(path)
+        Interpreter = get_backend("tflite").Interpreter
+
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self._lock = threading.Lock()  # the interpreter is not thread-safe
+
+    def run_batch(self, batch):
+        batch = _to_numpy(batch)
+
+        with self._lock:
+            current = tuple(self.interpreter.get_input_details()[0]["shape"])
+            if current != batch.shape:
+                self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+
+            self.interpreter.set_tensor(self.input_index, batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+
+
+# ---------------- QUANTIZED TORCHSCRIPT ----------------
+class TorchScriptModel(CompiledModel):
+    """A TorchScript module (e.g. an INT8 variant from quantize.py) returning logits."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        torch = get_backend("torch").torch
+        self.module = torch.jit.load(path, map_location="cpu").eval()
+
+    def run_batch(self, batch):
+        torch = get_backend("torch").torch
+        if isinstance(batch, np.ndarray):
+            batch = torch.from_numpy(batch)
+        with torch.no_grad():
+            return torch.softmax(self.module(batch), dim=1).cpu().numpy()
@@ -0,0 +1,162 @@
+import threading
+import queue
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+from model_loader import load_model, serving_backend, _run_batch
+from metrics import BATCH_SIZE, register_collector, timed
+from registry import REGISTRY
+from worker_pool import get_worker_pool
+
+# Batching policy defaults (overridable via "inference" -> "scheduler" in config)
+DEFAULT_MAX_BATCH_SIZE = 16
+DEFAULT_MAX_WAIT_MS = 10
+
+
+class BatchScheduler:
+    """
+    Queues single-image requests for one model and coalesces them into batches.
+    A batch is dispatched once it reaches `max_batch_size` or the oldest request
+    has waited `max_wait_ms`, whichever comes first. Limits not passed in are
+    read from config for every batch, so edits apply without a restart.
+    """
+
+    def __init__(self, model_key, max_batch_size=None, max_wait_ms=None):
+        self.model_key = model_key
+        self._max_batch_size = max_batch_size
+        self._max_wait_ms = max_wait_ms
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._errors = 0
+
+        self._thread = threading.Thread(
+            target=self._loop,
+            name=f"scheduler-{model_key}",
+            daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def max_batch_size(self):
+        if self._max_batch_size:
+            return self._max_batch_size
+        return REGISTRY.section("inference", "scheduler").get("max_batch_size", DEFAULT_MAX_BATCH_SIZE)
+
+    @property
+    def max_wait(self):
+        max_wait_ms = self._max_wait_ms
+        if max_wait_ms is None:
+            max_wait_ms = REGISTRY.section("inference", "scheduler").get("max_wait_ms", DEFAULT_MAX_WAIT_MS)
+        return max_wait_ms / 1000.0
+
+    def submit(self, processed_image):
+        """Queues one preprocessed image (batch of 1) and returns a Future of its probability row."""
+        future = Future()
+        self._queue.put((processed_image, future))
+        return future
+
+    def predict(self, processed_image, timeout=None):
+        """Blocking helper with the same output shape as predict_image: (1, num_classes)."""
+        return self.submit(processed_image).result(timeout=timeout)[np.newaxis, :]
+
+    def stats(self):
+        """Returns queue depth and batch-size statistics."""
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "model_key": self.model_key,
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "batches": batches,
+                "errors": self._errors,
+                "avg_batch_size": (self._requests / batches) if batches else 0.0,
+                "max_batch_size_seen": max(self._batch_sizes) if self._batch_sizes else 0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            }
+
+    def _collect(self):
+        """Blocks for the first request, then gathers more until the batch is full or the wait expires."""
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return items
+
+    def _loop(self):
+        while True:
+            items = self._collect()
+            futures = [f for _, f in items if f.set_running_or_notify_cancel()]
+            inputs = [x for x, f in items if not f.cancelled()]
+
+            if not futures:
+                continue
+
+            try:
+                # NumPy for every model type; torch is only imported where the model runs
+                batch = np.concatenate(inputs, axis=0)
+
+                pool = get_worker_pool()
+                BATCH_SIZE.observe(len(futures), model_key=self.model_key)
+
+                with timed("inference", self.model_key, serving_backend(self.model_key)):
+                    if pool is not None:
+                        probs = pool.predict(self.model_key, batch)
+                    else:
+                        model, model_type = load_model(self.model_key)
+                        if model is None:
+                            raise RuntimeError(f"Model '{self.model_key}' failed to load")
+                        probs = _run_batch(model, model_type, batch)
+
+                for i, future in enumerate(futures):
+                    future.set_result(probs[i])
+
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                for future in futures:
+                    future.set_exception(e)
+
+            with self._lock:
+                self._requests += len(futures)
+                self._batch_sizes[len(futures)] += 1
+
+
+# ---------------- PROCESS-WIDE REGISTRY ----------------
+_SCHEDULERS = {}
+_SCHEDULERS_LOCK = threading.Lock()
+
+
+def get_scheduler(model_key):
+    """Returns the shared scheduler for a model, creating it on first use."""
+    with _SCHEDULERS_LOCK:
+        if model_key not in _SCHEDULERS:
+            _SCHEDULERS[model_key] = BatchScheduler(model_key)
+        return _SCHEDULERS[model_key]
+
+
+def scheduler_stats():
+    """Returns stats for every scheduler created so far."""
+    with _SCHEDULERS_LOCK:
+        return [s.stats() for s in _SCHEDULERS.values()]
+
+
+@register_collector
+def _scheduler_metrics():
+    return [
+        ("agri_scheduler_queue_depth", "gauge", "Requests waiting to be batched", {"model_key": s["model_key"]}, s["queue_depth"])
+        for s in scheduler_stats()
+    ]
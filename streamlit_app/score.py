@@ -0,0 +1,364 @@
+"""
+Scores a folder or archive of leaf images without the Streamlit UI.
+
+Run from the repository root:
+    python streamlit_app/score.py survey_photos/ --model rice_potato -o results.csv
+    python streamlit_app/score.py survey.zip --model cotton_tomato -o results.jsonl --workers 8
+    python streamlit_app/score.py survey.tar.gz --model corn_blackgram -o results.parquet
+
+Reading, decoding plus preprocessing (on --workers threads) and inference
+run as a pipeline connected by bounded queues; an error in any stage stops
+the run instead of hanging it. Results are appended as each batch finishes;
+re-running with the same output skips images already scored and retries the
+ones that failed (use --no-resume to start over). A retried image keeps its
+earlier error row, so the last row per image is the current result.
+A .parquet output is a directory of part files so it can be appended to.
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+from decode import decode_image
+from model_loader import default_batch_size, load_model, _run_batch
+from preprocess import get_engine, preprocessing_family
+from registry import REGISTRY
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+FIELDS = ["image", "model_key", "label", "confidence", "top_k", "error"]
+_DONE = object()
+
+
+# ---------------- SOURCES ----------------
+def iter_source(source):
+    """Yields (name, bytes) for every image in a directory, .zip or .tar(.gz)."""
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    with open(path, "rb") as f:
+                        yield os.path.relpath(path, source), f.read()
+
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield info.filename, zf.read(info)
+
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source, "r:*") as tf:
+            for member in tf:
+                if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield member.name, tf.extractfile(member).read()
+
+    else:
+        raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+
+# ---------------- SINKS ----------------
+class CsvSink:
+    def __init__(self, path):
+        self.path = path
+
+    def done_ids(self):
+        if not os.path.exists(self.path):
+            return set()
+        done = set()
+        with open(self.path, newline="") as f:
+            for row in csv.DictReader(f):
+                # A row cut off by an interrupted run is missing its last fields
+                # (None), or has run into the next run's first row (extra fields under None)
+                if None in row or None in row.values():
+                    continue
+                if row["label"] and row["confidence"] and not row["error"]:
+                    done.add(row["image"])
+        return done
+
+    def open(self, append):
+        new_file = not (append and os.path.exists(self.path))
+        self._file = open(self.path, "a" if append else "w", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            self._writer.writerow(dict(row, top_k=json.dumps(row["top_k"])))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlSink:
+    def __init__(self, path):
+        self.path = path
+
+    def done_ids(self):
+        if not os.path.exists(self.path):
+            return set()
+        done = set()
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    # Truncated last line from an interrupted run
+                    continue
+                if not row.get("error"):
+                    done.add(row["image"])
+        return done
+
+    def open(self, append):
+        self._file = open(self.path, "a" if append else "w")
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """Writes one part file per batch into a directory."""
+
+    def __init__(self, path):
+        self.path = path
+        import pyarrow
+        import pyarrow.parquet
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        # Explicit, so a batch where every row is an error still writes typed columns
+        self._schema = pyarrow.schema([
+            ("image", pyarrow.string()),
+            ("model_key", pyarrow.string()),
+            ("label", pyarrow.string()),
+            ("confidence", pyarrow.float64()),
+            ("top_k", pyarrow.string()),
+            ("error", pyarrow.string()),
+        ])
+
+    def _parts(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(p for p in os.listdir(self.path) if p.endswith(".parquet"))
+
+    def done_ids(self):
+        done = set()
+        for part in self._parts():
+            table = self._pq.read_table(os.path.join(self.path, part), columns=["image", "error"])
+            done.update(
+                image for image, error in zip(table.column("image").to_pylist(), table.column("error").to_pylist())
+                if not error
+            )
+        return done
+
+    def open(self, append):
+        os.makedirs(self.path, exist_ok=True)
+        if not append:
+            for part in self._parts():
+                os.remove(os.path.join(self.path, part))
+        self._next = len(self._parts())
+
+    def write(self, rows):
+        table = self._pa.Table.from_pylist([dict(r, top_k=json.dumps(r["top_k"])) for r in rows], schema=self._schema)
+        self._pq.write_table(table, os.path.join(self.path, f"part-{self._next:06d}.parquet"))
+        self._next += 1
+
+    def close(self):
+        pass
+
+
+def make_sink(path):
+    if path.endswith(".csv"):
+        return CsvSink(path)
+    if path.endswith(".jsonl"):
+        return JsonlSink(path)
+    if path.endswith(".parquet"):
+        return ParquetSink(path)
+    raise ValueError("Output must end in .csv, .jsonl or .parquet")
+
+
+# ---------------- PIPELINE ----------------
+# Each stage records an exception in `failures` and still finishes its queue
+# protocol, so the others never block; the main thread re-raises it.
+def _reader(source, skip, out_q, n_workers, failures):
+    try:
+        for name, data in iter_source(source):
+            if name not in skip:
+                out_q.put((name, data))
+    except Exception as e:
+        failures.append(e)
+    finally:
+        for _ in range(n_workers):
+            out_q.put(_DONE)
+
+
+def _decoder(in_q, out_q, engine):
+    """Decodes and preprocesses images, so the inference thread only stacks and runs them."""
+    try:
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                return
+            name, data = item
+            try:
+                image = decode_image(data, target_size=engine.target_size, max_bytes=float("inf"))
+                out_q.put((name, engine.process([image])[0], None))
+            except Exception as e:
+                # One bad file (truncated, corrupt, unexpected mode) is a failed row, not a failed run
+                out_q.put((name, None, str(e) or type(e).__name__))
+    finally:
+        out_q.put(_DONE)
+
+
+def _writer(sink, in_q, failures):
+    try:
+        while True:
+            rows = in_q.get()
+            if rows is _DONE:
+                return
+            sink.write(rows)
+    except Exception as e:
+        failures.append(e)
+        # Keep draining so the inference thread never blocks on a full queue
+        while in_q.get() is not _DONE:
+            pass
+
+
+def _raise_failure(failures):
+    if failures:
+        raise failures[0]
+
+
+def _rows(model_key, names, probs, top_k):
+    spec = REGISTRY.spec(model_key)
+    rows = []
+    for name, p in zip(names, probs):
+        order = np.argsort(p)[::-1][:top_k]
+        ranked = [[spec.label(i), round(float(p[i]), 6)] for i in order]
+        rows.append({
+            "image": name,
+            "model_key": model_key,
+            "label": ranked[0][0],
+            "confidence": ranked[0][1],
+            "top_k": ranked,
+            "error": None,
+        })
+    return rows
+
+
+def score(source, model_key, output, batch_size=None, workers=4, top_k=3, resume=True):
+    """Runs the pipeline and returns (scored, failed) counts."""
+    size = REGISTRY.spec(model_key).input_size[0]
+    batch_size = batch_size or default_batch_size()
+
+    model, model_type = load_model(model_key)
+    if model is None:
+        raise RuntimeError(f"Model '{model_key}' failed to load")
+
+    sink = make_sink(output)
+    skip = sink.done_ids() if resume else set()
+    sink.open(append=resume)
+
+    raw_q = queue.Queue(maxsize=batch_size * 4)
+    decoded_q = queue.Queue(maxsize=batch_size * 4)
+    write_q = queue.Queue(maxsize=8)
+    failures = []
+
+    engine = get_engine(preprocessing_family(model_type, model_key), (size, size))
+    threads = [threading.Thread(target=_reader, args=(source, skip, raw_q, workers, failures), daemon=True)]
+    threads += [
+        threading.Thread(target=_decoder, args=(raw_q, decoded_q, engine), daemon=True)
+        for _ in range(workers)
+    ]
+    writer = threading.Thread(target=_writer, args=(sink, write_q, failures), daemon=True)
+    for t in threads + [writer]:
+        t.start()
+
+    scored = failed = 0
+    finished = 0
+    names, arrays, errors = [], [], []
+    start = time.perf_counter()
+
+    def flush():
+        nonlocal scored
+        rows = list(errors)
+        if arrays:
+            rows += _rows(model_key, names, _run_batch(model, model_type, np.stack(arrays)), top_k)
+            scored += len(arrays)
+        if rows:
+            write_q.put(rows)
+        names.clear()
+        arrays.clear()
+        errors.clear()
+
+    # Inference stage runs on this thread
+    try:
+        while finished < workers:
+            _raise_failure(failures)
+            item = decoded_q.get()
+            if item is _DONE:
+                finished += 1
+                continue
+
+            name, array, error = item
+            if error:
+                failed += 1
+                errors.append({"image": name, "model_key": model_key, "label": None,
+                               "confidence": None, "top_k": [], "error": error})
+            else:
+                names.append(name)
+                arrays.append(array)
+
+            if len(arrays) >= batch_size:
+                flush()
+                elapsed = time.perf_counter() - start
+                print(f"\r{scored} scored, {failed} failed ({scored / elapsed:.1f} img/s)", end="", file=sys.stderr)
+
+        _raise_failure(failures)
+        flush()
+    finally:
+        write_q.put(_DONE)
+        writer.join()
+        sink.close()
+        print(file=sys.stderr)
+
+    _raise_failure(failures)
+    return scored, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-score leaf images with a configured model")
+    parser.add_argument("source", help="directory, .zip or .tar(.gz) of images")
+    parser.add_argument("--model", required=True, choices=REGISTRY.keys())
+    parser.add_argument("-o", "--output", required=True, help="results file (.csv, .jsonl or .parquet)")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=4, help="decode/preprocess threads")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--no-resume", action="store_true", help="overwrite instead of skipping scored images")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    scored, failed = score(
+        args.source, args.model, args.output,
+        batch_size=args.batch_size, workers=args.workers,
+        top_k=args.top_k, resume=not args.no_resume
+    )
+    print(f"Scored {scored} images ({failed} unreadable) in {time.perf_counter() - start:.1f}s -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+
+import db
+from registry import REGISTRY
+
+SESSION_COOKIE = "agri_session"
+SESSION_DAYS = REGISTRY.section("auth").get("session_days", 30)
+
+# Signing key: AUTH_SECRET from the environment, else one generated on first run and kept in data/
+SECRET_PATH = os.path.join("data", ".auth_secret")
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _load_secret():
+    secret = os.getenv("AUTH_SECRET")
+    if secret:
+        return secret.encode()
+
+    if not os.path.exists(SECRET_PATH):
+        os.makedirs(os.path.dirname(SECRET_PATH), exist_ok=True)
+        try:
+            fd = os.open(SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+        except FileExistsError:
+            pass  # Another process created it first
+    with open(SECRET_PATH) as f:
+        return f.read().strip().encode()
+
+
+_SECRET = _load_secret()
+
+
+def _sign(token_id):
+    return hmac.new(_SECRET, token_id.encode(), hashlib.sha256).hexdigest()
+
+
+def _digest(token_id):
+    # Only a digest is stored, so a copy of the database holds no usable tokens
+    return hashlib.sha256(token_id.encode()).hexdigest()
+
+
+def issue_token(username, days=SESSION_DAYS):
+    """Creates a signed session token for `username`, valid for `days` days."""
+    token_id = secrets.token_urlsafe(32)
+    now = datetime.now()
+    db.execute(
+        "INSERT INTO sessions (token_hash, username, created_at, expires_at) VALUES (?, ?, ?, ?)",
+        (_digest(token_id), username, now.strftime(_TIME_FORMAT), (now + timedelta(days=days)).strftime(_TIME_FORMAT))
+    )
+    return f"{token_id}.{_sign(token_id)}"
+
+
+def _split(token):
+    token_id, _, signature = (token or "").partition(".")
+    if not token_id or not hmac.compare_digest(signature, _sign(token_id)):
+        return None  # Forged or malformed: rejected without touching the database
+    return token_id
+
+
+def resolve_token(token):
+    """Returns the username a live token belongs to, or None."""
+    token_id = _split(token)
+    if token_id is None:
+        return None
+
+    rows = db.query(
+        "SELECT username FROM sessions WHERE token_hash = ? AND expires_at > ?",
+        (_digest(token_id), datetime.now().strftime(_TIME_FORMAT))
+    )
+    return rows[0][0] if rows else None
+
+
+def revoke_token(token):
+    """Deletes a token so it can no longer restore a session."""
+    token_id = _split(token)
+    if token_id is not None:
+        db.execute("DELETE FROM sessions WHERE token_hash = ?", (_digest(token_id),))
+
+
+def purge_expired():
+    """Removes expired tokens; returns how many were deleted."""
+    cursor = db.execute("DELETE FROM sessions WHERE expires_at <= ?", (datetime.now().strftime(_TIME_FORMAT),))
+    return cursor.rowcount
@@ -0,0 +1,161 @@
+"""
+Pre-optimized copies of the UI images, served as static files.
+
+Run from the repository root to build ahead of deployment:
+    python streamlit_app/static_assets.py
+    python streamlit_app/static_assets.py --force
+
+Each image listed under "assets" -> "max_widths" in model_config.json is
+resized (never upscaled) and re-encoded to every configured format Pillow can
+write, into streamlit_app/static/. Streamlit serves that folder at app/static/
+(server.enableStaticServing), so pages reference a small cacheable URL instead
+of inlining the PNG as base64 on every rerun. The app also builds on start-up;
+variants are only regenerated when the source file is newer.
+"""
+import argparse
+import base64
+import logging
+import mimetypes
+import os
+import shutil
+import sys
+import threading
+from functools import lru_cache
+
+from PIL import Image
+
+from registry import REGISTRY
+
+ASSETS_DIR = "assets"
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL = "app/static"
+
+ASSET_CONFIG = REGISTRY.section("assets")
+
+logger = logging.getLogger(__name__)
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+# ---------------- BUILD ----------------
+def _writable_formats(formats):
+    Image.init()
+    return [fmt for fmt in formats if fmt.upper() in Image.SAVE]
+
+
+def _build_one(name, max_width, formats, quality, force):
+    """Writes the variants of one source image; returns its manifest entry."""
+    source = os.path.join(ASSETS_DIR, name)
+    source_mtime = os.path.getmtime(source)
+    stem, ext = os.path.splitext(name)
+
+    with Image.open(source) as image:
+        width = min(max_width, image.width)
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        files = {}
+        for fmt in formats:
+            filename = f"{stem}-{width}.{fmt}"
+            path = os.path.join(STATIC_DIR, filename)
+            if force or not os.path.exists(path) or os.path.getmtime(path) < source_mtime:
+                variant = image if width == image.width else image.resize(
+                    (width, round(image.height * width / image.width)), Image.LANCZOS
+                )
+                variant.convert("RGBA" if has_alpha else "RGB").save(path, fmt.upper(), quality=quality)
+            files[fmt] = filename
+
+    if not files:
+        # No encoder for any configured format: serve the original as-is
+        shutil.copy2(source, os.path.join(STATIC_DIR, name))
+        files[ext.lstrip(".").lower()] = name
+
+    return {"files": files, "version": int(source_mtime)}
+
+
+def build_assets(force=False):
+    """Generates every configured variant (skipping up-to-date ones); returns the manifest."""
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    formats = _writable_formats(ASSET_CONFIG.get("formats", ["webp"]))
+    quality = ASSET_CONFIG.get("quality", 80)
+
+    manifest = {}
+    for name, max_width in ASSET_CONFIG.get("max_widths", {}).items():
+        if os.path.exists(os.path.join(ASSETS_DIR, name)):
+            manifest[name] = _build_one(name, max_width, formats, quality, force)
+    return manifest
+
+
+def get_manifest():
+    """The asset manifest, built once per server process."""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            try:
+                _manifest = build_assets()
+            except OSError as e:
+                logger.warning("Static assets unavailable, falling back to inline images: %s", e)
+                _manifest = {}
+        return _manifest
+
+
+# ---------------- LOOKUP ----------------
+@lru_cache(maxsize=512)
+def _encode(path, mtime, size):
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+
+def base64_file(path):
+    """Base64 of a file, memoized until the file's mtime or size changes ("" if missing)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ""
+    return _encode(path, stat.st_mtime, stat.st_size)
+
+
+def asset_url(name, fmt="webp"):
+    """URL of an asset variant (preferring `fmt`); inline data URI if it was not built."""
+    entry = get_manifest().get(name)
+    if entry is None:
+        source = os.path.join(ASSETS_DIR, name)
+        mime = mimetypes.guess_type(name)[0] or "image/png"
+        return f"data:{mime};base64,{base64_file(source)}"
+
+    files = entry["files"]
+    filename = files.get(fmt) or next(iter(files.values()))
+    # The version query makes a rebuilt asset a new URL, so browsers may cache freely
+    return f"{STATIC_URL}/{filename}?v={entry['version']}"
+
+
+def picture_html(name, css_class="", alt=""):
+    """
+    <picture> offering AVIF when built, with the WebP (or original) as the <img> fallback.
+    The browser fetches (and caches) a resized file from app/static instead of
+    receiving the full-size PNG as inline base64 on every rerun.
+    """
+    entry = get_manifest().get(name, {"files": {}})
+    sources = "".join(
+        f'<source type="image/{fmt}" srcset="{asset_url(name, fmt)}">'
+        for fmt in entry["files"] if fmt == "avif"
+    )
+    return f'<picture>{sources}<img src="{asset_url(name)}" class="{css_class}" alt="{alt}"></picture>'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate optimized static image variants")
+    parser.add_argument("--force", action="store_true", help="rebuild even if variants are up to date")
+    args = parser.parse_args(argv)
+
+    manifest = build_assets(force=args.force)
+    for name, entry in manifest.items():
+        sizes = ", ".join(
+            f"{filename} ({os.path.getsize(os.path.join(STATIC_DIR, filename)) // 1024}KB)"
+            for filename in entry["files"].values()
+        )
+        print(f"{name} ({os.path.getsize(os.path.join(ASSETS_DIR, name)) // 1024}KB) -> {sizes}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+from string import Template
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from static_assets import asset_url
+
+# Stylesheet fragments; `$banner_url` is filled in when they are compiled
+CSS_DIR = os.path.join("assets", "css")
+# Optional site-wide overrides, always enabled
+CUSTOM_CSS = os.path.join("assets", "styles.css")
+
+# Fragments each page uses, in cascade order. A fragment shared by several pages is injected once.
+PAGES = {
+    "landing": ["fonts", "landing"],
+    "login": ["fonts", "login"],
+    "dashboard": ["fonts", "backdrop", "dashboard", "home", "uploader", "agriconnect", "analytics", "assistant_button"],
+    "profile": ["fonts", "backdrop", "profile_panel"],
+    "chatbot": ["fonts", "backdrop", "chatbot", "chat_layout"],
+}
+
+_compiled = None
+_compiled_key = None
+_compiled_lock = threading.Lock()
+
+
+def _fragment_paths():
+    names = dict.fromkeys(name for fragments in PAGES.values() for name in fragments)
+    paths = {name: os.path.join(CSS_DIR, f"{name}.css") for name in names}
+    if os.path.exists(CUSTOM_CSS):
+        paths["custom"] = CUSTOM_CSS
+    return paths
+
+
+def compile_theme():
+    """
+    Returns (sheets, pages): sheets maps a content-hash id to CSS text,
+    pages maps a page name to the ids it enables. Recompiled only when a
+    fragment file changes.
+    """
+    global _compiled, _compiled_key
+    paths = _fragment_paths()
+    key = tuple((name, os.path.getmtime(path)) for name, path in paths.items() if os.path.exists(path))
+
+    with _compiled_lock:
+        if _compiled is None or key != _compiled_key:
+            values = {"banner_url": asset_url("banner.png")}
+            ids, sheets = {}, {}
+            for name, path in paths.items():
+                if not os.path.exists(path):
+                    continue
+                with open(path) as f:
+                    css = Template(f.read()).safe_substitute(values)
+                # Identical fragments hash to the same id, so they are only ever sent once
+                sheet_id = "agri-css-" + hashlib.sha1(css.encode()).hexdigest()[:12]
+                ids[name] = sheet_id
+                sheets[sheet_id] = css
+
+            custom = [ids["custom"]] if "custom" in ids else []
+            pages = {
+                page: list(dict.fromkeys([ids[name] for name in fragments if name in ids] + custom))
+                for page, fragments in PAGES.items()
+            }
+            _compiled, _compiled_key = (sheets, pages), key
+        return _compiled
+
+
+_SCRIPT = Template("""<script>
+const doc = window.parent.document;
+const sheets = $sheets;
+for (const [id, css] of Object.entries(sheets)) {
+    if (!doc.getElementById(id)) {
+        const el = doc.createElement("style");
+        el.id = id;
+        el.dataset.agriTheme = "";
+        el.textContent = css;
+        doc.body.appendChild(el);
+    }
+}
+const active = new Set($active);
+doc.querySelectorAll("style[data-agri-theme]").forEach(el => {
+    el.media = active.has(el.id) ? "all" : "not all";
+});
+</script>""")
+
+
+def apply_theme(page):
+    """
+    Styles the current page. The compiled stylesheets are appended to the
+    document once per session (or after a fragment changes); every other
+    rerun only sends the list of sheets to enable for `page`.
+    """
+    sheets, pages = compile_theme()
+    # Only sheets this session has not sent yet travel over the websocket
+    sent = st.session_state.setdefault("theme_sheets_sent", set())
+    pending = {sheet_id: css for sheet_id, css in sheets.items() if sheet_id not in sent}
+    sent.update(pending)
+
+    # "</" is escaped so stylesheet text can never close the script element
+    payload = json.dumps(pending).replace("</", "<\\/")
+    components.html(_SCRIPT.substitute(sheets=payload, active=json.dumps(pages[page])), height=0)
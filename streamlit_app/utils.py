@@ -1,42 +1,25 @@
-import sqlite3
 import os
-from datetime import datetime
+
+import db
 
 # Path to the database file
-DB_PATH = os.path.join("data", "users.db")
+DB_PATH = db.DB_PATH
 
 def init_db():
-    """Initializes the SQLite database and creates the users table if it doesn't exist."""
+    """Initializes the SQLite database and brings its schema up to date."""
     # Ensure data directory exists
     if not os.path.exists("data"):
         os.makedirs("data")
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # Create table with fields: username, name, password (hashed), and join date
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            username TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            password TEXT NOT NULL,
-            join_date TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    # Creates the users table (username, name, hashed password, join date) and later tables
+    db.migrate(DB_PATH)
 
 def run_query(query, params=()):
     """Helper function to run a query and fetch results (if any)."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(query, params)
-    
-    if query.strip().upper().startswith("SELECT"):
-        result = c.fetchall()
-        conn.close()
-        return result
-    else:
-        conn.commit()
-        conn.close()
-        return None
\ No newline at end of file
+    with db.connection(DB_PATH) as conn:
+        cursor = conn.execute(query, params)
+
+        # Statements that return rows have a description; writes autocommit
+        if cursor.description is not None:
+            return cursor.fetchall()
+        return None
@@ -12,8 +12,6 @@ from PIL import Image
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime # Moved from inside the function
-from dotenv import load_dotenv
-import google.generativeai as genai
 
 
 # Helper function to convert uploaded images for the HTML display
@@ -23,92 +21,114 @@ def image_to_base64(image):
     return base64.b64encode(buffered.getvalue()).decode()
 
 # --- IMPORTS FROM OUR APP STRUCTURE ---
-from auth import authenticate_user, create_user
+from auth import authenticate_user, create_user, start_session, logout, HashPoolBusy
 from preprocess import preprocess_image
-from model_loader import load_model, predict_image
+from model_loader import load_model, serving_backend, MODEL_CACHE
+from metrics import timed
+from scheduler import get_scheduler
+from worker_pool import worker_pool_enabled
+from warmup import warmup_state
+from prediction_cache import PREDICTION_CACHE, image_hash
+from decode import decode_image, ImageRejectedError
+from routing import AUTO_DETECT, auto_diagnose
+from registry import REGISTRY
+from history import record_prediction, fetch_history, save_thumbnail
+from static_assets import base64_file, picture_html
+from theme import apply_theme
+from llm_client import LLM_CLIENTS, stream_reply
+from analytics import user_summary, top_diseases, get_figure
 
 # --- HELPER: BASE64 IMAGE LOADER ---
 def get_base64(file_path):
-    """Converts an image file to a base64 string for HTML embedding."""
-    if os.path.exists(file_path):
-        with open(file_path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
-    return ""
+    """Converts an image file to a base64 string for HTML embedding (memoized per file version)."""
+    return base64_file(file_path)
+
+
+def get_base64_thumbnail(path):
+    """Data URI for a small history thumbnail (empty if the file is gone)."""
+    encoded = get_base64(path) if path else ""
+    return f"data:image/jpeg;base64,{encoded}" if encoded else None
+
+
+def render_diagnosis_report(conditions, probs, model_key="", backend=""):
+    """Status banner, confidence bar and per-condition chart for one diagnosis."""
+    predicted_label = conditions[int(np.argmax(probs))]
+    confidence = np.max(probs) * 100
+
+    if "healthy" in predicted_label.lower():
+        st.success(f"**Status: {predicted_label.upper()}**")
+        st.balloons()
+    else:
+        st.error(f"**Detected: {predicted_label.upper()}**")
+
+    st.caption(f"Confidence: {confidence:.2f}%")
+    st.progress(int(confidence))
+
+    with timed("chart", model_key, backend):
+        df_chart = pd.DataFrame({
+            "Condition": conditions,
+            "Confidence": probs
+        }).sort_values(by="Confidence", ascending=False)
+
+        chart = alt.Chart(df_chart).mark_bar(
+            cornerRadiusEnd=6
+        ).encode(
+            x=alt.X('Confidence:Q', title=None, axis=alt.Axis(format='%')),
+            y=alt.Y('Condition:N', sort='-x', title=None),
+            color=alt.Color('Confidence:Q', scale=alt.Scale(scheme="blues"), legend=None),
+            tooltip=[
+                alt.Tooltip('Condition:N'),
+                alt.Tooltip('Confidence:Q', format='.2%')
+            ]
+        ).properties(height=350)
+
+        text = chart.mark_text(
+            align='left',
+            baseline='middle',
+            dx=5
+        ).encode(
+            text=alt.Text('Confidence:Q', format='.1%')
+        )
+
+        st.altair_chart(chart + text, use_container_width=True)
+
+
+def record_scan(user, model_key, ranked, latency_ms, image, image_bytes):
+    """
+    Saves a diagnosis to the user's history once per upload and model in this session.
+    Pass latency_ms=None for results served from the prediction cache.
+    """
+    if not user:
+        return
+
+    digest = image_hash(image_bytes)
+    recorded = st.session_state.setdefault("recorded_scans", set())
+    if (digest, model_key) in recorded:
+        return
+
+    try:
+        record_prediction(
+            user["username"],
+            model_key,
+            ranked,
+            latency_ms=latency_ms,
+            thumbnail=save_thumbnail(image, digest)
+        )
+        recorded.add((digest, model_key))
+    except Exception as e:
+        st.warning(f"Could not save this scan to history: {e}")
 
 
 def render_profile_panel(user_data):
     """Render the profile panel (moved from the Profile tab)."""
     # (No top-right close icon here — navigation uses Back button)
 
-    # Use the same markup/CSS used previously for the profile tab
+    # Use the same markup/CSS used previously for the profile tab (assets/css/profile_panel.css)
     user_data = user_data or {}
     real_fullname = user_data.get('name', 'Farmer')
     join_date_raw = str(user_data.get('created_at', '2026-01-01'))
     real_join_date = join_date_raw.split(' ')[0]
 
-    st.markdown("""
-    <style>
-    /* UPLOAD BUTTON STYLING */
-    [data-testid="stFileUploader"] button {
-        background: linear-gradient(90deg, #22d3ee, #34d399) !important;
-        color: #020617 !important;
-        font-weight: 800 !important;
-        border: none !important;
-        padding: 8px 20px !important;
-        border-radius: 8px !important;
-    }
-    [data-testid="stFileUploader"] button:hover {
-        transform: scale(1.02) !important;
-        box-shadow: 0 0 15px rgba(52, 211, 153, 0.5) !important;
-    }
-    [data-testid="stFileUploader"] { color: white !important; }
-    [data-testid="stFileUploader"] small { color: #e2e8f0 !important; }
-    [data-testid="stFileUploader"] span { color: white !important; }
-    
-    [data-testid="stFileUploader"] section {
-        background-color: rgba(255, 255, 255, 0.05);
-        border: 2px dashed rgba(52, 211, 153, 0.5);
-        border-radius: 15px;
-        padding: 20px;
-        text-align: center;
-    }
-
-    /* INPUT FIELDS STYLING */
-    .stTextInput input, .stSelectbox div[data-baseweb="select"] > div {
-        background-color: rgba(255, 255, 255, 0.9) !important;
-        color: #000000 !important;
-        border: 1px solid rgba(255, 255, 255, 0.2) !important;
-        border-radius: 8px !important;
-    }
-
-    /* PROFILE CARD STYLING */
-    .profile-card {
-        background: linear-gradient(135deg, rgba(255, 255, 255, 0.1), rgba(255, 255, 255, 0.05));
-        backdrop-filter: blur(20px);
-        border: 1px solid rgba(255, 255, 255, 0.2);
-        border-radius: 24px;
-        padding: 40px 20px;
-        text-align: center;
-        box-shadow: 0 20px 40px rgba(0,0,0,0.3);
-    }
-    .avatar-circle {
-        width: 140px; height: 140px; margin: 0 auto 20px auto;
-        background: linear-gradient(135deg, #34d399, #22d3ee);
-        border-radius: 50%; display: flex; align-items: center; justify-content: center;
-        font-size: 4rem; border: 4px solid rgba(255,255,255,0.2); overflow: hidden;
-    }
-    .avatar-img { width: 100%; height: 100%; object-fit: cover; }
-    
-    /* ACTION BUTTONS */
-    div.stButton > button {
-        background: rgba(255, 255, 255, 0.1) !important;
-        color: white !important;
-        border: 1px solid rgba(255, 255, 255, 0.2) !important;
-    }
-    
-    </style>
-    """, unsafe_allow_html=True)
-
     st.markdown("<h1 style='margin-bottom: 10px;'>👤 My <span style='color:#34d399'>Profile</span></h1>", unsafe_allow_html=True)
 
     c1, c2 = st.columns([1, 2], gap="large")
@@ -164,29 +184,7 @@ def render_profile_panel(user_data):
 def profile_page():
     """Standalone profile page used when routing to 'profile'."""
     # Apply the same dashboard background and theme so profile matches
-    BANNER_PATH = os.path.join("assets", "banner.png")
-    bg_image_base64 = get_base64(BANNER_PATH)
-    st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;700;900&display=swap');
-
-    html, body, [class*="css"] {{
-        font-family: 'Inter', sans-serif;
-    }}
-
-    .stApp {{
-        background: linear-gradient(135deg, rgba(0,0,0,0.75), rgba(0,0,0,0.9)), 
-                    url("data:image/png;base64,{bg_image_base64}");
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-        color: white;
-    }}
-
-    header {{visibility:hidden;}}
-    footer {{visibility:hidden;}}
-    </style>
-    """, unsafe_allow_html=True)
+    apply_theme("profile")
 
     user = st.session_state.get('user')
     c1, c2, c3 = st.columns([1, 9, 2])
@@ -199,80 +197,14 @@ def profile_page():
     with c3:
         if st.button("🚪 Logout", key="profile_logout"):
             st.session_state['page'] = 'landing'
-            st.session_state['authenticated'] = False
-            st.session_state['user'] = None
-            st.rerun()
+            logout()
 
 # --- LANDING PAGE ---
 def landing_page():
-    BANNER_PATH = os.path.join("assets", "banner.png")
-    bg_image_base64 = get_base64(BANNER_PATH)
-
-    flow_images = {
-        "login": os.path.join("assets", "login.png"),
-        "upload": os.path.join("assets", "upload.png"),
-        "ai": os.path.join("assets", "ai.png"),
-        "disease": os.path.join("assets", "disease.png"),
-        "insights": os.path.join("assets", "insights.png")
-    }
-    flow_base64 = {k: get_base64(v) for k, v in flow_images.items()}
+    # Page CSS is injected once per session; this rerun only enables the "landing" sheets
+    apply_theme("landing")
 
-    st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;700;900&display=swap');
-    html, body, [class*="css"] {{ font-family: 'Inter', sans-serif; }}
-
-    .stApp {{
-        background: linear-gradient(135deg, rgba(0,0,0,0.6), rgba(0,0,0,0.6)), 
-                    url("data:image/png;base64,{bg_image_base64}");
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-        color: white;
-    }}
-    header {{visibility: hidden;}}
-    footer {{visibility: hidden;}}
-
-    /* HERO & TEXT STYLES */
-    .hero {{ text-align: center; padding: 5rem 1rem; animation: fadeUp 1.3s ease-in-out; }}
-    .hero h1 {{ font-size: 5rem; font-weight: 900; line-height: 1.1; margin-bottom: 20px; color: white; }}
-    .hero span {{ background: linear-gradient(90deg, #22d3ee, #34d399); -webkit-background-clip: text; -webkit-text-fill-color: transparent; }}
-    .hero p {{ font-size: 1.5rem; max-width: 800px; color: #d1fae5; margin: 0 auto 40px auto; }}
-
-    /* BUTTONS */
-    div.stButton > button {{
-        background: linear-gradient(90deg, #22d3ee, #34d399) !important;
-        color: #000000 !important; /* Force Black Text */
-        padding: 0.8rem 3rem;
-        border-radius: 999px;
-        font-weight: 800;
-        border: none;
-        font-size: 1.2rem;
-        transition: transform 0.2s;
-        box-shadow: 0 0 20px rgba(52, 211, 153, 0.4);
-    }}
-    div.stButton > button:hover {{ transform: scale(1.05); color: #000000 !important; }}
-
-    /* CARDS */
-    .section {{ padding: 5rem 2rem; animation: fadeUp 1.2s ease-in-out; }}
-    .section h2 {{ font-size: 2.8rem; font-weight: 800; margin-bottom: 45px; text-align: center; color: white; }}
-    .grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(280px, 1fr)); gap: 35px; }}
-    .card {{ background: rgba(255, 255, 255, 0.05); backdrop-filter: blur(10px); padding: 38px 34px; border-radius: 26px; border: 1px solid rgba(255,255,255,0.1); transition: all 0.4s ease; text-align: center; }}
-    .card:hover {{ transform: translateY(-10px); background: rgba(255, 255, 255, 0.1); border-color: #34d399; }}
-    .card h3 {{ font-size: 1.4rem; font-weight: 700; margin-bottom: 14px; color: #ecfeff; }}
-    .card p {{ font-size: 1rem; line-height: 1.6; color: #99f6e4; }}
-
-    /* FLOW */
-    .flow-container {{ display: flex; flex-wrap: wrap; justify-content: center; gap: 20px; }}
-    .flow-item {{ flex: 1; min-width: 150px; text-align: center; padding: 24px; background: rgba(255,255,255,0.05); border-radius: 20px; border: 1px solid rgba(255,255,255,0.05); transition: all 0.3s ease; }}
-    .flow-item:hover {{ background: rgba(255,255,255,0.1); transform: translateY(-5px); border-color: #22d3ee; }}
-    .flow-img {{ width: 64px; height: 64px; margin-bottom: 15px; border-radius: 12px; object-fit: cover; }}
-    .flow-title {{ font-weight: 700; color: #ecfeff; }}
-
-    .custom-footer {{ text-align: center; padding: 50px; color: #5eead4; opacity: 0.7; font-size: 0.9rem; }}
-    @keyframes fadeUp {{ from {{ opacity: 0; transform: translateY(40px); }} to {{ opacity: 1; transform: translateY(0); }} }}
-    </style>
-    """, unsafe_allow_html=True)
+    flow_images = {k: picture_html(f"{k}.png", "flow-img", k) for k in ["login", "upload", "ai", "disease", "insights"]}
 
     st.markdown("""
     <div class="hero">
@@ -302,11 +234,11 @@ def landing_page():
     <div class="section">
         <h2>How It Works</h2>
         <div class="flow-container">
-            <div class="flow-item"><img src="data:image/png;base64,{flow_base64['login']}" class="flow-img"><div class="flow-title">Login</div></div>
-            <div class="flow-item"><img src="data:image/png;base64,{flow_base64['upload']}" class="flow-img"><div class="flow-title">Upload Image</div></div>
-            <div class="flow-item"><img src="data:image/png;base64,{flow_base64['ai']}" class="flow-img"><div class="flow-title">AI Processing</div></div>
-            <div class="flow-item"><img src="data:image/png;base64,{flow_base64['disease']}" class="flow-img"><div class="flow-title">Diagnosis</div></div>
-            <div class="flow-item"><img src="data:image/png;base64,{flow_base64['insights']}" class="flow-img"><div class="flow-title">Get Insights</div></div>
+            <div class="flow-item">{flow_images['login']}<div class="flow-title">Login</div></div>
+            <div class="flow-item">{flow_images['upload']}<div class="flow-title">Upload Image</div></div>
+            <div class="flow-item">{flow_images['ai']}<div class="flow-title">AI Processing</div></div>
+            <div class="flow-item">{flow_images['disease']}<div class="flow-title">Diagnosis</div></div>
+            <div class="flow-item">{flow_images['insights']}<div class="flow-title">Get Insights</div></div>
         </div>
     </div>
     """, unsafe_allow_html=True)
@@ -317,116 +249,8 @@ def landing_page():
 
 # --- LOGIN PAGE ---
 def login_page():
-    BANNER_PATH = os.path.join("assets", "banner.png")
-    bg_image_base64 = get_base64(BANNER_PATH)
-
-    st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;700;900&display=swap');
-    html, body, [class*="css"] {{ font-family: 'Inter', sans-serif; }}
-
-    /* BACKGROUND */
-    .stApp {{
-        background: linear-gradient(135deg, rgba(0,0,0,0.6), rgba(0,0,0,0.6)), 
-                    url("data:image/png;base64,{bg_image_base64}");
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-        color: white;
-    }}
-    header {{visibility: hidden;}}
-    footer {{visibility: hidden;}}
-
-    /* GLASS LOGIN CARD */
-    .login-card {{
-        background: rgba(255, 255, 255, 0.08);
-        backdrop-filter: blur(12px);
-        padding: 40px;
-        border-radius: 24px;
-        border: 1px solid rgba(255, 255, 255, 0.1);
-        box-shadow: 0 8px 32px 0 rgba(0, 0, 0, 0.37);
-        text-align: center;
-        margin-bottom: 20px;
-        animation: fadeUp 0.8s ease-out;
-    }}
-    
-    .login-title {{
-        font-size: 2.2rem;
-        font-weight: 800;
-        margin-bottom: 10px;
-        background: linear-gradient(90deg, #22d3ee, #34d399);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-    }}
-
-    /* INPUT FIELDS STYLING */
-    .stTextInput input {{
-        background-color: rgba(0, 0, 0, 0.3) !important;
-        color: white !important;
-        border: 1px solid rgba(255, 255, 255, 0.2) !important;
-        border-radius: 12px !important;
-        padding: 12px !important;
-    }}
-    .stTextInput input:focus {{
-        border-color: #22d3ee !important;
-        box-shadow: 0 0 10px rgba(34, 211, 238, 0.3) !important;
-    }}
-    .stTextInput label {{
-        color: #d1fae5 !important;
-        font-weight: 600;
-    }}
-
-    /* TABS STYLING */
-    .stTabs [data-baseweb="tab-list"] {{
-        gap: 10px;
-        background-color: rgba(0,0,0,0.3);
-        padding: 10px;
-        border-radius: 50px;
-        justify-content: center;
-    }}
-    .stTabs [data-baseweb="tab"] {{
-        height: 40px;
-        border-radius: 40px;
-        color: white;
-        background-color: transparent;
-        border: none;
-        flex: 1;
-    }}
-    .stTabs [aria-selected="true"] {{
-        background-color: #34d399 !important;
-        color: black !important;
-        font-weight: bold;
-    }}
-
-    /* --- FIX: TARGET MAIN FORM BUTTONS SPECIFICALLY (Prevents Eye Icon distortion) --- */
-    /* This prevents the style from hitting the 'eye' icon button inside the input */
-    div[data-testid="stFormSubmitButton"] button {{
-        width: 100%;
-        background: linear-gradient(90deg, #22d3ee, #34d399) !important;
-        color: #000000 !important; /* Forces Black Text */
-        padding: 0.8rem;
-        border-radius: 12px;
-        font-weight: 800;
-        border: none;
-        margin-top: 10px;
-    }}
-    
-    div[data-testid="stFormSubmitButton"] button:hover {{
-        transform: scale(1.02);
-        box-shadow: 0 0 15px rgba(52, 211, 153, 0.5);
-        color: #000000 !important;
-    }}
-
-    /* BACK BUTTON STYLING (Outside Form) */
-    div.stButton > button {{
-        background: rgba(255,255,255,0.1);
-        color: white;
-        border: 1px solid rgba(255,255,255,0.2);
-    }}
-
-    @keyframes fadeUp {{ from {{ opacity: 0; transform: translateY(20px); }} to {{ opacity: 1; transform: translateY(0); }} }}
-    </style>
-    """, unsafe_allow_html=True)
+    # Page CSS is injected once per session; this rerun only enables the "login" sheets
+    apply_theme("login")
 
     # --- LAYOUT ---
     c1, c2, c3 = st.columns([1, 1.5, 1])
@@ -441,15 +265,18 @@ def login_page():
                 username = st.text_input("Username", placeholder="Enter your username")
                 password = st.text_input("Password", type="password", placeholder="Enter your password")
                 if st.form_submit_button("Log In"):
-                    user = authenticate_user(username, password)
-                    if user:
-                        st.success(f"Welcome, {user['name']}!")
-                        time.sleep(1)
-                        st.session_state['authenticated'] = True
-                        st.session_state['user'] = user
-                        st.rerun()
+                    try:
+                        user = authenticate_user(username, password)
+                    except HashPoolBusy as e:
+                        user = None
+                        st.warning(str(e))
                     else:
-                        st.error("Invalid credentials.")
+                        if user:
+                            st.toast(f"Welcome, {user['name']}!", icon="🌿")
+                            start_session(user)
+                            st.rerun()
+                        else:
+                            st.error("Invalid credentials.")
 
         with tab2:
             with st.form("register_form"):
@@ -474,108 +301,12 @@ def login_page():
 
 # --- DASHBOARD PAGE ---
 def dashboard_page():
-    BANNER_PATH = os.path.join("assets", "banner.png")
-    bg_image_base64 = get_base64(BANNER_PATH)
-    
     user = st.session_state['user']
 
     # --- CSS ---
-    st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;700;900&display=swap');
-
-    html, body, [class*="css"] {{
-        font-family: 'Inter', sans-serif;
-    }}
-
-    .stApp {{
-        background: linear-gradient(135deg, rgba(0,0,0,0.75), rgba(0,0,0,0.9)), 
-                    url("data:image/png;base64,{bg_image_base64}");
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-        color: white;
-    }}
-
-    header {{visibility:hidden;}}
-    footer {{visibility:hidden;}}
-
-    h1 {{
-        font-weight:900;
-        font-size:52px;
-        letter-spacing:-1px;
-    }}
-
-    /* --- PILL NAVBAR STYLE --- */
-    .stTabs [data-baseweb="tab-list"] {{
-        gap: 10px;
-        background-color: rgba(255, 255, 255, 0.05);
-        padding: 10px 20px;
-        border-radius: 50px;
-        justify-content: center;
-        flex-wrap: wrap;
-        margin-bottom: 20px;
-    }}
-
-    .stTabs [data-baseweb="tab"] {{
-        height: 40px;
-        border-radius: 40px;
-        color: #e2e8f0 !important;
-        background-color: transparent;
-        border: none;
-        font-weight: 600;
-        font-size: 0.95rem;
-        padding: 0 20px;
-    }}
-
-    .stTabs [aria-selected="true"] {{
-        background-color: #34d399 !important;
-        color: #020617 !important;
-        font-weight: 800;
-        box-shadow: 0 4px 15px rgba(52, 211, 153, 0.4);
-    }}
-
-    [data-testid="stFileUploader"] {{
-        width:100% !important;
-        padding:2.2rem !important;
-        border-radius:20px;
-        border:1px dashed rgba(52,211,153,0.7);
-        background:rgba(255,255,255,0.05);
-    }}
-
-    /* --- DASHBOARD BUTTONS FIX --- */
-    div.stButton > button {{
-        background: linear-gradient(90deg, #22d3ee, #34d399) !important;
-        color: #000000 !important;
-        font-weight: 800 !important;
-        border: none !important;
-        border-radius: 12px !important;
-        padding: 0.6rem 1.2rem !important;
-        transition: none !important;
-    }}
-
-    /* Ensure button text is black */
-    div.stButton > button:hover {{
-        transform: scale(1.02) !important;
-        box-shadow: 0 0 15px rgba(52, 211, 153, 0.5) !important;
-        color: #000000 !important;
-    }}
-
-    div.stButton > button p {{
-        color: #000000 !important;
-    }}
-
-    .stSelectbox div[data-baseweb="select"] > div {{
-        background-color: rgba(255, 255, 255, 0.1) !important;
-        color: white !important;
-        border: 1px solid rgba(255, 255, 255, 0.2) !important;
-    }}
-    
-    div[data-baseweb="popover"] ul {{
-        background-color: #1a1a1a !important;
-    }}
-    </style>
-    """, unsafe_allow_html=True)
+    # Page CSS (all tabs) is injected once per session; this rerun only enables the "dashboard" sheets
+    apply_theme("dashboard")
+
     col1, col2 = st.columns([8, 2])
     with col2:
         if st.button("🤖 AI Assistant", key="go_chatbot"):
@@ -591,7 +322,6 @@ def dashboard_page():
             st.caption(f"Member since: {user['join_date'].split(' ')[0]}")
         st.markdown("---")
         if st.button("🚪", use_container_width=True):
-            from auth import logout
             logout()
              
 
@@ -621,91 +351,7 @@ def dashboard_page():
         today_date = datetime.now().strftime("%A, %d %B %Y")
  
 
-        # --- 1. CUSTOM CSS FOR THIS TAB ---
-        st.markdown("""
-        <style>
-        /* Section Headers */
-        .section-title {
-            font-size: 1.8rem;
-            font-weight: 800;
-            margin-top: 40px;
-            margin-bottom: 20px;
-            background: linear-gradient(90deg, #34d399, #22d3ee);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-        }
-        
-        /* Stat Cards (Achievements) */
-        .stat-card {
-            background: rgba(255, 255, 255, 0.05);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-            border-radius: 15px;
-            padding: 20px;
-            text-align: center;
-            transition: transform 0.3s;
-        }
-        .stat-card:hover {
-            transform: translateY(-5px);
-            background: rgba(255, 255, 255, 0.1);
-            border-color: #34d399;
-        }
-        .stat-number {
-            font-size: 2.5rem;
-            font-weight: 900;
-            color: white;
-        }
-        .stat-label {
-            color: #cbd5e1;
-            font-size: 0.9rem;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-        }
-
-        /* Testimonial Cards */
-        .review-card {
-            background: rgba(20, 20, 30, 0.6);
-            border-left: 4px solid #34d399;
-            padding: 20px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-        }
-        .review-text {
-            font-style: italic;
-            color: #e2e8f0;
-            font-size: 1rem;
-            line-height: 1.6;
-        }
-        .review-author {
-            margin-top: 15px;
-            font-weight: bold;
-            color: #34d399;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }
-
-        /* Footer */
-        .custom-footer {
-            margin-top: 80px;
-            padding-top: 40px;
-            border-top: 1px solid rgba(255,255,255,0.1);
-            text-align: center;
-            color: #94a3b8;
-        }
-        
-        /* Footer Links */
-        .footer-links a {
-            color: #94a3b8;
-            margin: 0 10px;
-            text-decoration: none;
-            font-size: 0.9rem;
-            transition: color 0.3s;
-        }
-        .footer-links a:hover {
-            color: #34d399;
-        }
-        </style>
-        """, unsafe_allow_html=True)
+        # --- 1. CUSTOM CSS FOR THIS TAB: assets/css/home.css ---
 
         # --- 2. FARM OVERVIEW HERO (NEW CONTENT) ---
         st.markdown(f"""
@@ -847,22 +493,15 @@ def dashboard_page():
     with tab_analysis:
         st.markdown("### AI Disease Diagnosis")
 
-        config_path = os.path.join("config", "model_config.json")
-
-        if not os.path.exists(config_path):
-            st.error("Config file not found!")
-            return
-
-        with open(config_path) as f:
-            config = json.load(f)
-
         # --- NEW: CROP SELECTION UI ---
         # This allows the user to switch between Rice/Potato and Corn/Blackgram
         # --- CROP SELECTION UI ---
         model_options = {
+            "🤖 Auto-detect": AUTO_DETECT,
             "Rice & Potato": "rice_potato",
             "Corn & Blackgram": "corn_blackgram",
-            "Cotton & Tomato": "cotton_tomato"
+            "Cotton & Tomato": "cotton_tomato",
+            "Pumpkin & Wheat": "pumpkin_wheat"
         }
 
         
@@ -876,29 +515,34 @@ def dashboard_page():
         # This is the internal key used for config and preprocessing logic
         selected_model_name = model_options[selected_display_name]
 
+        warmup = warmup_state()
+        if warmup is not None and not warmup.ready.is_set():
+            st.caption(f"⏳ Warming up AI models ({warmup.done}/{len(warmup.model_keys)} ready) — first scan may be slower.")
+
         st.markdown("---")
 
         left, center, right = st.columns([1,6,1])
 
         with center:
-            
-
-            # Make the uploader placeholder/text black for better visibility
-            st.markdown("""
-            <style>
-            [data-testid="stFileUploader"] { color: #000000 !important; }
-            [data-testid="stFileUploader"] small, [data-testid="stFileUploader"] span { color: #000000 !important; }
-            </style>
-            """, unsafe_allow_html=True)
-
+            # Uploader placeholder/text is made black for visibility in assets/css/uploader.css
             uploaded_file = st.file_uploader(
                 "🌿 Upload Leaf Image — JPG / PNG (Max 5MB)",
                 type=["jpg","jpeg","png"]
             )
 
+        image = None
+
         if uploaded_file is not None:
+            image_bytes = uploaded_file.getvalue()
 
-            image = Image.open(uploaded_file)
+            # Decodes phone photos at reduced resolution; also serves the preview
+            try:
+                with timed("decode", selected_model_name):
+                    image = decode_image(image_bytes, target_size=(256, 256))
+            except ImageRejectedError as e:
+                st.error(f"⚠️ {e}")
+
+        if image is not None:
 
             col1, col2 = st.columns([1,1.5])
 
@@ -909,77 +553,99 @@ def dashboard_page():
 
                 st.markdown("#### 🔬 Diagnosis Report")
 
-                with st.spinner('Scanning leaf tissues...'):
-
-                    # Load the specific model chosen by the user
-                    model, model_type = load_model(selected_model_name)
-
-                    if not model:
-                        st.error("Model failed to load.")
-                        return
-
-                    # --- CRITICAL CHANGE ---
-                    # We now pass selected_model_name as the model_key 
-                    # so preprocess.py knows whether to use ResNet or EfficientNet math.
-                    processed_img = preprocess_image(
-                        image, 
-                        model_type=model_type, 
-                        model_key=selected_model_name
-                    )
+                if selected_model_name == AUTO_DETECT:
+                    with st.spinner('Scanning with every crop model...'):
+                        result = auto_diagnose(image, image_bytes)
 
-                    try:
-                        predictions = predict_image(model, model_type, processed_img)
-
-                        class_indices = config['models'][selected_model_name]['classes']
-
-                        predicted_class_index = np.argmax(predictions)
-                        confidence = np.max(predictions) * 100
-
-                        predicted_label = class_indices.get(
-                            str(predicted_class_index),
-                            f"Class {predicted_class_index}"
+                    if not result["ranked"]:
+                        st.error("No model could diagnose this image.")
+                    else:
+                        labels, confidences, _ = zip(*result["ranked"])
+                        render_diagnosis_report(list(labels), np.array(confidences), AUTO_DETECT, "mixed")
+                        others = ", ".join(
+                            f"{key}: {label} ({confidence:.0%})"
+                            for key, _, label, confidence in result["candidates"][1:]
+                        )
+                        st.caption(
+                            f"Most certain of {len(result['models'])} crop models: {result['model']} "
+                            f"({result['seconds']:.1f}s)" + (f" · Also suggested: {others}" if others else "")
                         )
 
-                        if "healthy" in predicted_label.lower():
-                            st.success(f"**Status: {predicted_label.upper()}**")
-                            st.balloons()
-                        else:
-                            st.error(f"**Detected: {predicted_label.upper()}**")
-
-                        st.caption(f"Confidence: {confidence:.2f}%")
-                        st.progress(int(confidence))
-
-                        probs = predictions[0]
-
-                        df_chart = pd.DataFrame({
-                            "Condition": [class_indices.get(str(i), f"Class {i}") for i in range(len(probs))],
-                            "Confidence": probs
-                        }).sort_values(by="Confidence", ascending=False)
-
-                        chart = alt.Chart(df_chart).mark_bar(
-                            cornerRadiusEnd=6
-                        ).encode(
-                            x=alt.X('Confidence:Q', title=None, axis=alt.Axis(format='%')),
-                            y=alt.Y('Condition:N', sort='-x', title=None),
-                            color=alt.Color('Confidence:Q', scale=alt.Scale(scheme="blues"), legend=None),
-                            tooltip=[
-                                alt.Tooltip('Condition:N'),
-                                alt.Tooltip('Confidence:Q', format='.2%')
-                            ]
-                        ).properties(height=350)
-
-                        text = chart.mark_text(
-                            align='left',
-                            baseline='middle',
-                            dx=5
-                        ).encode(
-                            text=alt.Text('Confidence:Q', format='.1%')
+                        # Stored under the model whose diagnosis was shown. Only a scan
+                        # answered entirely from the cache has no model latency to record
+                        all_cached = set(result["cached"]) >= set(result["models"])
+                        record_scan(
+                            user, result["model"], list(zip(labels, confidences))[:3],
+                            None if all_cached else result["seconds"] * 1000, image, image_bytes
                         )
 
-                        st.altair_chart(chart + text, use_container_width=True)
+                else:
+                    backend = serving_backend(selected_model_name)
+
+                    with st.spinner('Scanning leaf tissues...'):
+                        scan_start = time.perf_counter()
+
+                        # Reruns and repeat uploads of the same photo skip inference
+                        predictions = PREDICTION_CACHE.get(image_bytes, selected_model_name)
+                        cache_hit = predictions is not None
+
+                        if predictions is None:
+                            model_type = REGISTRY.spec(selected_model_name).type
+
+                            # Load the specific model chosen by the user
+                            # (skipped when the worker pool serves it out of process)
+                            if not worker_pool_enabled():
+                                with timed("load_model", selected_model_name, backend):
+                                    model, model_type = load_model(selected_model_name)
+
+                                if not model:
+                                    st.error("Model failed to load.")
+                                    return
+
+                            # --- CRITICAL CHANGE ---
+                            # We now pass selected_model_name as the model_key 
+                            # so preprocess.py knows whether to use ResNet or EfficientNet math.
+                            with timed("preprocess", selected_model_name, backend):
+                                processed_img = preprocess_image(
+                                    image, 
+                                    model_type=model_type, 
+                                    model_key=selected_model_name
+                                )
+
+                        try:
+                            if predictions is None:
+                                # Coalesced with concurrent sessions into one forward pass
+                                with timed("predict", selected_model_name, backend):
+                                    predictions = get_scheduler(selected_model_name).predict(processed_img)
+                                PREDICTION_CACHE.put(image_bytes, selected_model_name, predictions)
+
+                            # Only real inference time goes into history
+                            latency_ms = None if cache_hit else (time.perf_counter() - scan_start) * 1000
+                            spec = REGISTRY.spec(selected_model_name)
+
+                            if len(predictions[0]) != len(spec.labels):
+                                # label_scores names extra outputs "Class N"; missing ones are simply absent
+                                st.warning(
+                                    f"{selected_model_name} returned {len(predictions[0])} scores but "
+                                    f"{len(spec.labels)} classes are configured; check its \"classes\" in model_config.json."
+                                )
+                            ranked = spec.label_scores(predictions[0])
+                            labels, confidences = zip(*ranked)
+
+                            render_diagnosis_report(
+                                list(labels),
+                                np.array(confidences),
+                                selected_model_name,
+                                backend
+                            )
+
+                            record_scan(
+                                user, selected_model_name, ranked[:3],
+                                latency_ms, image, image_bytes
+                            )
 
-                    except Exception as e:
-                        st.error(f"Prediction Error: {e}")
+                        except Exception as e:
+                            st.error(f"Prediction Error: {e}")
 
     # --- TAB 2: AGRICONNECT ---
     with tab_connect:
@@ -988,54 +654,7 @@ def dashboard_page():
         feedback_file = os.path.join(feedback_dir, "feedback_log.txt")
         os.makedirs(feedback_dir, exist_ok=True)
 
-        st.markdown("""
-        <style>
-        h1, h2, h3, h4, h5, p, span, label, div { color: white !important; }
-
-        [data-testid="stForm"] {
-            background: rgba(255, 255, 255, 0.05);
-            backdrop-filter: blur(10px);
-            border-radius: 20px;
-            padding: 30px;
-            border: 1px solid rgba(255, 255, 255, 0.1);
-        }
-
-        /* AGRICONNECT BUTTONS FIX (MATCHING LOGIN PAGE) */
-        div[data-testid="stFormSubmitButton"] button {
-            width: 100% !important;
-            background: linear-gradient(90deg, #22d3ee, #34d399) !important;
-            color: #000000 !important;
-            border-radius: 12px !important;
-            font-weight: 800 !important;
-            border: none !important;
-            padding: 0.8rem !important;
-        }
-
-        div[data-testid="stFormSubmitButton"] button:hover {
-            transform: scale(1.02) !important;
-            box-shadow: 0 0 15px rgba(52, 211, 153, 0.5) !important;
-            color: #000000 !important;
-        }
-
-        .stTextInput input, .stTextArea textarea, .stSelectbox div[data-baseweb="select"] > div {
-            background-color: rgba(0, 0, 0, 0.3) !important;
-            color: white !important;
-            border: 1px solid rgba(255, 255, 255, 0.2) !important;
-            border-radius: 12px !important;
-        }
-
-        .feedback-card {
-            background: rgba(0, 0, 0, 0.2);
-            border-left: 4px solid #34d399;
-            border-radius: 10px;
-            padding: 15px;
-            margin-bottom: 15px;
-        }
-        .user-name { color: #34d399 !important; font-weight: bold; }
-        .feedback-text { color: #e2e8f0 !important; font-style: italic; }
-        </style>
-        """, unsafe_allow_html=True)
-
+        # Feedback card styling: assets/css/agriconnect.css
         st.markdown("<h1 style='text-align: center;'>💬 Community <span style='color:#34d399'>Feedback</span></h1>", unsafe_allow_html=True)
         c1, c2 = st.columns([1.5, 1], gap="large")
 
@@ -1099,158 +718,111 @@ def dashboard_page():
 
     # --- TAB 4: SMART ANALYTICS ---
     with tab_analytics:
-        # --- 1. CUSTOM CSS ---
-        st.markdown("""
-        <style>
-        /* KPI CARDS */
-        .kpi-card { 
-            background: rgba(255, 255, 255, 0.05); 
-            backdrop-filter: blur(10px); 
-            border-radius: 15px; 
-            padding: 20px; 
-            border: 1px solid rgba(255, 255, 255, 0.1); 
-            text-align: center; 
-            transition: transform 0.3s; 
-        }
-        .kpi-card:hover { 
-            transform: translateY(-5px); 
-            border-color: #34d399; 
-            box-shadow: 0 10px 20px rgba(52, 211, 153, 0.2); 
-        }
-        .kpi-value { font-size: 2.2rem; font-weight: 800; color: white; margin: 0; }
-        .kpi-label { color: #cbd5e1; font-size: 0.9rem; text-transform: uppercase; letter-spacing: 1px; }
-
-        /* TABLE STYLES */
-        .chart-container { 
-            background: rgba(0, 0, 0, 0.2); 
-            border-radius: 20px; 
-            padding: 20px; 
-            border: 1px solid rgba(255, 255, 255, 0.05); 
-            margin-bottom: 20px; 
-        }
-        .report-table { width: 100%; border-collapse: collapse; color: #e2e8f0; font-size: 0.9rem; }
-        .report-table th { 
-            text-align: left; 
-            padding: 15px; 
-            border-bottom: 1px solid rgba(255,255,255,0.1); 
-            color: #34d399; 
-            text-transform: uppercase; 
-            font-size: 0.8rem; 
-        }
-        .report-table td { padding: 15px; border-bottom: 1px solid rgba(255,255,255,0.05); }
-        
-        /* STATUS BADGES */
-        .status-badge { padding: 5px 10px; border-radius: 20px; font-size: 0.75rem; font-weight: bold; }
-        .status-high { background: rgba(248, 113, 113, 0.2); color: #f87171; }
-        .status-safe { background: rgba(52, 211, 153, 0.2); color: #34d399; }
-        </style>
-        """, unsafe_allow_html=True)
+        # --- 1. CUSTOM CSS: assets/css/analytics.css ---
 
         # --- 2. HEADER ---
         st.markdown("<h1 style='text-align: center;'>📊 Farm <span style='color:#34d399'>Analytics</span></h1>", unsafe_allow_html=True)
-        st.markdown("<p style='text-align: center; color: #cbd5e1; margin-bottom: 30px;'>Real-time insights on crop health and yield predictions.</p>", unsafe_allow_html=True)
-
-        # --- 3. KPI SECTION ---
-        k1, k2, k3, k4 = st.columns(4)
-        with k1: st.markdown('<div class="kpi-card"><div class="kpi-label">Total Scans</div><div class="kpi-value">1,248</div><div style="color: #34d399; font-size: 0.8rem;">▲ 12% this week</div></div>', unsafe_allow_html=True)
-        with k2: st.markdown('<div class="kpi-card"><div class="kpi-label">Avg Health Score</div><div class="kpi-value">87%</div><div style="color: #34d399; font-size: 0.8rem;">Stable</div></div>', unsafe_allow_html=True)
-        with k3: st.markdown('<div class="kpi-card"><div class="kpi-label">Disease Alerts</div><div class="kpi-value" style="color: #f87171;">14</div><div style="color: #f87171; font-size: 0.8rem;">Requires Action</div></div>', unsafe_allow_html=True)
-        with k4: st.markdown('<div class="kpi-card"><div class="kpi-label">Est. Yield</div><div class="kpi-value">4.2T</div><div style="color: #fbbf24; font-size: 0.8rem;">Potato & Rice</div></div>', unsafe_allow_html=True)
+        st.markdown("<p style='text-align: center; color: #cbd5e1; margin-bottom: 30px;'>Live insights on crop health from your own scans.</p>", unsafe_allow_html=True)
 
-        st.write("") # Spacer
+        # Everything below reads the rollup tables, which are updated as each scan is recorded
+        summary = user_summary(user["username"]) if user else None
 
-        # --- 4. PREPARE DATA ---
-        yield_data = pd.DataFrame({"Crop": ["Rice", "Potato", "Wheat", "Tomato"], "Yield (Tons)": [45, 60, 30, 25]})
-        
-        # Creating dummy trend data (you'd replace this with real database queries later)
-        trend_data = pd.DataFrame({
-            "Month": ["Jan", "Feb", "Mar", "Apr", "May", "Jun"], 
-            "Healthy": [80, 85, 82, 88, 90, 87], 
-            "Diseased": [20, 15, 18, 12, 10, 13]
-        })
-
-        # --- 5. CHARTS SECTION ---
-        c1, c2 = st.columns(2)
-        
-        with c1:
-            st.markdown("### 🌾 Crop Yield Forecast")
-            # Bar Chart using Plotly Express
-            fig_yield = px.bar(yield_data, x="Crop", y="Yield (Tons)", color="Crop", color_discrete_sequence=["#34d399", "#22d3ee", "#fbbf24", "#f87171"])
-            
-            # Customizing Layout for Dark Theme/Glass Look
-            fig_yield.update_layout(
-                plot_bgcolor="rgba(0,0,0,0)", 
-                paper_bgcolor="rgba(255, 255, 255, 0.05)", 
-                font=dict(color="white"), 
-                showlegend=False, 
-                xaxis=dict(showgrid=False), 
-                yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.1)"),
-                margin=dict(l=20, r=20, t=20, b=20)
-            )
-            st.plotly_chart(fig_yield, use_container_width=True)
-
-        with c2:
-            st.markdown("### 📉 Disease Trends (6 Months)")
-            # Area Chart using Graph Objects
-            fig_trend = go.Figure()
-            fig_trend.add_trace(go.Scatter(x=trend_data["Month"], y=trend_data["Healthy"], fill='tozeroy', mode='lines', name='Healthy', line=dict(width=3, color='#34d399')))
-            fig_trend.add_trace(go.Scatter(x=trend_data["Month"], y=trend_data["Diseased"], fill='tozeroy', mode='lines', name='Diseased', line=dict(width=3, color='#f87171')))
-            
-            # Customizing Layout
-            fig_trend.update_layout(
-                plot_bgcolor="rgba(0,0,0,0)", 
-                paper_bgcolor="rgba(255, 255, 255, 0.05)", 
-                font=dict(color="white"), 
-                legend=dict(orientation="h", y=1.1), 
-                xaxis=dict(showgrid=False), 
-                yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.1)"),
-                margin=dict(l=20, r=20, t=20, b=20)
-            )
-            st.plotly_chart(fig_trend, use_container_width=True)
-
-        # --- 6. RECENT REPORTS TABLE ---
-        st.markdown("### 📋 Recent Field Reports")
-        st.markdown("""
-        <div class="chart-container">
-            <table class="report-table">
-                <thead>
-                    <tr>
-                        <th>Scan ID</th>
-                        <th>Date</th>
-                        <th>Crop Type</th>
-                        <th>Diagnosis</th>
-                        <th>Risk Level</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    <tr>
-                        <td>#SC-2045</td>
-                        <td>Feb 24, 2026</td>
-                        <td>Potato (Kufri)</td>
-                        <td>Early Blight</td>
-                        <td><span class="status-badge status-high">High Risk</span></td>
-                    </tr>
+        if not summary or not summary["scans"]:
+            st.info("No scans yet — diagnose a leaf in the 🔍 Analysis tab and your analytics will appear here.")
+        else:
+            # --- 3. KPI SECTION ---
+            top = top_diseases(user["username"], limit=1)
+            k1, k2, k3, k4 = st.columns(4)
+            with k1: st.markdown(f'<div class="kpi-card"><div class="kpi-label">Total Scans</div><div class="kpi-value">{summary["scans"]:,}</div><div style="color: #34d399; font-size: 0.8rem;">▲ {summary["scans_this_week"]} this week</div></div>', unsafe_allow_html=True)
+            with k2: st.markdown(f'<div class="kpi-card"><div class="kpi-label">Avg Health Score</div><div class="kpi-value">{summary["health_score"]:.0f}%</div><div style="color: #34d399; font-size: 0.8rem;">{summary["healthy"]:,} healthy leaves</div></div>', unsafe_allow_html=True)
+            with k3: st.markdown(f'<div class="kpi-card"><div class="kpi-label">Disease Alerts</div><div class="kpi-value" style="color: #f87171;">{summary["alerts_this_week"]}</div><div style="color: #f87171; font-size: 0.8rem;">Last 7 days</div></div>', unsafe_allow_html=True)
+            with k4: st.markdown(f'<div class="kpi-card"><div class="kpi-label">Top Disease (30d)</div><div class="kpi-value" style="font-size: 1.3rem;">{top[0][0] if top else "None"}</div><div style="color: #fbbf24; font-size: 0.8rem;">Avg confidence {summary["avg_confidence"]:.0f}%</div></div>', unsafe_allow_html=True)
+
+            st.write("") # Spacer
+
+            # --- 4. CHARTS SECTION ---
+            # Figures are cached per user and only rebuilt after a new scan lands
+            c1, c2 = st.columns(2)
+
+            with c1:
+                st.markdown("### 🌾 Crop Health Overview")
+                st.plotly_chart(get_figure(user["username"], "crops"), use_container_width=True)
+
+            with c2:
+                st.markdown("### 📉 Disease Trends (Weekly)")
+                st.plotly_chart(get_figure(user["username"], "trend"), use_container_width=True)
+
+            # --- 5. RECENT REPORTS TABLE ---
+            st.markdown("### 📋 Recent Field Reports")
+            recent, _ = fetch_history(user["username"], limit=5)
+            rows_html = "".join(
+                f"""
                     <tr>
-                        <td>#SC-2044</td>
-                        <td>Feb 23, 2026</td>
-                        <td>Rice (Basmati)</td>
-                        <td>Healthy</td>
-                        <td><span class="status-badge status-safe">Safe</span></td>
-                    </tr>
-                </tbody>
-            </table>
-        </div>
-        """, unsafe_allow_html=True)
+                        <td>#SC-{row["id"]}</td>
+                        <td>{datetime.strptime(row["created_at"][:10], "%Y-%m-%d").strftime("%b %d, %Y")}</td>
+                        <td>{row["label"].split()[0]}</td>
+                        <td>{row["label"]}</td>
+                        <td>{'<span class="status-badge status-safe">Safe</span>' if "healthy" in row["label"].lower() else '<span class="status-badge status-high">High Risk</span>'}</td>
+                    </tr>"""
+                for row in recent
+            )
+            st.markdown(f"""
+            <div class="chart-container">
+                <table class="report-table">
+                    <thead>
+                        <tr>
+                            <th>Scan ID</th>
+                            <th>Date</th>
+                            <th>Crop Type</th>
+                            <th>Diagnosis</th>
+                            <th>Risk Level</th>
+                        </tr>
+                    </thead>
+                    <tbody>{rows_html}
+                    </tbody>
+                </table>
+            </div>
+            """, unsafe_allow_html=True)
 
     # --- TAB 5: HISTORY ---
     with tab_history:
         st.header("📜 Analysis History")
-        st.dataframe(pd.DataFrame({
-            "Date": ["2023-10-01", "2023-10-05", "2023-10-12"],
-            "Image": ["IMG_2022.jpg", "IMG_2025.jpg", "IMG_2030.jpg"],
-            "Result": ["Healthy", "Rice Blast", "Healthy"],
-            "Confidence": ["99%", "87%", "95%"]
-        }))
+
+        # Only the cursors of visited pages live in session state, never the rows
+        cursors = st.session_state.setdefault("history_cursors", [None])
+        page, next_cursor = fetch_history(user["username"], cursor=cursors[-1]) if user else ([], None)
+
+        if not page:
+            st.info("No scans yet — diagnose a leaf in the 🔍 Analysis tab and it will show up here.")
+        else:
+            st.dataframe(
+                pd.DataFrame({
+                    "Image": [get_base64_thumbnail(row["thumbnail"]) for row in page],
+                    "Date": [row["created_at"][:16] for row in page],
+                    "Model": [row["model_key"] for row in page],
+                    "Result": [row["label"] for row in page],
+                    "Confidence": [row["confidence"] * 100 for row in page],
+                    "Also possible": [", ".join(row["top_labels"][1:]) for row in page],
+                }),
+                column_config={
+                    "Image": st.column_config.ImageColumn("Image", width="small"),
+                    "Confidence": st.column_config.ProgressColumn("Confidence", format="%.0f%%", min_value=0, max_value=100),
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if len(cursors) > 1 and st.button("⬅ Newer", key="history_prev"):
+                cursors.pop()
+                st.rerun()
+        with col_page:
+            st.caption(f"Page {len(cursors)}")
+        with col_next:
+            if next_cursor is not None and st.button("Older ➡", key="history_next"):
+                cursors.append(next_cursor)
+                st.rerun()
 
     # --- TAB 6: ABOUT ---
     with tab_about:
@@ -1274,142 +846,31 @@ def dashboard_page():
         Across all models, the system identifies both **diseased and healthy leaves**, enabling fast, dependable plant health assessments and supporting data-driven agricultural practices.
         """)
 
+        with st.expander("⚙️ System Status"):
+            warmup = warmup_state()
+            if warmup is not None:
+                st.caption("Model warm-up")
+                st.json(warmup.summary())
+            st.caption("Model cache")
+            st.json(MODEL_CACHE.stats())
+            st.caption("Prediction cache")
+            st.json(PREDICTION_CACHE.stats())
+            st.caption("AI assistant")
+            st.json(LLM_CLIENTS.stats())
+
 def chatbot_page():
     st.markdown('<div class="chatbot-scope">', unsafe_allow_html=True)
-
-    BANNER_PATH = os.path.join("assets", "banner.png")
-    bg_image_base64 = get_base64(BANNER_PATH)
-
-    st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;700;900&display=swap');
-
-    html, body, [class*="css"] {{
-        font-family: 'Inter', sans-serif;
-    }}
-
-    .stApp {{
-        background: linear-gradient(135deg, rgba(0,0,0,0.75), rgba(0,0,0,0.9)),
-                    url("data:image/png;base64,{bg_image_base64}");
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-        color: white;
-    }}
-
-    header {{ visibility: hidden; }}
-    footer {{ visibility: hidden; }}
-    </style>
-    """, unsafe_allow_html=True)
-    st.markdown("""
-<style>
-
-/* =========================
-   CHATBOT VISIBILITY FIX
-   (Same dark background)
-   ========================= */
-
-/* Chat container */
-.ad-chat-box {
-    background: rgba(255,255,255,0.06) !important;
-    border-radius: 14px;
-    box-shadow: 0 15px 15px rgba(0,0,0,0.35);
-}
-
-/* Chat header */
-.ad-chat-header h2 {
-    color: #ffffff !important;
-}
-.ad-chat-header p {
-    color: #cbd5e1 !important;
-}
-
-/* Chat messages */
-.stChatMessage p {
-    color: #ffffff !important;
-}
-
-/* Assistant bubble */
-[data-testid="stChatMessage"] div:has(svg) {
-    background: rgba(255,255,255,0.08) !important;
-    border-radius: 10px;
-    padding: 5px;
-}
-
-/* User bubble */
-[data-testid="stChatMessage"] div:not(:has(svg)) {
-    background: rgba(34,211,153,0.18) !important;
-    border-radius: 10px;
-    padding: 5px;
-}
-
-/* Suggested question buttons */
-button[kind="secondary"] {
-    background: rgba(255,255,255,0.12) !important;
-    color: #ffffff !important;
-    border: 1px solid rgba(255,255,255,0.25) !important;
-    border-radius: 12px !important;
-    box-shadow: none !important;
-}
-
-/* Disable hover-only visibility */
-button[kind="secondary"]:hover {
-    background: rgba(255,255,255,0.18) !important;
-    color: #ffffff !important;
-}
-
-/* Reset + Back buttons */
-div.stButton > button {
-    background: linear-gradient(90deg, #22d3ee, #34d399) !important;
-    color: #000000 !important;
-    font-weight: 700 !important;
-    border-radius: 10px !important;
-}
-
-/* No hover color switch */
-div.stButton > button:hover {
-    background: linear-gradient(90deg, #22d3ee, #34d399) !important;
-    color: #000000 !important;
-}
-
-/* Chat input */
-textarea, input {
-    background: rgba(255,255,255,0.12) !important;
-    color: #080808 !important;
-    border: 1px solid rgba(255,255,255,0.25) !important;
-    border-radius: 12px !important;
-}
-
-/* Footer text */
-.ad-chat-footer {
-    color: #94a3b8 !important;
-}
-
-</style>
-""", unsafe_allow_html=True)
-
-
+    # Page CSS is injected once per session; this rerun only enables the "chatbot" sheets
+    apply_theme("chatbot")
 
     if st.button("⬅ Back to Dashboard", key="back_dashboard"):
         st.session_state["page"] = "dashboard"
         st.rerun()
-    load_dotenv()
 
 # ================== CONFIG ==================
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
-
-    # Auto-detect available model
-    GEMINI_MODEL = None
-    try:
-        for model in genai.list_models():
-            if "generateContent" in model.supported_generation_methods:
-                GEMINI_MODEL = model.name
-                break
-    except Exception:
-        # Fallback if list fails
-        GEMINI_MODEL = "models/gemini-pro"
+    # Key, endpoint and model are discovered once per process (refreshed in the background after the TTL)
+    llm = LLM_CLIENTS.get()
+    GEMINI_MODEL = llm.model_name
 
     SYSTEM_PROMPT = """
     You are AgriDetect AI, a friendly agricultural assistant. You help farmers with:
@@ -1456,11 +917,10 @@ textarea, input {
     # ================== FUNCTIONS ==================
     def fetch_suggestions():
         try:
-            gemini_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_key or not GEMINI_MODEL:
+            if not llm.ready:
                 return
             
-            model = genai.GenerativeModel(GEMINI_MODEL)
+            model = llm.model()
             instruction = (
                 SYSTEM_PROMPT
                 + "\n\nSuggest exactly 4 short questions a farmer might ask. Return ONLY a JSON array of strings, nothing else."
@@ -1492,85 +952,45 @@ textarea, input {
     
 
 
-    def get_ai_response(user_input):
-        st.session_state.typing = True
-
-        gemini_key = os.getenv("GEMINI_API_KEY")
-        reply = None
-
-        if not gemini_key or not GEMINI_MODEL:
-            reply = "❌ Gemini API not configured or no model available."
-        else:
-            try:
-                model = genai.GenerativeModel(GEMINI_MODEL, system_instruction=SYSTEM_PROMPT)
-                
-                # Build message history for the model (only include completed messages, not typing state)
-                messages = []
-                for msg in st.session_state.messages:
-                    msg_role = msg.get("role", "user")
-                    msg_content = msg.get("content", "")
-                    if msg_role == "assistant" and msg_content:
-                        messages.append({
-                            "role": "model",
-                            "parts": msg_content
-                        })
-                    elif msg_role == "user" and msg_content:
-                        messages.append({
-                            "role": "user",
-                            "parts": msg_content
-                        })
-                
-                # Add current user input
-                messages.append({"role": "user", "parts": user_input})
-                
-                # Retry logic for rate limiting
-                max_retries = 3
-                retry_delay = 5
-                
-                for attempt in range(max_retries):
-                    try:
-                        response = model.generate_content(messages)
-                        reply = response.text if response and response.text else "⚠️ Gemini returned empty response."
-                        break  # Success, exit retry loop
-                    except Exception as e:
-                        error_msg = str(e)
-                        # Check if it's a rate limit error (429)
-                        if "429" in error_msg or "quota" in error_msg.lower():
-                            if attempt < max_retries - 1:
-                                st.session_state.typing = False
-                                with st.spinner(f"⏳ Rate limited. Retrying in {retry_delay} seconds..."):
-                                    time.sleep(retry_delay)
-                                st.session_state.typing = True
-                                retry_delay *= 2  # Exponential backoff
-                            else:
-                                reply = (
-                                    "⏱️ **Rate Limit Exceeded**\n\n"
-                                    "Free tier is limited to 5 requests/minute. "
-                                    "Please wait a moment and try again, or upgrade your API plan at https://ai.google.dev/"
-                                )
-                        else:
-                            # Other error
-                            reply = f"❌ Gemini Error: {error_msg}"
-                            break
-                
-                if not reply:
-                    reply = "⚠️ No response received. Please try again."
-                    
-            except Exception as e:
-                reply = f"❌ Unexpected Error: {str(e)}"
+    def stream_ai_response():
+        """Yields the reply to the conversation so far, chunk by chunk; errors are yielded as text."""
+        if not llm.ready:
+            yield "❌ Gemini API not configured or no model available."
+            return
 
-        # Ensure we always add a response message
-        if reply:
-            st.session_state.messages.append({"role": "assistant", "content": reply, "time": datetime.now()})
-        
-        st.session_state.typing = False
+        # Build message history for the model; the user's new message is already the last entry
+        messages = []
+        for msg in st.session_state.messages:
+            msg_role = msg.get("role", "user")
+            msg_content = msg.get("content", "")
+            if msg_role == "assistant" and msg_content:
+                messages.append({
+                    "role": "model",
+                    "parts": msg_content
+                })
+            elif msg_role == "user" and msg_content:
+                messages.append({
+                    "role": "user",
+                    "parts": msg_content
+                })
+
+        def wait(seconds):
+            with st.spinner(f"⏳ Rate limited. Retrying in {seconds} seconds..."):
+                time.sleep(seconds)
+
+        # Rate limits are retried only before any text has been shown
+        yield from stream_reply(llm, messages, system_instruction=SYSTEM_PROMPT, wait=wait)
+
+    def ask(question):
+        """Queues a question; the reply is streamed on the rerun, under the question."""
+        st.session_state.messages.append({"role": "user", "content": question, "time": datetime.now()})
+        st.session_state.typing = True
+        st.rerun()
     
 
     def show():
         # ================== CONFIG CHECK ==================
-        gemini_key = os.getenv("GEMINI_API_KEY")
-        
-        if not gemini_key:
+        if not llm.configured:
             st.error(
                 "⚠️ **Gemini API Key Required**\n\n"
                 "Please configure your Gemini API key:\n\n"
@@ -1593,18 +1013,7 @@ textarea, input {
             st.stop()
         
         # ================== UI (Centered) ==================
-        # Compact styling and centered column similar to chat interfaces
-        st.markdown(
-            """
-            <style>
-            .ad-chat-box { max-width: 900px; margin: 0 auto; padding: 18px; border-radius: 12px; background: rgba(255,255,255,0.02); }
-            .ad-chat-header { text-align: center; margin-bottom: 8px; }
-            .ad-suggest-title { margin-top: 12px; font-weight: 700; }
-            </style>
-            """,
-            unsafe_allow_html=True,
-        )
-
+        # Compact styling (assets/css/chat_layout.css) and centered column similar to chat interfaces
         # Create three columns and render the chat in the middle one
         left_col, mid_col, right_col = st.columns([1, 2, 1])
         with mid_col:
@@ -1649,9 +1058,17 @@ textarea, input {
                 with st.chat_message(msg["role"]):
                     st.markdown(msg["content"])
 
+            # Stream the pending reply as it is generated instead of waiting for the whole completion
             if st.session_state.typing:
                 with st.chat_message("assistant"):
-                    st.markdown("⏳ *AgriDetect AI is typing...*")
+                    reply = st.write_stream(stream_ai_response())
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": reply or "⚠️ Gemini returned empty response.",
+                    "time": datetime.now(),
+                })
+                st.session_state.typing = False
+                st.rerun()
 
             # Suggested questions
             if len(st.session_state.messages) <= 2:
@@ -1661,21 +1078,13 @@ textarea, input {
                     with cols[i % 2]:
                         button_key = f"chatbot_q_{i}_btn"
                         if st.button(q, key=button_key, use_container_width=True):
-                            st.session_state.messages.append(
-                                {"role": "user", "content": q, "time": datetime.now()}
-                            )
-                            get_ai_response(q)
-                            st.rerun()
+                            ask(q)
 
             # Input
             prompt = st.chat_input("Ask about crop diseases, prevention, treatments...")
 
             if prompt:
-                st.session_state.messages.append(
-                    {"role": "user", "content": prompt, "time": datetime.now()}
-                )
-                get_ai_response(prompt)
-                st.rerun()
+                ask(prompt)
 
             # Footer
             st.markdown(
@@ -0,0 +1,116 @@
+import threading
+import time
+
+from PIL import Image
+
+from model_loader import load_model, _run_batch
+from registry import REGISTRY
+from worker_pool import get_worker_pool
+
+class WarmupState:
+    """Progress of the start-up warm-up, shared by every session."""
+
+    def __init__(self, model_keys):
+        self.model_keys = list(model_keys)
+        self.status = {key: "pending" for key in self.model_keys}
+        self.seconds = {}
+        self.errors = {}
+        self.ready = threading.Event()
+
+    @property
+    def done(self):
+        return sum(1 for s in self.status.values() if s in ("ready", "failed"))
+
+    def summary(self):
+        return {
+            "ready": self.ready.is_set(),
+            "done": self.done,
+            "total": len(self.model_keys),
+            "status": dict(self.status),
+            "seconds": dict(self.seconds),
+            "errors": dict(self.errors),
+        }
+
+
+_STATE = None
+_STATE_LOCK = threading.Lock()
+
+
+def _dummy_batch(model_key, batch_size):
+    """Runs blank images through the normal preprocessing path."""
+    from preprocess import preprocess_batch
+
+    spec = REGISTRY.spec(model_key)
+
+    return preprocess_batch(
+        [Image.new("RGB", spec.input_size)] * batch_size,
+        model_type=spec.type,
+        target_size=spec.input_size,
+        model_key=model_key
+    )
+
+
+def _warm_model(model_key, batch_size):
+    """Loads one model and pushes a dummy batch through it to trigger tracing and allocation."""
+    batch = _dummy_batch(model_key, batch_size)
+    pool = get_worker_pool()
+
+    if pool is not None:
+        pool.predict(model_key, batch)
+        return
+
+    model, model_type = load_model(model_key)
+    if model is None:
+        raise RuntimeError(f"Model '{model_key}' failed to load")
+    _run_batch(model, model_type, batch)
+
+
+def _run(state, batch_size):
+    for key in state.model_keys:
+        state.status[key] = "warming"
+        start = time.perf_counter()
+        try:
+            _warm_model(key, batch_size)
+            state.status[key] = "ready"
+        except Exception as e:
+            state.status[key] = "failed"
+            state.errors[key] = str(e)
+        state.seconds[key] = time.perf_counter() - start
+
+    state.ready.set()
+
+
+def start_warmup():
+    """Starts the background warm-up once per server process. Safe to call on every rerun."""
+    global _STATE
+
+    with _STATE_LOCK:
+        if _STATE is not None:
+            return _STATE
+
+        # Warm-up policy (see "inference" -> "warmup" in config)
+        warmup_config = REGISTRY.section("inference", "warmup")
+        model_keys = warmup_config.get("models") or REGISTRY.keys()
+        _STATE = WarmupState(model_keys)
+
+        if not warmup_config.get("enabled", True):
+            _STATE.status = {key: "skipped" for key in model_keys}
+            _STATE.ready.set()
+            return _STATE
+
+        threading.Thread(
+            target=_run,
+            args=(_STATE, warmup_config.get("batch_size", 1)),
+            name="model-warmup",
+            daemon=True
+        ).start()
+        return _STATE
+
+
+def warmup_state():
+    """Returns the current warm-up state (None if warm-up was never started)."""
+    return _STATE
+
+
+def is_ready():
+    return _STATE is None or _STATE.ready.is_set()
@@ -0,0 +1,250 @@
+import os
+import threading
+import time
+import multiprocessing as mp
+from collections import deque
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from backends import get_backend
+from registry import REGISTRY
+
+
+# ---------------- WORKER PROCESS ----------------
+def _pin_threads(cores, model_types):
+    """
+    Pins this process to `cores` and sizes the thread pools of the frameworks it uses.
+    `model_types` are serving runtimes, so a worker serving only ONNX never imports TF.
+    """
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(cores))
+
+    n_threads = len(cores) if cores else os.cpu_count()
+
+    if "torch" in model_types:
+        get_backend("torch").torch.set_num_threads(n_threads)
+
+    if "tensorflow" in model_types:
+        tf = get_backend("tensorflow").tf
+        tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _worker_main(conn, model_keys, cores):
+    """Entry point of a worker: owns `model_keys` and serves requests from `conn`."""
+    from model_loader import load_model, serving_backend, _run_batch
+
+    # "torch-int8_static" -> "torch"; ONNX/TFLite size their own thread pools
+    _pin_threads(cores, {serving_backend(key).split("-")[0] for key in model_keys})
+
+    for key in model_keys:
+        load_model(key)
+
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+
+        if msg is None:
+            break
+
+        model_key, shm_name, shape, dtype = msg
+
+        try:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            # The client owns the segment; keep this process' tracker from unlinking it
+            resource_tracker.unregister(shm._name, "shared_memory")
+
+            try:
+                batch = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+            finally:
+                shm.close()
+
+            model, model_type = load_model(model_key)
+            if model is None:
+                raise RuntimeError(f"Model '{model_key}' failed to load")
+
+            conn.send(("ok", _run_batch(model, model_type, batch)))
+
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    conn.close()
+
+
+# ---------------- CLIENT SIDE ----------------
+class WorkerTimeout(RuntimeError):
+    """Raised when a worker does not answer within the request timeout."""
+
+
+class WorkerHandle:
+    """
+    One worker process plus the pipe used to reach it. At most `max_restarts`
+    respawns are allowed within any `restart_window` seconds, so a crash loop
+    is stopped but a long-running server does not run out of restarts.
+    """
+
+    def __init__(self, index, model_keys, cores, max_restarts, restart_window=600, timeout=120):
+        self.index = index
+        self.model_keys = list(model_keys)
+        self.cores = list(cores or [])
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.timeout = timeout
+        self.restarts = 0
+        self._recent_restarts = deque()
+
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self._conn, child_conn = self._ctx.Pipe()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.model_keys, self.cores),
+            name=f"inference-worker-{self.index}",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+
+    def restart(self):
+        """Kills and respawns the worker process."""
+        now = time.monotonic()
+        while self._recent_restarts and now - self._recent_restarts[0] > self.restart_window:
+            self._recent_restarts.popleft()
+        if len(self._recent_restarts) >= self.max_restarts:
+            raise RuntimeError(
+                f"Worker {self.index} exceeded {self.max_restarts} restarts in {self.restart_window}s"
+            )
+
+        self._recent_restarts.append(now)
+        self.restarts += 1
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        self._start()
+
+    def is_alive(self):
+        return self._process.is_alive()
+
+    def _request(self, model_key, batch):
+        shm = shared_memory.SharedMemory(create=True, size=max(batch.nbytes, 1))
+        try:
+            np.ndarray(batch.shape, dtype=batch.dtype, buffer=shm.buf)[...] = batch
+            self._conn.send((model_key, shm.name, batch.shape, batch.dtype.str))
+            if not self._conn.poll(self.timeout):
+                raise WorkerTimeout(f"Worker {self.index} did not answer within {self.timeout}s")
+            return self._conn.recv()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def predict(self, model_key, batch):
+        """Sends one batch through shared memory and returns the probability rows."""
+        batch = np.ascontiguousarray(batch)
+
+        with self._lock:
+            if not self.is_alive():
+                self.restart()
+
+            try:
+                status, payload = self._request(model_key, batch)
+            except WorkerTimeout as timeout:
+                # A hung worker would block every later request: replace it, but don't
+                # resend a batch that may be what hung it
+                try:
+                    self.restart()
+                except RuntimeError as exhausted:
+                    raise exhausted from timeout
+                raise
+            except (EOFError, BrokenPipeError, ConnectionResetError):
+                # Worker died mid-request (e.g. OOM): respawn and retry once
+                self.restart()
+                status, payload = self._request(model_key, batch)
+
+        if status != "ok":
+            raise RuntimeError(f"Worker {self.index}: {payload}")
+        return payload
+
+    def stop(self):
+        with self._lock:
+            try:
+                self._conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self._process.join(timeout=5)
+            if self._process.is_alive():
+                self._process.kill()
+
+
+class WorkerPool:
+    """Routes each model_key to the worker process that owns it."""
+
+    def __init__(self, layout, max_restarts=3, restart_window=600, timeout=120):
+        self.workers = []
+        self._routes = {}
+
+        for i, spec in enumerate(layout):
+            worker = WorkerHandle(i, spec["models"], spec.get("cores"), max_restarts, restart_window, timeout)
+            self.workers.append(worker)
+            for key in spec["models"]:
+                self._routes[key] = worker
+
+    def predict(self, model_key, batch):
+        if model_key not in self._routes:
+            raise KeyError(f"No worker owns model '{model_key}'")
+
+        if hasattr(batch, "numpy"):
+            batch = batch.numpy()
+
+        return self._routes[model_key].predict(model_key, batch)
+
+    def stats(self):
+        return [
+            {
+                "worker": w.index,
+                "models": w.model_keys,
+                "cores": w.cores,
+                "alive": w.is_alive(),
+                "restarts": w.restarts,
+            }
+            for w in self.workers
+        ]
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.stop()
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def worker_pool_enabled():
+    return bool(REGISTRY.section("inference", "workers").get("enabled", False))
+
+
+def get_worker_pool():
+    """
+    Returns the process-wide worker pool, or None when out-of-process inference is disabled.
+    The layout and limits (see "inference" -> "workers") are read when the pool starts.
+    """
+    global _POOL
+
+    if not worker_pool_enabled():
+        return None
+
+    with _POOL_LOCK:
+        if _POOL is None:
+            workers_config = REGISTRY.section("inference", "workers")
+            _POOL = WorkerPool(
+                workers_config.get("processes", []),
+                max_restarts=workers_config.get("max_restarts", 3),
+                restart_window=workers_config.get("restart_window_seconds", 600),
+                timeout=workers_config.get("request_timeout_seconds", 120)
+            )
+        return _POOL
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app's modules import each other by bare name and read config/ relative to the repository root
+sys.path.insert(0, os.path.join(ROOT, "streamlit_app"))
+os.chdir(ROOT)
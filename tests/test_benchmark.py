@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("streamlit")
+pytest.importorskip("torch")
+pytest.importorskip("timm")
+
+import benchmark
+import model_loader
+import registry
+from runtimes import OnnxModel, TorchScriptModel
+
+TINY = {
+    "file": "tiny.pth",
+    "type": "torch",
+    "architecture": "resnet18",
+    "img_size": 64,
+    "classes": {"0": "Healthy", "1": "Leaf Spot"},
+}
+
+
+def _use_config(monkeypatch, tmp_path, info):
+    """Serves a one-model config ("tiny") from tmp_path to every module that reads the registry."""
+    path = tmp_path / "model_config.json"
+    path.write_text(json.dumps({"models": {"tiny": info}}))
+    tiny = registry.ModelRegistry(str(path))
+    monkeypatch.setattr(registry, "REGISTRY", tiny)
+    monkeypatch.setattr(model_loader, "REGISTRY", tiny)
+    return tiny
+
+
+def _scores(model):
+    import torch
+
+    return model.run_batch(torch.randn(2, 3, 64, 64))
+
+
+def test_standins_for_onnx_backend(monkeypatch, tmp_path):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    import export_onnx
+
+    tiny = _use_config(monkeypatch, tmp_path, dict(TINY, backend="onnx"))
+    monkeypatch.setattr(export_onnx, "REGISTRY", tiny)
+
+    benchmark.prepare_standins("tiny", str(tmp_path))
+
+    assert os.path.exists(tmp_path / "tiny.onnx")
+    model, model_type = model_loader._build_model("tiny")
+    assert isinstance(model, OnnxModel) and model_type == "torch"
+    assert _scores(model).shape == (2, 2)
+
+
+@pytest.mark.parametrize("variant", ["int8_dynamic", "int8_static"])
+def test_standins_for_int8_variant(monkeypatch, tmp_path, variant):
+    _use_config(monkeypatch, tmp_path, dict(TINY, variant=variant))
+
+    benchmark.prepare_standins("tiny", str(tmp_path))
+
+    assert os.path.exists(tmp_path / f"tiny.{variant}.pt")
+    model, _ = model_loader._build_model("tiny")
+    assert isinstance(model, TorchScriptModel)
+    assert _scores(model).shape == (2, 2)
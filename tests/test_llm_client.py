@@ -0,0 +1,148 @@
+import time
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import llm_client
+from llm_client import LLMClient, LLMRegistry
+from llm_stub import start_stub_server
+
+GEMINI_CONFIG = {"preferred_models": [], "fallback_model": "models/gemini-pro"}
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Starts the Gemini stub with two models and points GEMINI_* at it."""
+    pytest.importorskip("google.generativeai")
+    server, url = start_stub_server(models=["models/stub-flash", "models/stub-pro"], chunk_ms=0)
+    monkeypatch.setenv("GEMINI_API_KEY", "stub")
+    monkeypatch.setenv("GEMINI_API_ENDPOINT", url)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+# ---------------- DISCOVERY ----------------
+def test_discovery_picks_preferred_model(stub):
+    client = llm_client._discover_gemini(dict(GEMINI_CONFIG, preferred_models=["models/missing", "models/stub-pro"]))
+
+    assert client.ready
+    assert client.model_name == "models/stub-pro"
+    assert client.endpoint == stub
+    assert client.error is None
+
+
+def test_discovery_falls_back_to_first_supported_model(stub):
+    client = llm_client._discover_gemini(dict(GEMINI_CONFIG, preferred_models=["models/missing"]))
+
+    assert client.model_name == "models/stub-flash"
+
+
+def test_discovery_uses_fallback_model_when_listing_fails(stub, monkeypatch):
+    import google.generativeai as genai
+
+    def blocked():
+        raise PermissionError("listing not allowed for this key")
+
+    monkeypatch.setattr(genai, "list_models", blocked)
+    client = llm_client._discover_gemini(GEMINI_CONFIG)
+
+    assert client.model_name == "models/gemini-pro"
+    assert "listing not allowed" in client.error
+
+
+def test_discovery_without_key_is_not_ready(monkeypatch):
+    pytest.importorskip("google.generativeai")
+    monkeypatch.setattr(llm_client, "load_dotenv", lambda: None)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+
+    client = llm_client._discover_gemini(GEMINI_CONFIG)
+
+    assert not client.ready
+    assert "GEMINI_API_KEY" in client.error
+
+
+# ---------------- REGISTRY ----------------
+class ScriptedDiscoverer:
+    """Returns the scripted clients (or raises the scripted exceptions) in order, counting calls."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self, config):
+        self.calls += 1
+        result = self.results[min(self.calls, len(self.results)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _ready(model_name):
+    return LLMClient("gemini", object(), "key", model_name)
+
+
+def _registry(monkeypatch, discoverer, ttl):
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    monkeypatch.setitem(llm_client.DISCOVERERS, "gemini", discoverer)
+    return LLMRegistry({"provider": "gemini"}, ttl=ttl)
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_client_is_discovered_once_within_ttl(monkeypatch):
+    discoverer = ScriptedDiscoverer(_ready("models/a"))
+    registry = _registry(monkeypatch, discoverer, ttl=60)
+
+    first = registry.get()
+    assert registry.get() is first
+    assert discoverer.calls == 1
+
+
+def test_stale_client_is_served_while_refreshing_in_background(monkeypatch):
+    discoverer = ScriptedDiscoverer(_ready("models/a"), _ready("models/b"))
+    registry = _registry(monkeypatch, discoverer, ttl=0.05)
+
+    first = registry.get()
+    time.sleep(0.1)
+
+    # Past the TTL the cached client is still returned at once; rediscovery runs on a thread
+    assert registry.get() is first
+    assert _wait_for(lambda: registry.get().model_name == "models/b")
+    assert discoverer.calls >= 2
+
+
+@pytest.mark.parametrize("failure", [
+    LLMClient("gemini", error="GEMINI_API_KEY is not set"),
+    RuntimeError("discovery crashed"),
+])
+def test_failed_refresh_keeps_last_working_client(monkeypatch, failure):
+    discoverer = ScriptedDiscoverer(_ready("models/a"), failure)
+    registry = _registry(monkeypatch, discoverer, ttl=60)
+
+    working = registry.get()
+    refreshed = registry.refresh()
+
+    assert refreshed is working
+    assert refreshed.ready and refreshed.model_name == "models/a"
+    assert refreshed.error in ("GEMINI_API_KEY is not set", "discovery crashed")
+    assert registry.get() is working
+
+
+def test_failed_first_discovery_is_retried_sooner(monkeypatch):
+    monkeypatch.setattr(llm_client, "RETRY_SECONDS", 0.05)
+    discoverer = ScriptedDiscoverer(RuntimeError("offline"), _ready("models/a"))
+    registry = _registry(monkeypatch, discoverer, ttl=3600)
+
+    assert not registry.get().ready
+    time.sleep(0.1)
+    registry.get()
+    assert _wait_for(lambda: registry.get().ready)
@@ -0,0 +1,145 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from llm_client import LLM_CLIENTS, LLMClient, RATE_LIMIT_MESSAGE, stream_reply
+from llm_stub import FakeGenerativeModel, split_chunks, start_stub_server, stub_reply
+from metrics import ERRORS, LLM_SECONDS, _label_key
+
+QUESTION = "How do I treat early blight on potatoes?"
+EXPECTED = stub_reply({"contents": [{"role": "user", "parts": [{"text": QUESTION}]}]})
+
+
+def _observed(phase, provider, model):
+    """(count, sum) recorded in agri_llm_seconds for one label set so far."""
+    series = LLM_SECONDS._series.get(_label_key({"phase": phase, "provider": provider, "model": model}))
+    return (series[-1], series[-2]) if series else (0, 0.0)
+
+
+def _llm_errors(model):
+    return ERRORS._series.get(_label_key({"stage": "llm", "model_key": model, "backend": "scripted"}), 0)
+
+
+@pytest.fixture(autouse=True)
+def no_chunk_delay(monkeypatch):
+    monkeypatch.setattr(FakeGenerativeModel, "chunk_delay", 0)
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+
+
+# ---------------- FAKE PROVIDER ----------------
+def test_fake_provider_streams_chunks_in_order():
+    client = LLM_CLIENTS.get("fake")
+
+    chunks = list(client.stream(QUESTION))
+
+    assert client.provider == "fake" and client.ready
+    assert chunks == split_chunks(EXPECTED)
+    assert len(chunks) > 1
+
+
+def test_fake_provider_records_first_token_and_total():
+    client = LLM_CLIENTS.get("fake")
+    first_before = _observed("first_token", "fake", client.model_name)
+    total_before = _observed("total", "fake", client.model_name)
+
+    list(client.stream(QUESTION))
+
+    first = _observed("first_token", "fake", client.model_name)
+    total = _observed("total", "fake", client.model_name)
+    assert first[0] == first_before[0] + 1
+    assert total[0] == total_before[0] + 1
+    assert 0 <= first[1] - first_before[1] <= total[1] - total_before[1]
+
+
+# ---------------- STUB SERVER ----------------
+def test_gemini_client_streams_from_stub_server(monkeypatch):
+    pytest.importorskip("google.generativeai")
+    server, url = start_stub_server(chunk_ms=0)
+    monkeypatch.setenv("GEMINI_API_KEY", "stub")
+    monkeypatch.setenv("GEMINI_API_ENDPOINT", url)
+    try:
+        client = LLM_CLIENTS.refresh("gemini")
+        total_before = _observed("total", "gemini", client.model_name)
+
+        chunks = list(client.stream(QUESTION))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert client.model_name == "models/stub-flash"
+    assert len(chunks) > 1
+    assert "".join(chunks) == EXPECTED
+    assert _observed("first_token", "gemini", client.model_name)[0] >= 1
+    assert _observed("total", "gemini", client.model_name)[0] == total_before[0] + 1
+
+
+# ---------------- RETRIES AND ERRORS ----------------
+class ScriptedModel:
+    """generate_content that plays one script per call: text chunks, then optionally an exception."""
+
+    def __init__(self, *scripts):
+        self.scripts = list(scripts)
+        self.calls = 0
+
+    def __call__(self, model_name, system_instruction=None):
+        return self
+
+    def generate_content(self, contents, stream=False):
+        script = self.scripts[self.calls]
+        self.calls += 1
+        for step in script:
+            if isinstance(step, Exception):
+                raise step
+            yield SimpleNamespace(text=step)
+
+
+def _scripted_client(model_name, *scripts):
+    model = ScriptedModel(*scripts)
+    return LLMClient("scripted", SimpleNamespace(GenerativeModel=model), "key", model_name), model
+
+
+def test_rate_limit_is_retried_before_any_text():
+    client, model = _scripted_client(
+        "models/retry",
+        [RuntimeError("429 Resource has been exhausted")],
+        ["Hello ", "world"],
+    )
+    waits = []
+
+    chunks = list(stream_reply(client, QUESTION, wait=waits.append))
+
+    assert chunks == ["Hello ", "world"]
+    assert waits == [5]
+    assert model.calls == 2
+    assert _observed("total", "scripted", "models/retry")[0] == 1
+
+
+def test_rate_limit_gives_up_after_max_retries():
+    quota = RuntimeError("quota exceeded")
+    client, model = _scripted_client("models/exhausted", [quota], [quota], [quota])
+    waits = []
+
+    chunks = list(stream_reply(client, QUESTION, max_retries=3, wait=waits.append))
+
+    assert chunks == [RATE_LIMIT_MESSAGE]
+    assert waits == [5, 10]
+    assert model.calls == 3
+
+
+def test_partial_stream_error_appends_suffix_without_retry():
+    # A 429 after text has been shown must not restart the reply
+    client, model = _scripted_client("models/partial", ["Early ", "blight ", RuntimeError("429 connection reset")])
+    waits = []
+    errors_before = _llm_errors("models/partial")
+
+    chunks = list(stream_reply(client, QUESTION, wait=waits.append))
+
+    assert chunks == ["Early ", "blight ", "\n\n❌ Gemini Error: 429 connection reset"]
+    assert waits == []
+    assert model.calls == 1
+    assert _llm_errors("models/partial") == errors_before + 1
+    # The first token arrived, but the reply never completed
+    assert _observed("first_token", "scripted", "models/partial")[0] == 1
+    assert _observed("total", "scripted", "models/partial")[0] == 0
@@ -0,0 +1,33 @@
+import json
+import os
+
+import pytest
+
+from registry import ConfigError, ModelRegistry
+
+MODELS = {"models": {"leaf": {"file": "leaf.keras", "type": "tensorflow", "classes": {"0": "Healthy"}}}}
+
+
+def _write(path, config, mtime):
+    path.write_text(json.dumps(config))
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.mark.parametrize("config", [[MODELS], "models", 3])
+def test_non_object_config_is_rejected(tmp_path, config):
+    path = tmp_path / "model_config.json"
+    _write(path, config, 1000)
+
+    with pytest.raises(ConfigError, match="JSON object"):
+        ModelRegistry(str(path))
+
+
+def test_non_object_edit_keeps_previous_config(tmp_path):
+    path = tmp_path / "model_config.json"
+    _write(path, MODELS, 1000)
+    registry = ModelRegistry(str(path), check_interval=0)
+
+    _write(path, [MODELS], 2000)
+
+    assert registry.keys() == ["leaf"]
+    assert "JSON object" in registry.last_error